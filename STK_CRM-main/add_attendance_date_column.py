@@ -0,0 +1,70 @@
+"""
+Add attendance.attendance_date (the day of `date`) with a unique
+(user_id, attendance_date) key, and the leave_requests lookup index
+
+Duplicate check-ins for the same user and day (possible before the key
+existed) keep their row, but only the earliest one gets attendance_date.
+"""
+import sys
+sys.path.append('.')
+
+from datetime import datetime
+
+from sqlalchemy import text, update
+from database import engine, SessionLocal
+from models import Attendance
+
+with engine.connect() as conn:
+    try:
+        conn.execute(text("ALTER TABLE attendance ADD COLUMN attendance_date DATE"))
+        conn.commit()
+        print("✓ Added attendance_date column to attendance")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate column" in str(e).lower():
+            print("✓ attendance_date already exists on attendance")
+        else:
+            print(f"✗ Error adding attendance_date: {e}")
+
+db = SessionLocal()
+try:
+    rows = db.query(Attendance.id, Attendance.user_id, Attendance.date, Attendance.check_in).filter(
+        Attendance.attendance_date.is_(None), Attendance.date.isnot(None)
+    ).order_by(Attendance.user_id, Attendance.date, Attendance.check_in, Attendance.id).all()
+    taken = {
+        (user_id, day) for user_id, day in db.query(Attendance.user_id, Attendance.attendance_date).filter(
+            Attendance.attendance_date.isnot(None)
+        )
+    }
+
+    filled = skipped = 0
+    for row in rows:
+        day = row.date.date() if isinstance(row.date, datetime) else row.date
+        if (row.user_id, day) in taken:
+            skipped += 1
+            continue
+        taken.add((row.user_id, day))
+        db.execute(update(Attendance).where(Attendance.id == row.id).values(attendance_date=day))
+        filled += 1
+    db.commit()
+    print(f"✓ Backfilled attendance_date on {filled} rows ({skipped} duplicate check-ins left without it)")
+finally:
+    db.close()
+
+INDEXES = [
+    ("uq_attendance_user_date", "attendance", "user_id, attendance_date", True),
+    ("ix_leave_requests_user_status_start", "leave_requests", "user_id, status, start_date", False),
+]
+
+with engine.connect() as conn:
+    for name, table, columns, unique in INDEXES:
+        try:
+            conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({columns})"))
+            conn.commit()
+            print(f"✓ Created index {name} on {table}")
+        except Exception as e:
+            if "already exists" in str(e) or "duplicate key name" in str(e).lower():
+                print(f"✓ Index {name} already exists on {table}")
+            else:
+                print(f"✗ Error creating {name}: {e}")
+
+print("\nDatabase migration completed!")
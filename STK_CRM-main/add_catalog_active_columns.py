@@ -0,0 +1,27 @@
+"""
+Add the is_active flag used by the incremental catalog sync (sync_catalog.py)
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine
+
+TABLES = ["categories", "sub_categories", "products", "components", "component_variants"]
+
+with engine.connect() as conn:
+    for table in TABLES:
+        try:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN is_active BOOLEAN DEFAULT TRUE"))
+            conn.commit()
+            print(f"✓ Added is_active column to {table} table")
+        except Exception as e:
+            if "already exists" in str(e) or "duplicate column" in str(e).lower():
+                print(f"✓ is_active column already exists in {table} table")
+            else:
+                print(f"✗ Error on {table}: {e}")
+
+        conn.execute(text(f"UPDATE {table} SET is_active = TRUE WHERE is_active IS NULL"))
+        conn.commit()
+
+print("\nDatabase migration completed!")
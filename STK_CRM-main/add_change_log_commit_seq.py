@@ -0,0 +1,39 @@
+"""
+Add commit_seq to change_log (the /sync cursor) and stamp the existing rows
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine, SessionLocal
+from utils.change_tracking import stamp_committed
+
+with engine.connect() as conn:
+    try:
+        conn.execute(text("ALTER TABLE change_log ADD COLUMN commit_seq INTEGER"))
+        conn.commit()
+        print("✓ Added commit_seq column to change_log table")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate column" in str(e).lower():
+            print("✓ commit_seq column already exists in change_log table")
+        else:
+            print(f"✗ Error: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX ix_change_log_commit_seq ON change_log (commit_seq, id)"))
+        conn.commit()
+        print("✓ Created index ix_change_log_commit_seq")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate key name" in str(e).lower():
+            print("✓ Index ix_change_log_commit_seq already exists")
+        else:
+            print(f"✗ Error: {e}")
+
+# Existing rows are stamped in id order; /sync would also do it on first call
+db = SessionLocal()
+try:
+    print(f"✓ Stamped {stamp_committed(db)} change_log rows")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,27 @@
+"""
+Add indexes used by the follow-up inbox (/leads/follow-up-leads)
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine
+
+INDEXES = [
+    ("ix_followups_lead_code_id", "followups", "lead_code, id"),
+    ("ix_leads_sales_executive_status", "leads", "sales_executive_id, status"),
+]
+
+with engine.connect() as conn:
+    for name, table, columns in INDEXES:
+        try:
+            conn.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
+            conn.commit()
+            print(f"✓ Created index {name} on {table}")
+        except Exception as e:
+            if "already exists" in str(e) or "duplicate key name" in str(e).lower():
+                print(f"✓ Index {name} already exists on {table}")
+            else:
+                print(f"✗ Error creating {name}: {e}")
+
+print("\nDatabase migration completed!")
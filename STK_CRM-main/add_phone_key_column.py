@@ -0,0 +1,53 @@
+"""
+Add the normalized phone_key column to leads, index it and backfill it
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine
+from utils.customer_lookup import normalize_phone
+
+BATCH_SIZE = 1000
+
+with engine.connect() as conn:
+    try:
+        conn.execute(text("ALTER TABLE leads ADD COLUMN phone_key VARCHAR(20)"))
+        conn.commit()
+        print("✓ Added phone_key column to leads table")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate column" in str(e).lower():
+            print("✓ phone_key column already exists in leads table")
+        else:
+            print(f"✗ Error: {e}")
+
+    try:
+        conn.execute(text("CREATE INDEX ix_leads_phone_key ON leads (phone_key)"))
+        conn.commit()
+        print("✓ Created index ix_leads_phone_key")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate key name" in str(e).lower():
+            print("✓ Index ix_leads_phone_key already exists")
+        else:
+            print(f"✗ Error: {e}")
+
+    # Backfill in id order, one executemany UPDATE per batch
+    last_id = 0
+    updated = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, phone FROM leads WHERE id > :last_id AND phone_key IS NULL ORDER BY id LIMIT :batch"
+        ), {"last_id": last_id, "batch": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        params = [{"id": r.id, "phone_key": normalize_phone(r.phone)} for r in rows]
+        conn.execute(text("UPDATE leads SET phone_key = :phone_key WHERE id = :id"), params)
+        conn.commit()
+
+        last_id = rows[-1].id
+        updated += len(rows)
+
+    print(f"✓ Backfilled phone_key for {updated} leads")
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,73 @@
+"""
+Add typed price columns to products / component_variants, create
+price_history, backfill both from the price strings
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text, update
+
+from database import engine, SessionLocal, Base
+import models
+from models import Product, ComponentVariant, PriceHistory
+from utils.cache_versions import bump_version
+from utils.catalog_snapshot import CATALOG_CACHE
+from utils.price_index import (
+    product_prices, variant_prices, history_row, record_price_history, HISTORY_START, PRODUCT, VARIANT
+)
+
+BATCH_SIZE = 1000
+
+Base.metadata.create_all(bind=engine)
+
+with engine.connect() as conn:
+    for table in ["products", "component_variants"]:
+        for column in ["price", "price_min", "price_max"]:
+            try:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER"))
+                conn.commit()
+                print(f"✓ Added {column} column to {table} table")
+            except Exception as e:
+                if "already exists" in str(e) or "duplicate column" in str(e).lower():
+                    print(f"✓ {column} column already exists in {table} table")
+                else:
+                    print(f"✗ Error on {table}.{column}: {e}")
+
+db = SessionLocal()
+try:
+    for model, item_type, parse in [
+        (Product, PRODUCT, lambda p: product_prices(p.price_str, p.price_bar)),
+        (ComponentVariant, VARIANT, lambda v: variant_prices(v.price_range)),
+    ]:
+        has_history = {
+            item_id for (item_id,) in db.query(PriceHistory.item_id).filter(PriceHistory.item_type == item_type).distinct()
+        }
+        last_id = 0
+        filled = 0
+        while True:
+            items = db.query(model).filter(model.id > last_id).order_by(model.id).limit(BATCH_SIZE).all()
+            if not items:
+                break
+            last_id = items[-1].id
+
+            updates, history = [], []
+            for item in items:
+                prices = parse(item)
+                if item.price is None:
+                    updates.append({"id": item.id, **prices})
+                if item.id not in has_history:
+                    # Current prices are treated as always having applied
+                    history.append(history_row(item_type, item.id, prices, HISTORY_START))
+            if updates:
+                db.execute(update(model), updates)
+            record_price_history(db, history)
+            db.commit()
+            filled += len(updates)
+        print(f"✓ Backfilled prices for {filled} {model.__tablename__} rows")
+
+    bump_version(db.connection(), CATALOG_CACHE)
+    db.commit()
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
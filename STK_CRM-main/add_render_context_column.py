@@ -0,0 +1,22 @@
+"""
+Add context_key to render_jobs (customer details a rendered document was built from)
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine
+
+with engine.connect() as conn:
+    try:
+        conn.execute(text("ALTER TABLE render_jobs ADD COLUMN context_key VARCHAR(64)"))
+        conn.commit()
+        print("✓ Added context_key column to render_jobs table")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate column" in str(e).lower():
+            print("✓ context_key column already exists in render_jobs table")
+        else:
+            print(f"✗ Error: {e}")
+
+# Jobs rendered before this have no key and are not reused; the next send renders them again
+print("\nDatabase migration completed!")
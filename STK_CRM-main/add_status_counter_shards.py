@@ -0,0 +1,32 @@
+"""
+Add the shard column to status_counters and widen its unique key to include it
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine
+
+with engine.connect() as conn:
+    try:
+        conn.execute(text("ALTER TABLE status_counters ADD COLUMN shard INT NOT NULL DEFAULT 0"))
+        conn.commit()
+        print("✓ Added shard column to status_counters table")
+    except Exception as e:
+        if "already exists" in str(e) or "duplicate column" in str(e).lower():
+            print("✓ shard column already exists in status_counters table")
+        else:
+            print(f"✗ Error: {e}")
+
+    try:
+        # Existing rows all become shard 0, so the widened key stays unique
+        conn.execute(text(
+            "ALTER TABLE status_counters DROP INDEX uq_status_counters, "
+            "ADD UNIQUE KEY uq_status_counters (entity, store, status, shard)"
+        ))
+        conn.commit()
+        print("✓ Unique key uq_status_counters now includes shard")
+    except Exception as e:
+        print(f"✗ Error: {e}")
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,58 @@
+"""
+Add updated_at columns to the tables served by /sync and seed change_log
+so the first delta sync returns existing rows
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import text
+from database import engine, SessionLocal, Base
+import models
+from utils.change_tracking import SYNC_ENTITIES, change_row, record_changes
+
+BATCH_SIZE = 1000
+
+# Creates change_log if it does not exist yet
+Base.metadata.create_all(bind=engine)
+
+with engine.connect() as conn:
+    for _, (model, _) in SYNC_ENTITIES.items():
+        table = model.__tablename__
+        try:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME"))
+            conn.commit()
+            print(f"✓ Added updated_at column to {table}")
+        except Exception as e:
+            if "already exists" in str(e) or "duplicate column" in str(e).lower():
+                print(f"✓ updated_at column already exists in {table}")
+            else:
+                print(f"✗ Error adding column to {table}: {e}")
+
+        try:
+            conn.execute(text(f"CREATE INDEX ix_{table}_updated_at ON {table} (updated_at)"))
+            conn.commit()
+        except Exception as e:
+            if not ("already exists" in str(e) or "duplicate key name" in str(e).lower()):
+                print(f"✗ Error indexing {table}.updated_at: {e}")
+
+db = SessionLocal()
+try:
+    if db.query(models.ChangeLog).first():
+        print("✓ change_log already populated, skipping seed")
+    else:
+        for entity, (model, _) in SYNC_ENTITIES.items():
+            last_id = 0
+            seeded = 0
+            while True:
+                rows = db.query(model).filter(model.id > last_id).order_by(model.id).limit(BATCH_SIZE).all()
+                if not rows:
+                    break
+                record_changes(db, [change_row(r, "upsert") for r in rows])
+                db.commit()
+                last_id = rows[-1].id
+                seeded += len(rows)
+            print(f"✓ Seeded change_log with {seeded} {entity} rows")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,71 @@
+"""
+Create the lead_events table and synthesize events for existing leads
+from their timestamp columns (leads without any event yet)
+"""
+import sys
+sys.path.append('.')
+
+from database import engine, SessionLocal, Base
+import models
+from models import Lead, LeadEvent, StoreManagerDashboard, User
+from utils.lead_events import (
+    lead_event_row, creation_events, record_lead_events_bulk,
+    QUOTATION_APPROVED, QUOTATION_REJECTED, QUOTATION_SENT, HANDED_OVER, DISPATCHED, DELIVERED
+)
+
+BATCH_SIZE = 500
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    store_by_user = {str(u.id): u.store_assigned for u in db.query(User.id, User.store_assigned)}
+    last_id = 0
+    backfilled = 0
+
+    while True:
+        leads = db.query(Lead).filter(Lead.id > last_id).order_by(Lead.id).limit(BATCH_SIZE).all()
+        if not leads:
+            break
+        last_id = leads[-1].id
+
+        lead_ids = [l.id for l in leads]
+        has_events = {lid for (lid,) in db.query(LeadEvent.lead_id).filter(LeadEvent.lead_id.in_(lead_ids)).distinct()}
+        store_entries = {
+            e.lead_code: e for e in db.query(StoreManagerDashboard).filter(
+                StoreManagerDashboard.lead_code.in_([l.lead_code for l in leads])
+            )
+        }
+
+        rows = []
+        for lead in leads:
+            if lead.id in has_events or not lead.lead_created_at:
+                continue
+            store = store_by_user.get(lead.sales_executive_id)
+            amount = lead.total_estimated_cost or 0
+
+            rows.extend(creation_events(lead, store=store))
+            if lead.approver_response_at and lead.approver_status in ("APPROVED", "REJECTED"):
+                event_type = QUOTATION_APPROVED if lead.approver_status == "APPROVED" else QUOTATION_REJECTED
+                rows.append(lead_event_row(lead, event_type, lead.approver_response_at, amount, store=store))
+            if lead.customer_quotation_sent_at:
+                rows.append(lead_event_row(lead, QUOTATION_SENT, lead.customer_quotation_sent_at, amount, store=store))
+
+            entry = store_entries.get(lead.lead_code)
+            if entry:
+                if entry.handover_at:
+                    rows.append(lead_event_row(lead, HANDED_OVER, entry.handover_at, entry.advance_received_amount or 0, store=store))
+                if entry.pending_to_dispatched_at:
+                    rows.append(lead_event_row(lead, DISPATCHED, entry.pending_to_dispatched_at, entry.dispatch_received_amount, store=store))
+                if entry.delivered_at:
+                    rows.append(lead_event_row(lead, DELIVERED, entry.delivered_at, entry.delivery_received_amount, store=store))
+            backfilled += 1
+
+        record_lead_events_bulk(db, rows)
+        db.commit()
+
+    print(f"✓ Backfilled events for {backfilled} leads")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
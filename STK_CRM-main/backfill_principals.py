@@ -0,0 +1,39 @@
+"""
+Create the principals login index and fill it from users, team_lead_staff
+and store_manager_staff
+
+Login names used by more than one table are listed: the first table in
+utils.principals.SOURCES keeps the name, the others cannot log in under it
+until renamed.
+"""
+import sys
+sys.path.append('.')
+
+from database import engine, SessionLocal, Base
+import models
+from utils.principals import SOURCES, principal_row, upsert_principal
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    conn = db.connection()
+    indexed = 0
+    shadowed = []
+
+    for source, (model, name_attr, _) in SOURCES.items():
+        for account in db.query(model).order_by(model.id):
+            row = principal_row(account, source)
+            if upsert_principal(conn, row):
+                indexed += 1
+            elif row["login_name"]:
+                shadowed.append((row["login_name"], source, account.id))
+
+    db.commit()
+    print(f"✓ Indexed {indexed} logins")
+    for login_name, source, account_id in shadowed:
+        print(f"✗ Login '{login_name}' of {source} #{account_id} is taken by another account")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
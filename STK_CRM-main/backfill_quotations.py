@@ -0,0 +1,68 @@
+"""
+Create the quotations / quotation_revisions tables and turn every lead's
+quotation_snapshot into revision 1 of a quotation (leads without one yet)
+"""
+import sys
+sys.path.append('.')
+
+from database import engine, SessionLocal, Base
+import models
+from models import Lead, Quotation, QuotationRevision
+
+BATCH_SIZE = 500
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    last_id = 0
+    backfilled = 0
+
+    while True:
+        leads = db.query(Lead).filter(
+            Lead.id > last_id, Lead.quotation_snapshot.isnot(None)
+        ).order_by(Lead.id).limit(BATCH_SIZE).all()
+        if not leads:
+            break
+        last_id = leads[-1].id
+
+        has_quotation = {
+            lid for (lid,) in db.query(Quotation.lead_id).filter(Quotation.lead_id.in_([l.id for l in leads])).distinct()
+        }
+
+        for lead in leads:
+            if lead.id in has_quotation:
+                continue
+            snapshot = lead.quotation_snapshot
+            status = "SENT" if lead.customer_quotation_sent_at else (lead.approver_status or "DRAFT")
+            quotation = Quotation(
+                quotation_code=lead.quotation_id,
+                lead_id=lead.id,
+                lead_code=lead.lead_code,
+                status=status,
+                base_snapshot=snapshot,
+                current_revision=1,
+                submitted_revision=1 if lead.approver_status else None,
+                approved_revision=1 if lead.approver_status == "APPROVED" else None,
+                total=snapshot.get("grand_total", lead.total_estimated_cost),
+                created_by=lead.sales_executive_id,
+                created_at=lead.quotation_created_at or lead.approver_request_at or lead.lead_created_at
+            )
+            db.add(quotation)
+            db.flush()
+            if not quotation.quotation_code:
+                quotation.quotation_code = f"Q-{quotation.id:04d}"
+                lead.quotation_id = quotation.quotation_code
+            db.add(QuotationRevision(
+                quotation_id=quotation.id, revision=1, total=quotation.total,
+                created_by=quotation.created_by, created_at=quotation.created_at
+            ))
+            backfilled += 1
+
+        db.commit()
+
+    print(f"✓ Backfilled quotations for {backfilled} leads")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,150 @@
+"""
+Throughput of one hot read (the team lead's pending approvals page) served by
+a sync def route on the threadpool vs an async def route on the async engine,
+at the same number of uvicorn workers and the same client concurrency
+
+Usage: python benchmarks/bench_async.py [--workers 4] [--concurrency 200] [--requests 5000] [--threads 40]
+
+Read-only; uses the database from DATABASE_URI (and its async twin, see
+database.py). Point it at MySQL to see the difference: with SQLite the
+queries never wait on the network, which is where the threadpool runs out.
+--threads is the anyio threadpool size of each worker (40 by default).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+sys.path.append('.')
+
+import anyio.to_thread
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import get_db, get_async_db
+from models import Lead, User
+
+PAGE_SIZE = 50
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    # Same threadpool size in every run (anyio's default is 40)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("BENCH_THREADS", "40"))
+    yield
+
+
+app = FastAPI(lifespan=_lifespan)
+
+
+def _serialize(leads, users):
+    names = {u.id: u.full_name or u.username for u in users}
+    return [{
+        "lead_id": lead.id,
+        "client_name": lead.customer_name,
+        "sales_rep_name": names.get(int(lead.sales_executive_id or 0) if (lead.sales_executive_id or "").isdigit() else 0, "Unknown"),
+    } for lead in leads]
+
+
+def _executive_ids(leads):
+    return {int(lead.sales_executive_id) for lead in leads if (lead.sales_executive_id or "").isdigit()}
+
+
+@app.get("/sync/pending-approvals")
+def sync_pending_approvals(db: Session = Depends(get_db)):
+    leads = db.query(Lead).filter(Lead.approver_status == "PENDING").order_by(Lead.id).limit(PAGE_SIZE).all()
+    users = db.query(User).filter(User.id.in_(_executive_ids(leads))).all()
+    return _serialize(leads, users)
+
+
+@app.get("/async/pending-approvals")
+async def async_pending_approvals(db: AsyncSession = Depends(get_async_db)):
+    leads = (await db.execute(
+        select(Lead).filter(Lead.approver_status == "PENDING").order_by(Lead.id).limit(PAGE_SIZE)
+    )).scalars().all()
+    users = (await db.execute(select(User).filter(User.id.in_(_executive_ids(leads))))).scalars().all()
+    return _serialize(leads, users)
+
+
+# ==========================================
+# Load generator
+# ==========================================
+async def _load(url: str, requests: int, concurrency: int):
+    import httpx
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def client_loop(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        await client.get(url)  # Warm up connection pools
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000, errors
+
+
+def _wait_until_up(port: int, timeout: float = 30):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("benchmark server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async route throughput")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_async:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env={**os.environ, "BENCH_THREADS": str(args.threads), "PYTHONPATH": os.getcwd()}
+    )
+    try:
+        _wait_until_up(args.port)
+        print(f"{args.workers} workers, {args.threads} threads each, {args.concurrency} concurrent clients")
+        results = {}
+        for mode in ("sync", "async"):
+            url = f"http://127.0.0.1:{args.port}/{mode}/pending-approvals"
+            rps, p50, p99, errors = asyncio.run(_load(url, args.requests, args.concurrency))
+            results[mode] = rps
+            print(f"{mode:<6} {rps:9,.0f} requests/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   errors {errors}")
+        print(f"\n✓ async/sync throughput: {results['async'] / results['sync']:.2f}x")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Auth overhead per request: get_current_user before (jwt.decode on every
+call) and after the verified-claims cache (utils/auth_cache.py)
+
+Usage: python benchmarks/bench_auth.py [--requests 20000] [--tokens 50]
+
+Uses the database from DATABASE_URI only for the revocation set, which is
+loaded once and then refreshed every REVOCATION_REFRESH_SECONDS.
+"""
+import argparse
+import sys
+import time
+sys.path.append('.')
+
+from database import engine
+from models import TokenRevocation
+from utils.auth_cache import claims_cache, revocations
+from utils.security import create_access_token, get_current_user, verify_access_token
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--requests", type=int, default=20000)
+parser.add_argument("--tokens", type=int, default=50, help="distinct users sending requests")
+args = parser.parse_args()
+
+TokenRevocation.__table__.create(bind=engine, checkfirst=True)
+tokens = [
+    create_access_token({"sub": f"user{i}", "role": "sales_executive", "user_id": i,
+                         "sales_executive_id": f"user{i}", "store_assigned": "Palakad"})
+    for i in range(args.tokens)
+]
+
+
+def uncached(token):
+    # get_current_user as it was: decode and rebuild the dict every time
+    return dict(verify_access_token(token)[1])
+
+
+def run(label, fn):
+    start = time.perf_counter()
+    for i in range(args.requests):
+        fn(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / args.requests * 1e6
+    print(f"{label:<28} {per_call:8.1f} µs/request  ({args.requests / elapsed:,.0f} requests/s)")
+    return per_call
+
+
+revocations.refresh()
+before = run("before (jwt.decode)", uncached)
+claims_cache.clear()
+after = run("after (claims cache)", get_current_user)
+print(f"\n✓ {before / after:.1f}x less auth overhead per request ({len(claims_cache)} tokens cached)")
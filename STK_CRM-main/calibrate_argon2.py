@@ -0,0 +1,57 @@
+"""
+Pick argon2 parameters for a target hashing latency on this machine
+
+Usage: python calibrate_argon2.py [--target-ms 250] [--parallelism 4]
+
+Doubles memory_cost (starting at 19 MiB) and then raises time_cost until one
+hash takes about --target-ms, and prints the ARGON2_* environment variables
+read by utils/password_service.py. Run it on the production host: logins
+cost one hash each, and the password pool runs PASSWORD_POOL_WORKERS of them
+at a time per gunicorn worker.
+"""
+import argparse
+import sys
+import time
+sys.path.append('.')
+
+from utils.password_service import make_context
+
+MAX_MEMORY_COST = 1024 * 1024  # KiB
+
+
+def time_hash(time_cost: int, memory_cost: int, parallelism: int, rounds: int = 3) -> float:
+    """ Median ms per hash """
+    context = make_context(
+        argon2__time_cost=time_cost, argon2__memory_cost=memory_cost, argon2__parallelism=parallelism
+    )
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--target-ms", type=float, default=250)
+parser.add_argument("--parallelism", type=int, default=4)
+args = parser.parse_args()
+
+time_cost, memory_cost = 2, 19 * 1024
+elapsed = time_hash(time_cost, memory_cost, args.parallelism)
+print(f"  t={time_cost} m={memory_cost}KiB: {elapsed:.0f} ms")
+
+while elapsed * 2 <= args.target_ms and memory_cost * 2 <= MAX_MEMORY_COST:
+    memory_cost *= 2
+    elapsed = time_hash(time_cost, memory_cost, args.parallelism)
+    print(f"  t={time_cost} m={memory_cost}KiB: {elapsed:.0f} ms")
+
+while elapsed * (time_cost + 1) / time_cost <= args.target_ms:
+    time_cost += 1
+    elapsed = time_hash(time_cost, memory_cost, args.parallelism)
+    print(f"  t={time_cost} m={memory_cost}KiB: {elapsed:.0f} ms")
+
+print(f"\n✓ {elapsed:.0f} ms per hash (target {args.target_ms:.0f} ms)")
+print(f"ARGON2_TIME_COST={time_cost}")
+print(f"ARGON2_MEMORY_COST={memory_cost}")
+print(f"ARGON2_PARALLELISM={args.parallelism}")
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -17,3 +19,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ==========================================
+# Async engine (async def routes)
+# ==========================================
+# Same database through an async driver: mysql+pymysql -> mysql+aiomysql,
+# sqlite -> sqlite+aiosqlite (local runs and tests). ASYNC_DATABASE_URI overrides.
+# Built on first use, so scripts that only use the sync engine need no async driver.
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+_async_sessionmaker = None
+
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}; set ASYNC_DATABASE_URI")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        async_engine = create_async_engine(
+            os.getenv("ASYNC_DATABASE_URI") or async_database_url(DATABASE_URL), pool_pre_ping=True
+        )
+        _async_sessionmaker = async_sessionmaker(
+            async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -0,0 +1,53 @@
+"""
+Bulk-import leads from a CSV or NDJSON marketplace feed
+
+Usage:
+    python import_leads.py leads.csv --sales-executive-id 12
+    python import_leads.py feed.ndjson --sales-executive-id 12 --report report.json
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import time
+
+from database import SessionLocal
+from utils.lead_import import import_leads, detect_format, SUPPORTED_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import leads")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--sales-executive-id", required=True, help="users.id that will own the leads")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--report", help="Write the per-row report to this JSON file")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format("", args.path)
+    db = SessionLocal()
+    started = time.perf_counter()
+
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = import_leads(db, stream, fmt, str(args.sales_executive_id))
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Imported {report['created']} of {report['total']} rows in {elapsed:.1f}s")
+
+    failures = [r for r in report["results"] if r["status"] == "error"]
+    for r in failures[:20]:
+        print(f"  ✗ row {r['row']}: {r['errors']}")
+    if len(failures) > 20:
+        print(f"  ... {len(failures) - 20} more errors")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,14 @@ import uvicorn
 # Import Database and Models
 from database import engine, Base
 import models  # <--- CRITICAL: Registers your new tables (Store, TeamMember) with Base
+import utils.change_tracking  # Registers the change_log flush listener used by /sync
+import utils.stats_snapshot  # Registers the status counter flush listener used by the dashboards
+import utils.catalog_snapshot  # Registers the catalog version bump used by /master-data
+import utils.leave_calendar  # Registers the leave_days sync used by attendance and leave queries
+import utils.principals  # Registers the principals sync used by /auth/login
 
 # Import Routers
-from routers import auth, dashboard, leads, master_data, quotations, catalog, store_manager, teamlead, attendance, director_dashboard
+from routers import auth, dashboard, leads, master_data, quotations, catalog, store_manager, teamlead, attendance, director_dashboard, sync
 
 # Create tables
 # This will now see the new tables in models.py and create them in Postgres
@@ -24,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Keyset pagination cursor (utils/pagination.py)
 )
 
 # Routers
@@ -39,6 +45,7 @@ app.include_router(attendance.router)
 
 app.include_router(catalog.router)
 app.include_router(director_dashboard.router)
+app.include_router(sync.router)
 
 
 if __name__ == "__main__":
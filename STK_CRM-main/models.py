@@ -1,6 +1,7 @@
 # models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from database import Base
 from sqlalchemy import JSON   
 
@@ -18,6 +19,7 @@ class Category(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True)
+    is_active = Column(Boolean, default=True)  # False once dropped from the catalog CSV
 
     sub_categories = relationship("SubCategory", back_populates="category")
 
@@ -26,6 +28,7 @@ class SubCategory(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(100))
     category_id = Column(Integer, ForeignKey("categories.id"))
+    is_active = Column(Boolean, default=True)
 
     category = relationship("Category", back_populates="sub_categories")
     products = relationship("Product", back_populates="sub_category")
@@ -37,7 +40,12 @@ class Product(Base):
     name = Column(String(100))
     price_str = Column(String(50))
     price_bar = Column(String(50))
+    # Typed copies of price_str / price_bar, kept in step by the catalog sync
+    price = Column(Integer, nullable=True)
+    price_min = Column(Integer, nullable=True)
+    price_max = Column(Integer, nullable=True)
     sub_category_id = Column(Integer, ForeignKey("sub_categories.id"))
+    is_active = Column(Boolean, default=True)
 
     sub_category = relationship("SubCategory", back_populates="products")
 class Component(Base):
@@ -46,6 +54,7 @@ class Component(Base):
     name = Column(String(100))
     type = Column(String(30))  # CHANNEL / ACCESSORY / GRID_TYPE
     sub_category_id = Column(Integer, ForeignKey("sub_categories.id"))
+    is_active = Column(Boolean, default=True)
 
     sub_category = relationship("SubCategory", back_populates="components")
     variants = relationship("ComponentVariant", back_populates="component")
@@ -57,9 +66,30 @@ class ComponentVariant(Base):
     brand_name = Column(String(100))
     variant = Column(String(50))
     price_range = Column(String(50))
+    # Typed copies of price_range ("115-110": price 115, min 110, max 115)
+    price = Column(Integer, nullable=True)
+    price_min = Column(Integer, nullable=True)
+    price_max = Column(Integer, nullable=True)
+    is_active = Column(Boolean, default=True)
 
     component = relationship("Component", back_populates="variants")
 
+class PriceHistory(Base):
+    """ Effective-dated prices per catalog item; a row applies until the next one for the same item """
+    __tablename__ = "price_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_type = Column(String(20), nullable=False)   # "product" / "variant"
+    item_id = Column(Integer, nullable=False)
+    price = Column(Integer, nullable=True)
+    price_min = Column(Integer, nullable=True)
+    price_max = Column(Integer, nullable=True)
+    effective_from = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_price_history_item_effective", "item_type", "item_id", "effective_from"),
+    )
+
 class Lead(Base):
     __tablename__ = "leads"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -67,6 +97,7 @@ class Lead(Base):
     lead_created_at = Column(DateTime(timezone=True))
     customer_name = Column(String(100))
     phone = Column(String(20))
+    phone_key = Column(String(20), nullable=True, index=True)  # Normalized digits (see utils.customer_lookup)
     source = Column(String(50))
     location = Column(String(100))
     district = Column(String(50))
@@ -101,6 +132,18 @@ class Lead(Base):
     approver_response_at = Column(DateTime(timezone=True))
     customer_quotation_sent_at = Column(DateTime(timezone=True))
     last_action = Column(String(100), nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_leads_sales_executive_status", "sales_executive_id", "status"),
+        Index("ix_leads_sales_executive_created", "sales_executive_id", "lead_created_at"),
+    )
+
+class LeadCodeCounter(Base):
+    __tablename__ = "lead_code_counters"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    next_value = Column(Integer, nullable=False)  # First number not yet handed out
 
 class FollowUp(Base):
     __tablename__ = "followups"
@@ -112,6 +155,12 @@ class FollowUp(Base):
     reasons = Column(String(255))
     stage_selected_at = Column(DateTime(timezone=True))
     followup_updated_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
+
+    # Latest follow-up per lead is MAX(id) WHERE lead_code = ? (utils/followup_inbox.py)
+    __table_args__ = (
+        Index("ix_followups_lead_code_id", "lead_code", "id"),
+    )
 
 class StoreManagerDashboard(Base):
     __tablename__ = "store_manager_dashboard"
@@ -144,6 +193,7 @@ class StoreManagerDashboard(Base):
     dispatch_received_amount = Column(Integer, nullable=True)
     delivery_received_amount = Column(Integer, nullable=True) # Money collected at doorstep
     delivery_payment_mode = Column(String(50), nullable=True) # Cash/Online
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
 class Attendance(Base):
     __tablename__ = "attendance"
@@ -152,16 +202,22 @@ class Attendance(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     
     date = Column(DateTime) # Stores the date of attendance
+    attendance_date = Column(Date, nullable=True)  # date as a Date: one row per user per day
     check_in = Column(DateTime)
     check_out = Column(DateTime, nullable=True)
     
     status = Column(String(20)) # "Present", "Late", "Half Day", "On Leave"
     location = Column(String(100)) # "Office", "Client Site"
     is_late = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
     # Optional: Relationship back to User if needed
     # user = relationship("User") 
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "attendance_date", name="uq_attendance_user_date"),
+    )
+
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
 
@@ -178,6 +234,182 @@ class LeaveRequest(Base):
     handover_plan = Column(JSON, nullable=True)
     rejection_reason = Column(String(255), nullable=True)
     approved_by = Column(Integer, nullable=True) # ID of the Team Lead who approved it
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_leave_requests_user_status_start", "user_id", "status", "start_date"),
+    )
+
+class LeaveDay(Base):
+    """ One row per calendar day of an approved leave (see utils/leave_calendar.py) """
+    __tablename__ = "leave_days"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    leave_id = Column(Integer, ForeignKey("leave_requests.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "leave_id", name="uq_leave_days_user_day_leave"),
+        Index("ix_leave_days_day_user", "day", "user_id"),
+    )
+
+class Quotation(Base):
+    """ One quotation for a lead; its documents live in quotation_revisions (see utils/quotation_store.py) """
+    __tablename__ = "quotations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    quotation_code = Column(String(50), index=True)  # Client-facing id ("#Q-1001"), mirrored in Lead.quotation_id
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
+    lead_code = Column(String(20))
+    status = Column(String(20), default="DRAFT")  # DRAFT / PENDING / APPROVED / REJECTED / SENT
+
+    base_snapshot = Column(JSON, nullable=False)  # Document of revision 1
+    current_revision = Column(Integer, nullable=False, default=1)
+    submitted_revision = Column(Integer, nullable=True)  # Revision sent for approval
+    approved_revision = Column(Integer, nullable=True)
+    total = Column(Integer, nullable=True)  # grand_total of the current revision
+
+    created_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_quotations_lead_created", "lead_id", "created_at"),
+        Index("ix_quotations_status_updated", "status", "updated_at"),
+        Index("ix_quotations_created_at", "created_at"),
+    )
+
+class QuotationRevision(Base):
+    """ Compact diff against the previous revision, plus a full checkpoint every few revisions """
+    __tablename__ = "quotation_revisions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    quotation_id = Column(Integer, ForeignKey("quotations.id"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    diff = Column(JSON, nullable=True)         # None for revision 1 (quotations.base_snapshot)
+    checkpoint = Column(JSON, nullable=True)   # Full document on checkpoint revisions
+    total = Column(Integer, nullable=True)
+    note = Column(String(255), nullable=True)
+    created_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("quotation_id", "revision", name="uq_quotation_revisions"),
+    )
+
+class RenderJob(Base):
+    """ Queue of quotation documents to render (see utils/render_queue.py and render_worker.py) """
+    __tablename__ = "render_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
+    quotation_id = Column(Integer, ForeignKey("quotations.id"), nullable=True)  # None: legacy lead snapshot
+    revision = Column(Integer, nullable=True)
+    format = Column(String(10), default="html")
+    status = Column(String(20), default="QUEUED")  # QUEUED / RUNNING / DONE / FAILED
+    attempts = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True)  # Key in the document store once DONE
+    context_key = Column(String(64), nullable=True)   # Hash of the customer details rendered (render_queue.context_key)
+    error = Column(String(500), nullable=True)
+    requested_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_render_jobs_status_id", "status", "id"),
+        Index("ix_render_jobs_quotation_revision", "quotation_id", "revision"),
+    )
+
+class LeadEvent(Base):
+    """ Append-only history of lead state transitions (timeline / time tracking) """
+    __tablename__ = "lead_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
+    lead_code = Column(String(20))
+    store = Column(String(100), nullable=True)              # Sales executive's store at event time
+    sales_executive_id = Column(String(50), nullable=True)  # Lead owner at event time
+
+    event_type = Column(String(50), nullable=False)  # "Lead Created", "Sent for Approval", ...
+    occurred_at = Column(DateTime, nullable=False)
+    amount = Column(Integer, nullable=True)
+    status = Column(String(20), default="Completed")
+    actor_id = Column(String(50), nullable=True)
+    details = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_lead_events_store_occurred_at", "store", "occurred_at"),
+        Index("ix_lead_events_lead_occurred_at", "lead_id", "occurred_at"),
+    )
+
+class DailyExecRollup(Base):
+    """ Per executive, store and day counters, bumped on each lead transition """
+    __tablename__ = "daily_exec_rollup"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sales_executive_id = Column(String(50), nullable=False)
+    store = Column(String(100), nullable=False, default="")
+    day = Column(Date, nullable=False)
+
+    leads_created = Column(Integer, nullable=False, default=0)
+    quotations = Column(Integer, nullable=False, default=0)
+    approvals = Column(Integer, nullable=False, default=0)
+    handovers = Column(Integer, nullable=False, default=0)
+    deliveries = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)  # Sum of total_estimated_cost of leads created that day
+
+    __table_args__ = (
+        UniqueConstraint("sales_executive_id", "day", "store", name="uq_daily_exec_rollup"),
+    )
+
+class StatusCounter(Base):
+    """ Row counts per (entity, store, status), kept current by utils/stats_snapshot.py """
+    __tablename__ = "status_counters"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(30), nullable=False)     # "lead" / "store_order"
+    store = Column(String(100), nullable=False, default="")
+    status = Column(String(50), nullable=False, default="")
+    shard = Column(Integer, nullable=False, default=0)   # Spreads hot keys over several rows
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("entity", "store", "status", "shard", name="uq_status_counters"),
+    )
+
+class CacheVersion(Base):
+    """ Version stamp per cached dataset; bumped by writers, polled by the in-process caches """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ChangeLog(Base):
+    """ One row per insert/update/delete of a synced table """
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(30), nullable=False)   # "lead", "followup", "store_order", ...
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)       # "upsert" / "delete"
+
+    # Scoping keys so /sync can filter by caller without touching the source tables
+    owner_id = Column(String(50), nullable=True)  # sales_executive_id / user_id
+    lead_code = Column(String(20), nullable=True)
+    store = Column(String(100), nullable=True)
+
+    changed_at = Column(DateTime, nullable=False)
+    # Assigned once the row is committed (utils/change_tracking.stamp_committed); (commit_seq, id) is the /sync cursor
+    commit_seq = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_change_log_commit_seq", "commit_seq", "id"),
+        Index("ix_change_log_owner_id", "owner_id", "id"),
+        Index("ix_change_log_lead_code_id", "lead_code", "id"),
+        Index("ix_change_log_store_id", "store", "id"),
+    )
 
 class TeamLeadStaff(Base):
     __tablename__ = "team_lead_staff"
@@ -201,3 +433,63 @@ class StoreManagerStaff(Base):
     store_assigned = Column(String(50), nullable=False)
     created_at = Column(DateTime(timezone=True))
 
+class Principal(Base):
+    """ Login name -> account in users / team_lead_staff / store_manager_staff (see utils/principals.py) """
+    __tablename__ = "principals"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    login_name = Column(String(50), nullable=False, unique=True)
+    source = Column(String(20), nullable=False)  # "user" / "team_lead" / "store_manager"
+    source_id = Column(Integer, nullable=False)
+    role = Column(String(30))
+    hashed_password = Column(String(255))
+    store_assigned = Column(String(50), nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("source", "source_id", name="uq_principals_source"),
+    )
+
+
+class TokenRevocation(Base):
+    """
+    Revoked access/refresh tokens (see utils/auth_cache.py): either one token
+    by jti (logout) or every token of a login name issued before not_before
+    (password change). Rows are only needed until expires_at.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64), nullable=True, unique=True)
+    login_name = Column(String(50), nullable=True)
+    not_before = Column(Integer, nullable=True)  # Unix seconds; tokens with iat < not_before are revoked
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index("ix_token_revocations_expires_at", "expires_at"),
+    )
+
+class RefreshToken(Base):
+    """
+    One row per issued refresh token, stored as its sha256 (see utils/refresh_tokens.py).
+    A family is one login on one device; each refresh rotates the token within it.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    family_id = Column(String(32), nullable=False)
+    source = Column(String(20), nullable=False)  # principals.source
+    source_id = Column(Integer, nullable=False)
+    device = Column(String(200), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    rotated_at = Column(DateTime, nullable=True)  # Set when exchanged; presenting it again is reuse
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family", "family_id"),
+        Index("ix_refresh_tokens_source", "source", "source_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
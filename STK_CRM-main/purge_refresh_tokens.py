@@ -0,0 +1,48 @@
+"""
+Delete expired refresh tokens in batches
+
+Run periodically (it also creates the table):
+    python purge_refresh_tokens.py                      # one pass
+    python purge_refresh_tokens.py --every 3600         # keep purging every hour
+    python purge_refresh_tokens.py --batch-size 500     # smaller transactions
+
+Rotated and revoked tokens are kept until they expire so reuse is still
+detected; each batch is its own short transaction so logins and refreshes
+are not held up behind a long delete.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import time
+
+from database import engine, SessionLocal, Base
+import models
+from utils.refresh_tokens import purge_expired, PURGE_BATCH_SIZE
+
+
+def purge_once(batch_size: int):
+    db = SessionLocal()
+    try:
+        purged = purge_expired(db, batch_size=batch_size)
+        print(f"✓ Purged {purged} expired refresh tokens")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge expired refresh tokens")
+    parser.add_argument("--every", type=int, help="Repeat every N seconds instead of running once")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    while True:
+        purge_once(args.batch_size)
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
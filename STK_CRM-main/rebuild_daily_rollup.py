@@ -0,0 +1,123 @@
+"""
+Create daily_exec_rollup and recompute it from leads and store orders
+
+Usage:
+    python rebuild_daily_rollup.py                       # everything
+    python rebuild_daily_rollup.py --from 2025-01-01 --to 2025-01-31
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+from datetime import datetime
+
+from sqlalchemy import text, insert
+
+from database import engine, SessionLocal, Base
+import models
+from models import Lead, StoreManagerDashboard, User, DailyExecRollup
+from utils.lead_events import (
+    lead_event_row, LEAD_CREATED, QUOTATION_GENERATED, QUOTATION_APPROVED, HANDED_OVER, DELIVERED
+)
+from utils.rollup import add_deltas, creation_owners, ROLLUP_COUNTERS
+
+BATCH_SIZE = 1000
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily performance rollup")
+    parser.add_argument("--from", dest="start", type=parse_day, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=parse_day, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(
+                "CREATE INDEX ix_leads_sales_executive_created ON leads (sales_executive_id, lead_created_at)"
+            ))
+            conn.commit()
+            print("✓ Created index ix_leads_sales_executive_created on leads")
+        except Exception as e:
+            if "already exists" in str(e) or "duplicate key name" in str(e).lower():
+                print("✓ Index ix_leads_sales_executive_created already exists on leads")
+            else:
+                print(f"✗ Error creating ix_leads_sales_executive_created: {e}")
+
+    def in_range(ts):
+        if ts is None:
+            return False
+        day = ts.date()
+        return (args.start is None or day >= args.start) and (args.end is None or day <= args.end)
+
+    db = SessionLocal()
+    try:
+        store_by_user = {str(u.id): u.store_assigned for u in db.query(User.id, User.store_assigned)}
+        acc = {}
+        last_id = 0
+
+        while True:
+            leads = db.query(Lead).filter(Lead.id > last_id).order_by(Lead.id).limit(BATCH_SIZE).all()
+            if not leads:
+                break
+            last_id = leads[-1].id
+            store_entries = {
+                e.lead_code: e for e in db.query(StoreManagerDashboard).filter(
+                    StoreManagerDashboard.lead_code.in_([l.lead_code for l in leads])
+                )
+            }
+
+            owners = creation_owners(db, leads, store_by_user)
+
+            for lead in leads:
+                store = store_by_user.get(lead.sales_executive_id)
+
+                def event(event_type, ts):
+                    return lead_event_row(lead, event_type, ts, store=store)
+
+                if in_range(lead.lead_created_at):
+                    # Under the creator, like the live rollup (reassignment doesn't move these)
+                    se_id, created_store = owners[lead.id]
+                    created = dict(lead_event_row(lead, LEAD_CREATED, lead.lead_created_at, store=created_store),
+                                   sales_executive_id=se_id)
+                    add_deltas(acc, created, leads_created=1, revenue=lead.total_estimated_cost or 0)
+                if lead.quotation_id and in_range(lead.quotation_created_at):
+                    add_deltas(acc, event(QUOTATION_GENERATED, lead.quotation_created_at), quotations=1)
+                if lead.approver_status == "APPROVED" and in_range(lead.approver_response_at):
+                    add_deltas(acc, event(QUOTATION_APPROVED, lead.approver_response_at), approvals=1)
+
+                entry = store_entries.get(lead.lead_code)
+                if entry and in_range(entry.handover_at):
+                    add_deltas(acc, event(HANDED_OVER, entry.handover_at), handovers=1)
+                if entry and entry.status == "Delivered" and in_range(entry.delivered_at):
+                    add_deltas(acc, event(DELIVERED, entry.delivered_at), deliveries=1)
+
+        clear = db.query(DailyExecRollup)
+        if args.start:
+            clear = clear.filter(DailyExecRollup.day >= args.start)
+        if args.end:
+            clear = clear.filter(DailyExecRollup.day <= args.end)
+        removed = clear.delete(synchronize_session=False)
+
+        rows = [
+            dict(sales_executive_id=se_id, store=store, day=day,
+                 **{counter: deltas.get(counter, 0) for counter in ROLLUP_COUNTERS})
+            for (se_id, store, day), deltas in acc.items() if deltas
+        ]
+        for i in range(0, len(rows), BATCH_SIZE):
+            db.execute(insert(DailyExecRollup.__table__), rows[i:i + BATCH_SIZE])
+        db.commit()
+
+        print(f"✓ Replaced {removed} rollup rows with {len(rows)} rebuilt rows")
+    finally:
+        db.close()
+
+    print("\nDatabase migration completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Create leave_days and rebuild it from the approved leave_requests
+
+Run once after deploying; afterwards the flush listener in
+utils/leave_calendar.py keeps it current.
+"""
+import sys
+sys.path.append('.')
+
+from sqlalchemy import delete
+
+from database import engine, SessionLocal, Base
+import models
+from models import LeaveDay, LeaveRequest
+from utils.leave_calendar import leave_day_rows, replace_leave_days, APPROVED
+
+BATCH_SIZE = 500
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+    db.execute(delete(LeaveDay))
+    last_id = 0
+    leaves = days = 0
+
+    while True:
+        batch = db.query(LeaveRequest).filter(
+            LeaveRequest.id > last_id, LeaveRequest.status == APPROVED
+        ).order_by(LeaveRequest.id).limit(BATCH_SIZE).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        rows = [row for leave in batch for row in leave_day_rows(leave)]
+        replace_leave_days(db.connection(), [], rows)
+        leaves += len(batch)
+        days += len(rows)
+
+    db.commit()
+    print(f"✓ Rebuilt leave_days: {days} days from {leaves} approved leaves")
+finally:
+    db.close()
+
+print("\nDatabase migration completed!")
@@ -0,0 +1,59 @@
+"""
+Recount status_counters from leads and store orders and fix any drift
+
+Run once after deploying (it also creates the tables), then periodically:
+    python reconcile_stats.py                # one pass
+    python reconcile_stats.py --every 900    # keep reconciling every 15 minutes
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import time
+
+from database import engine, SessionLocal, Base
+import models
+from models import StatusCounter
+from utils.stats_snapshot import recount, load_counters, apply_counter_deltas
+
+
+def reconcile_once():
+    db = SessionLocal()
+    try:
+        # Lock the counters so concurrent writers queue behind the correction
+        db.query(StatusCounter).with_for_update().all()
+        expected = recount(db)
+        current = load_counters(db)
+
+        drift = {}
+        for key in set(expected) | set(current):
+            diff = expected.get(key, 0) - current.get(key, 0)
+            if diff:
+                drift[key] = diff
+
+        if apply_counter_deltas(db.connection(), drift):
+            db.info["stats_changed"] = True
+        db.commit()
+
+        for (entity, store, status), diff in sorted(drift.items()):
+            print(f"  {entity} / {store or '-'} / {status or '-'}: {diff:+d}")
+        print(f"✓ Reconciled status counters ({len(drift)} corrected)")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile dashboard status counters")
+    parser.add_argument("--every", type=int, help="Repeat every N seconds instead of running once")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    while True:
+        reconcile_once()
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Render queued quotation documents (render_jobs) in a process pool
+
+Run next to the API (it also creates the tables):
+    python render_worker.py                 # keep polling the queue
+    python render_worker.py --workers 4     # pool size (default: CPU count)
+    python render_worker.py --once          # drain the queue and exit
+
+Several worker processes on different hosts can share one queue; each job
+is claimed by exactly one of them. QUOTE_STORE_DIR must be an absolute path
+on storage shared with the API (see utils/document_store.py).
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import engine, SessionLocal, Base
+import models
+from utils import document_store
+from utils.render_queue import (
+    requeue_stale, claim_jobs, job_context, context_key, render_to_store, finish_job, fail_job
+)
+
+POLL_SECONDS = float(os.getenv("RENDER_POLL_SECONDS", "1"))
+
+
+def run_batch(pool, batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        job_ids = claim_jobs(db, batch_size)
+        futures = {}
+        for job_id in job_ids:
+            try:
+                fmt, context = job_context(db, job_id)
+                futures[job_id] = (pool.submit(render_to_store, fmt, context), context_key(context))
+            except Exception as e:
+                db.rollback()
+                fail_job(db, job_id, f"{type(e).__name__}: {e}")
+        db.rollback()  # Release the read snapshot while the pool renders
+
+        for job_id, (future, key) in futures.items():
+            try:
+                finish_job(db, job_id, future.result(), key)
+            except Exception as e:
+                db.rollback()
+                fail_job(db, job_id, f"{type(e).__name__}: {e}")
+        return len(job_ids)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render queued quotation documents")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Render processes")
+    parser.add_argument("--batch-size", type=int, help="Jobs claimed per poll (default: 4 per process)")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+    batch_size = args.batch_size or args.workers * 4
+
+    try:
+        document_store.store_dir()
+    except RuntimeError as e:
+        sys.exit(f"✗ {e}")
+
+    Base.metadata.create_all(bind=engine)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rendered = 0
+        last_stale_check = 0.0
+        while True:
+            if time.monotonic() - last_stale_check > 60:
+                db = SessionLocal()
+                try:
+                    requeue_stale(db)
+                finally:
+                    db.close()
+                last_stale_check = time.monotonic()
+
+            done = run_batch(pool, batch_size)
+            rendered += done
+            if done:
+                continue
+            if args.once:
+                break
+            time.sleep(POLL_SECONDS)
+
+    print(f"✓ Rendered {rendered} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
 from typing import List
-from datetime import datetime, time, date
+from datetime import datetime, date
 
 from database import get_db
-from models import User, Attendance, LeaveRequest, Lead
+from models import User, LeaveRequest, Lead
 from schemas import (
     CheckInRequest, 
     TodayAttendanceSummary, 
@@ -16,15 +15,17 @@ from schemas import (
     MonthlyAttendanceReport,
     HandoverCandidateResponse,
     ColleagueResponse,
-    LeaveHistoryItem,
-    LateHistoryItem
+    LeaveCoverageDay
 )
 from utils.security import get_current_user
+from utils.pagination import PageParams, keyset_page, set_next_cursor
+from utils.reassignment import reassign_leads, summarize
+from utils.attendance_monitor import check_in, check_out, today_snapshot
+from utils.attendance_reports import monthly_reports
+from utils.leave_calendar import available_colleagues, coverage, MAX_LEAVE_DAYS
 
 router = APIRouter(prefix="/attendance", tags=["Attendance & Leaves"])
 
-OFFICE_START_TIME = time(9, 30) # 9:30 AM is the cutoff for "Late"
-
 # ==========================================
 # 1. SALES EXECUTIVE: Check-In / Check-Out
 # ==========================================
@@ -35,33 +36,14 @@ def mark_check_in(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    user_id = current_user["user_id"]
-    today = datetime.now().date()
     now = datetime.now()
+    attendance, created = check_in(db, current_user["user_id"], data.location, now)
 
-    existing = db.query(Attendance).filter(
-        Attendance.user_id == user_id,
-        func.date(Attendance.date) == today
-    ).first()
-
-    if existing:
-        return {"message": "Already checked in today", "status": existing.status}
-
-    is_late = now.time() > OFFICE_START_TIME
-    status = "Late" if is_late else "Present"
+    if not created:
+        return {"message": "Already checked in today", "status": attendance.status}
 
-    attendance = Attendance(
-        user_id=user_id,
-        date=today,
-        check_in=now,
-        location=data.location,
-        status=status,
-        is_late=is_late
-    )
-    db.add(attendance)
     db.commit()
-
-    return {"message": f"Checked in successfully at {now.strftime('%I:%M %p')}", "status": status}
+    return {"message": f"Checked in successfully at {now.strftime('%I:%M %p')}", "status": attendance.status}
 
 
 @router.post("/check-out")
@@ -69,18 +51,11 @@ def mark_check_out(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    user_id = current_user["user_id"]
-    today = datetime.now().date()
-
-    entry = db.query(Attendance).filter(
-        Attendance.user_id == user_id,
-        func.date(Attendance.date) == today
-    ).first()
+    entry = check_out(db, current_user["user_id"])
 
     if not entry:
         raise HTTPException(400, "You haven't checked in yet")
 
-    entry.check_out = datetime.now()
     db.commit()
     return {"message": "Checked out successfully"}
 
@@ -95,47 +70,30 @@ def get_todays_attendance(
     current_user: dict = Depends(get_current_user)
 ):
     my_store = current_user.get("store_assigned")
-    today = datetime.now().date()
-
-    staff = db.query(User).filter(
-        User.store_assigned == my_store,
-        User.role == "sales_executive"
-    ).all()
 
     logs = []
     present_count = 0
     late_count = 0
     absent_count = 0
 
-    for se in staff:
-        att = db.query(Attendance).filter(
-            Attendance.user_id == se.id,
-            func.date(Attendance.date) == today
-        ).first()
-
-        on_leave = db.query(LeaveRequest).filter(
-            LeaveRequest.user_id == se.id,
-            LeaveRequest.status == "Approved",
-            LeaveRequest.start_date <= datetime.now(),
-            LeaveRequest.end_date >= datetime.now()
-        ).first()
-
+    # Staff, today's attendance and approved leaves in one statement
+    for row in today_snapshot(db, my_store):
         status = "Absent"
         check_in_str = "--"
         check_out_str = "--"
         location_str = "--"
 
-        if att:
-            status = att.status 
-            check_in_str = att.check_in.strftime("%I:%M %p")
-            if att.check_out:
-                check_out_str = att.check_out.strftime("%I:%M %p")
-            location_str = att.location
+        if row.check_in:
+            status = row.status 
+            check_in_str = row.check_in.strftime("%I:%M %p")
+            if row.check_out:
+                check_out_str = row.check_out.strftime("%I:%M %p")
+            location_str = row.location
             
-            if att.is_late: late_count += 1
+            if row.is_late: late_count += 1
             else: present_count += 1
         
-        elif on_leave:
+        elif row.on_leave:
             status = "On Leave"
             location_str = "Leave"
             absent_count += 1 
@@ -143,8 +101,8 @@ def get_todays_attendance(
             absent_count += 1 
 
         logs.append(AttendanceLogItem(
-            user_id=se.id,
-            name=se.username,
+            user_id=row.id,
+            name=row.username,
             role="Sales Executive",
             status=status,
             check_in=check_in_str,
@@ -188,6 +146,8 @@ def get_leads_for_handover(
 
 @router.get("/colleagues", response_model=List[ColleagueResponse])
 def get_available_colleagues(
+    start_date: date = None,  # When given, colleagues on leave in [start_date, end_date] are left out
+    end_date: date = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -195,11 +155,14 @@ def get_available_colleagues(
     my_store = current_user.get("store_assigned")
     my_id = current_user["user_id"]
 
-    colleagues = db.query(User).filter(
-        User.store_assigned == my_store,
-        User.role == "sales_executive",
-        User.id != my_id 
-    ).all()
+    if start_date:
+        colleagues = available_colleagues(db, my_store, start_date, end_date or start_date, exclude_user_id=my_id)
+    else:
+        colleagues = db.query(User).filter(
+            User.store_assigned == my_store,
+            User.role == "sales_executive",
+            User.id != my_id 
+        ).all()
 
     return [{
         "user_id": u.id, 
@@ -208,6 +171,20 @@ def get_available_colleagues(
     } for u in colleagues]
 
 
+@router.get("/leave-coverage", response_model=List[LeaveCoverageDay])
+def get_leave_coverage(
+    start_date: date,
+    end_date: date,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """ Per day: who in my store is on leave and how many sales execs are available """
+    if end_date < start_date: raise HTTPException(400, "end_date is before start_date")
+    if (end_date - start_date).days >= MAX_LEAVE_DAYS: raise HTTPException(400, "Range too long")
+
+    return coverage(db, current_user.get("store_assigned"), start_date, end_date)
+
+
 @router.post("/apply-leave")
 def apply_leave(
     data: CreateLeaveRequest,
@@ -238,33 +215,38 @@ def apply_leave(
 
 @router.get("/pending-leaves", response_model=List[PendingLeaveListItem])
 def get_pending_leaves(
+    response: Response,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     my_store = current_user.get("store_assigned")
     
-    # Get all pending leave requests
-    leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.status == "Pending"
-    ).all()
+    # Pending leave requests from staff of this store (store filter in SQL so pages stay full)
+    rows, next_cursor = keyset_page(
+        db.query(LeaveRequest, User).join(User, User.id == LeaveRequest.user_id).filter(
+            LeaveRequest.status == "Pending",
+            User.store_assigned == my_store
+        ),
+        [LeaveRequest.id], page, key=lambda row: [row[0].id]
+    )
+    set_next_cursor(response, next_cursor)
     
     result = []
-    for leave in leaves:
-        user = db.query(User).filter(User.id == leave.user_id).first()
-        if user and user.store_assigned == my_store:
-            # Count leads in handover plan
-            pending_leads = len(leave.handover_plan) if leave.handover_plan else 0
-            
-            result.append({
-                "leave_id": leave.id,
-                "user_name": user.full_name if user.full_name else user.username,
-                "role": user.role.replace("_", " ").title() if user.role else "Sales Executive",
-                "start_date": leave.start_date,
-                "end_date": leave.end_date,
-                "days_count": leave.days_count,
-                "pending_leads_count": pending_leads,
-                "reason": leave.reason
-            })
+    for leave, user in rows:
+        # Count leads in handover plan
+        pending_leads = len(leave.handover_plan) if leave.handover_plan else 0
+        
+        result.append({
+            "leave_id": leave.id,
+            "user_name": user.full_name if user.full_name else user.username,
+            "role": user.role.replace("_", " ").title() if user.role else "Sales Executive",
+            "start_date": leave.start_date,
+            "end_date": leave.end_date,
+            "days_count": leave.days_count,
+            "pending_leads_count": pending_leads,
+            "reason": leave.reason
+        })
     
     return result
 
@@ -331,26 +313,27 @@ def approve_leave_request(
     leave = db.query(LeaveRequest).filter(LeaveRequest.id == leave_id).first()
     if not leave: raise HTTPException(404, "Not found")
 
+    outcomes = []
     if action == "Approve":
         leave.status = "Approved"
         leave.approved_by = current_user["user_id"]
         
-        # ✅ EXECUTE TRANSFER
+        # ✅ EXECUTE TRANSFER (one UPDATE per colleague, see utils/reassignment.py)
         if leave.handover_plan:
-            for item in leave.handover_plan:
-                lead_id_to_move = item['lead_id']
-                new_sales_exec_id = str(item['to_user_id']) 
-                
-                # Update Lead Owner
-                lead_to_update = db.query(Lead).filter(Lead.id == lead_id_to_move).first()
-                if lead_to_update:
-                    lead_to_update.sales_executive_id = new_sales_exec_id
+            outcomes = reassign_leads(
+                db, [(item['lead_id'], item['to_user_id']) for item in leave.handover_plan],
+                actor_id=current_user["user_id"], details={"leave_id": leave.id}
+            )
                     
     elif action == "Reject":
         leave.status = "Rejected"
     
     db.commit()
-    return {"message": f"Leave request {action}d successfully"}
+    return {
+        "message": f"Leave request {action}d successfully",
+        "reassignment": summarize(outcomes),
+        "results": outcomes
+    }
 
 
 # ==========================================
@@ -377,77 +360,16 @@ def get_monthly_report_list(
     current_user: dict = Depends(get_current_user)
 ):
     my_store = current_user.get("store_assigned")
-    
-    query = db.query(User).filter(
-        User.store_assigned == my_store,
-        User.role == "sales_executive"
-    )
-    
-    if user_id:
-        query = query.filter(User.id == user_id)
-        
-    staff = query.all()
-    reports = []
-    
-    for user in staff:
-        reports.append(generate_monthly_report(db, user.id, month, year))
-        
-    return reports
+    if not 1 <= month <= 12: raise HTTPException(400, "Invalid month")
+    if not my_store: raise HTTPException(403, "No store assigned")
 
+    # Whole store in two queries (see utils/attendance_reports.py)
+    return monthly_reports(db, month, year, store=my_store, user_id=user_id)
 
-def generate_monthly_report(db: Session, user_id: int, month: int, year: int) -> MonthlyAttendanceReport:
-    target_user = db.query(User).filter(User.id == user_id).first()
-    if not target_user: raise HTTPException(404, "User not found")
 
-    attendance_records = db.query(Attendance).filter(
-        Attendance.user_id == user_id,
-        extract('month', Attendance.date) == month,
-        extract('year', Attendance.date) == year
-    ).all()
+def generate_monthly_report(db: Session, user_id: int, month: int, year: int) -> dict:
+    if not 1 <= month <= 12: raise HTTPException(400, "Invalid month")
 
-    leave_records = db.query(LeaveRequest).filter(
-        LeaveRequest.user_id == user_id,
-        LeaveRequest.status == "Approved",
-        extract('month', LeaveRequest.start_date) == month,
-        extract('year', LeaveRequest.start_date) == year
-    ).all()
-
-    days_present = 0
-    late_marks = 0
-    late_history_list = []
-
-    for att in attendance_records:
-        if att.status in ["Present", "Late", "On Duty"]:
-            days_present += 1
-        
-        if att.is_late:
-            late_marks += 1
-            late_history_list.append(LateHistoryItem(
-                date_str=att.date.strftime("%d %b"), 
-                time_str=att.check_in.strftime("%I:%M %p")
-            ))
-
-    leaves_taken = sum(l.days_count for l in leave_records)
-    leave_history_list = [LeaveHistoryItem(
-        date_str=l.start_date.strftime("%d %b"), 
-        reason=l.reason
-    ) for l in leave_records]
-
-    raw_score =  (leaves_taken * 5) - (late_marks * 2)
-    if raw_score <=0:
-        score = 0
-    else:
-        score = 100 - raw_score
-    score = max(0, score) 
-
-    return MonthlyAttendanceReport(
-        user_id=target_user.id,
-        user_name=target_user.username,
-        role="Sales Executive", # Could fetch from user role but stick to string for now
-        score_percentage=score,
-        leaves_taken_count=leaves_taken,
-        days_present_count=days_present,
-        late_marks_count=late_marks,
-        leave_history=leave_history_list, 
-        late_history=late_history_list    
-    )
\ No newline at end of file
+    reports = monthly_reports(db, month, year, user_id=user_id)
+    if not reports: raise HTTPException(404, "User not found")
+    return reports[0]
@@ -1,114 +1,94 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User, TeamLeadStaff, StoreManagerStaff
-from utils.security import verify_password, create_access_token, create_refresh_token, verify_refresh_token
-from schemas import LoginSchema
-from datetime import datetime, timedelta, timezone
+from models import User
+from utils.security import (
+    create_access_token, verify_refresh_token, get_current_user, oauth2_scheme,
+    verify_access_token, get_password_hash, REFRESH_TOKEN_EXPIRE_DAYS
+)
+from utils.password_service import verify_and_update, login_admission
+from utils.principals import load_principal, set_password_hash, SOURCES, USER, TEAM_LEAD, STORE_MANAGER
+from utils.auth_cache import revoke_token, revoke_login
+from utils.refresh_tokens import (
+    issue, lookup, state, rotate, successor, revoke_family, revoke_all, ACTIVE, NOT_FOUND, REUSED
+)
+from schemas import LoginSchema, RefreshTokenSchema, ChangePasswordSchema
+from datetime import timedelta
 
 router = APIRouter(prefix="/auth")
 
 @router.post("/login")
-def login(data: LoginSchema, db: Session = Depends(get_db)):
+def login(data: LoginSchema, request: Request, db: Session = Depends(get_db)):
     """
-    Check multiple tables for user authentication:
-    1. User table (for SALES_EXECUTIVE and DIRECTOR roles)
-    2. TeamLeadStaff table (for TEAM_LEAD role)
-    3. StoreManagerStaff table (for STORE_MANAGER role)
+    One lookup in the principals index (users, team leads and store managers
+    share one login namespace, see utils/principals.py) and one password check,
+    run in the password pool under admission control (utils/password_service.py).
     """
-    user_record = None
-    user_role = None
-    user_id = None
-    username = None
-    hashed_pwd = None
-    refresh_token_field = None
-    
-    print("data:",data)
-    # 1. Check User table first
-    try:
-        user = db.query(User).filter_by(username=data.username).first()
-        print("user_details:",user)
-        if user and verify_password(data.password, user.hashed_password):
-            print("user")
-            user_record = user
-            user_role = user.role  # Use role from database (SALES_EXECUTIVE, DIRECTOR, etc.)
-            user_id = user.id
-            username = user.username
-            hashed_pwd = user.hashed_password
-            refresh_token_field = "user"
-    except Exception as e:
-        print(f"Error checking User table: {e}")
-    
-    # 2. Check TeamLeadStaff table if not found in User
-    if not user_record:
-        try:
-            team_lead = db.query(TeamLeadStaff).filter_by(staff_id=data.username).first()
-            print("team_lead_details:",team_lead)
-            if team_lead and verify_password(data.password, team_lead.hashed_password):
-                print("team_lead")
-                user_record = team_lead
-                user_role = "TEAM_LEAD"
-                user_id = team_lead.id
-                username = team_lead.staff_id
-                hashed_pwd = team_lead.hashed_password
-                refresh_token_field = "team_lead"
-        except Exception as e:
-            print(f"Error checking TeamLeadStaff table (table may not exist): {e}")
-    
-    # 3. Check StoreManagerStaff table if still not found
-    if not user_record:
-        try:
-            store_manager = db.query(StoreManagerStaff).filter_by(staff_id=data.username).first()
-            print("store_manager_details:",store_manager)
-            if store_manager and verify_password(data.password, store_manager.hashed_password):
-                print("store_manager")
-                user_record = store_manager
-                user_role = "STORE_MANAGER"
-                user_id = store_manager.id
-                username = store_manager.staff_id
-                hashed_pwd = store_manager.hashed_password
-                refresh_token_field = "store_manager"
-        except Exception as e:
-            print(f"Error checking StoreManagerStaff table (table may not exist): {e}")
-    
-    # If no match found in any table, raise error
-    if not user_record:
+    client_ip = request.client.host if request.client else None
+    with login_admission.admit(client_ip, data.username):
+        principal = load_principal(db, data.username)
+        if not principal:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        matches, new_hash = verify_and_update(data.password, principal.hashed_password)
+    if not matches:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # bcrypt or outdated argon2 parameters: store the upgraded hash
+        set_password_hash(db, principal, new_hash)
 
-    # Create both access and refresh tokens
-    access_token = create_access_token({
-        "sub": username,
-        "role": user_role,
-        "user_id": user_id,
-        "sales_executive_id": username 
-    })
-    
-    refresh_token = create_refresh_token({
-        "sub": username,
-        "user_id": user_id,
-        "table": refresh_token_field  # Track which table this user is from
-    })
-    
-    # Store refresh token in appropriate table
-    if refresh_token_field == "user":
-        user_record.refresh_token = refresh_token
-        db.commit()
-    # Note: TeamLeadStaff and StoreManagerStaff don't have refresh_token column yet
+    # Every login is a new device: its own refresh token family (utils/refresh_tokens.py)
+    refresh_token, family_id = issue(db, principal, device=request.headers.get("user-agent"))
+    access_token = access_token_for(principal, family_id)
+    db.commit()
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "role": user_role  # Include role in response for frontend
+        "role": principal.role  # Include role in response for frontend
     }
 
 
+def access_token_for(principal, family_id: str, **claims):
+    return create_access_token({
+        "sub": principal.login_name,
+        "role": principal.role,
+        "user_id": principal.source_id,
+        "sales_executive_id": principal.login_name,
+        "store_assigned": principal.store_assigned,
+        "fid": family_id,  # Refresh token family of this device, revoked on logout
+        **claims
+    })
+
+
+def _migrate_legacy_token(db: Session, token: str, payload: dict, device: str):
+    """
+    Refresh tokens issued before refresh_tokens existed: a User's token is
+    accepted once if it is the one stored in users.refresh_token, and moved to a new family.
+    """
+    if "fid" in payload or payload.get("table", USER) != USER:
+        return None
+    principal = load_principal(db, payload.get("sub"))
+    if not principal or principal.source != USER:
+        return None
+    stored = db.query(User.refresh_token).filter(User.id == principal.source_id).scalar()
+    if not stored or stored != token:
+        return None
+    db.execute(update(User).where(User.id == principal.source_id).values(refresh_token=None))
+    return principal, issue(db, principal, device=device)
 
 
 @router.post("/token/refresh")
-async def refresh_token(request: Request, db: Session = Depends(get_db)):
-    body = await request.json()
-    token = body.get("refresh_token")
+def refresh_token(data: RefreshTokenSchema, request: Request, db: Session = Depends(get_db)):
+    """
+    One indexed lookup of the presented token for every role; the token is
+    exchanged for the next one of its family on every refresh. Presenting an
+    already exchanged token revokes the family (that device logs in again),
+    unless it was exchanged moments ago by a concurrent refresh: then the
+    same successor is returned (utils/refresh_tokens.py).
+    """
+    token = data.refresh_token
 
     if not token:
         raise HTTPException(status_code=400, detail="Refresh token required")
@@ -117,60 +97,97 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
     if not payload:
         raise HTTPException(status_code=401, detail="Refresh token expired or invalid")
 
-    username = payload.get("sub")
-    table_type = payload.get("table", "user")  # Default to user table
-    
-    # Find user in appropriate table
-    user_record = None
-    user_role = None
-    
-    if table_type == "team_lead":
-        user_record = db.query(TeamLeadStaff).filter_by(staff_id=username).first()
-        user_role = "TEAM_LEAD"
-    elif table_type == "store_manager":
-        user_record = db.query(StoreManagerStaff).filter_by(staff_id=username).first()
-        user_role = "STORE_MANAGER"
-    else:
-        user_record = db.query(User).filter_by(username=username).first()
-        if user_record:
-            user_role = user_record.role
-
-    if not user_record:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Verify the refresh token matches what's stored (only for User table)
-    if table_type == "user" and hasattr(user_record, 'refresh_token'):
-        if user_record.refresh_token != token:
-            raise HTTPException(status_code=403, detail="Invalid refresh token")
-
-    # Create new access token
-    new_access_token = create_access_token({
-        "sub": username,
-        "role": user_role,
-        "user_id": user_record.id,
-        "sales_executive_id": username
-    })
+    device = request.headers.get("user-agent")
+    row = lookup(db, token)
+    token_state = state(row)
+    new_refresh_token = None
 
-    # Check if refresh token is close to expiry
-    exp_timestamp = payload["exp"]
-    expires_at = datetime.fromtimestamp(exp_timestamp, tz=timezone.utc)
-    remaining = expires_at - datetime.now(timezone.utc)
-    
-    # Rotate refresh token if less than 2 days remaining
-    if remaining < timedelta(days=2):
-        new_refresh_token = create_refresh_token({
-            "sub": username,
-            "user_id": user_record.id,
-            "table": table_type
-        })
-        # Only store in User table (others don't have refresh_token column)
-        if table_type == "user":
-            user_record.refresh_token = new_refresh_token
-            db.commit()
+    if token_state == NOT_FOUND:
+        migrated = _migrate_legacy_token(db, token, payload, device)
+        if not migrated:
+            raise HTTPException(status_code=401, detail="Refresh token expired or invalid")
+        principal, (new_refresh_token, family_id) = migrated
     else:
-        new_refresh_token = token  # Reuse existing token
+        principal, family_id = row, row.family_id
+        if token_state == ACTIVE:
+            new_refresh_token = rotate(db, row, device)
+            if new_refresh_token is None:
+                # Exchanged by a concurrent request since the lookup
+                row = lookup(db, token)
+                token_state = state(row)
+        if token_state == REUSED:
+            new_refresh_token = successor(db, row)
+            if new_refresh_token is None:
+                revoke_family(db, row.family_id)
+                db.commit()
+        if new_refresh_token is None:
+            raise HTTPException(status_code=401, detail="Refresh token revoked, please log in again")
+
+    new_access_token = access_token_for(principal, family_id)
+    db.commit()
 
     return {
         "access_token": new_access_token,
         "refresh_token": new_refresh_token,
     }
+
+
+@router.post("/logout")
+def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """ Revokes this access token and this device's refresh tokens; other devices stay logged in """
+    claims, current_user = verify_access_token(token)
+    revoke_token(db, claims)
+
+    principal = load_principal(db, current_user["username"])
+    if principal and principal.source_id == current_user["user_id"]:
+        if claims.get("fid"):
+            revoke_family(db, claims["fid"], principal.source, principal.source_id)
+        elif principal.source == USER:
+            db.execute(update(User).where(User.id == principal.source_id).values(refresh_token=None))
+    db.commit()
+
+    return {"message": "Logged out"}
+
+
+@router.post("/change-password")
+def change_password(
+    data: ChangePasswordSchema,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sets a new password and revokes every token issued before the change
+    (all devices); returns fresh tokens for this one.
+    """
+    if not data.new_password:
+        raise HTTPException(status_code=400, detail="New password required")
+
+    client_ip = request.client.host if request.client else None
+    with login_admission.admit(client_ip, current_user["username"]):
+        principal = load_principal(db, current_user["username"])
+        if not principal or principal.source_id != current_user["user_id"]:
+            raise HTTPException(status_code=404, detail="User not found")
+        matches, _ = verify_and_update(data.current_password, principal.hashed_password)
+    if not matches:
+        raise HTTPException(status_code=401, detail="Current password is incorrect")
+
+    set_password_hash(db, principal, get_password_hash(data.new_password))
+    if principal.source in (TEAM_LEAD, STORE_MANAGER):
+        # The director's staff list must not show the old password any more
+        model = SOURCES[principal.source][0]
+        db.execute(update(model).where(model.id == principal.source_id).values(plain_password=None))
+
+    issued_at = revoke_login(db, principal.login_name, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    revoke_all(db, principal.source, principal.source_id)
+
+    refresh_token, family_id = issue(db, principal, device=request.headers.get("user-agent"), iat=issued_at)
+    access_token = access_token_for(principal, family_id, iat=issued_at)
+    db.commit()
+
+    return {
+        "message": "Password changed",
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
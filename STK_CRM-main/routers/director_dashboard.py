@@ -1,18 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Lead, StoreManagerDashboard, TeamLeadStaff, StoreManagerStaff
+from models import TeamLeadStaff, StoreManagerStaff
 from schemas import CreateStaffRequest, StaffResponse, StaffListItem
-from utils.security import get_current_user
-from passlib.context import CryptContext
+from utils.security import get_current_user, get_password_hash
+from utils.pagination import PageParams, keyset_page, set_next_cursor
+from utils.stats_snapshot import current_stats, LEAD, STORE_ORDER
 from datetime import datetime
 import re
 
 router = APIRouter(prefix="/director-dashboard", tags=["Director Dashboard"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Helper function to generate location code from store name
 def get_location_code(store_name: str) -> str:
     """Extract location code from store name (first 3 letters uppercase)"""
@@ -67,35 +65,31 @@ def get_director_dashboard_stats(
     """
     # verify_director(current_user) # Uncomment if you have a director role
 
+    # Served from the status counter snapshot (see utils/stats_snapshot.py)
+    stats = current_stats(db)
+
     # --- 1. STORE METRICS ---
     
     # Orders successfully delivered to customer
-    total_delivered = db.query(StoreManagerDashboard).filter(
-        StoreManagerDashboard.status == "Delivered"
-    ).count()
+    total_delivered = stats.count(STORE_ORDER, statuses=["Delivered"])
 
     # Orders currently with the Store Manager (Pending or Dispatched)
-    pending_deliveries = db.query(StoreManagerDashboard).filter(
-        StoreManagerDashboard.status.in_(["Pending", "Dispatched"])
-    ).count()
+    pending_deliveries = stats.count(STORE_ORDER, statuses=["Pending", "Dispatched"])
 
     # Leads that were successfully converted/closed
     # We check for all "Won" statuses used in your system
-    leads_completed = db.query(Lead).filter(
-        Lead.status.in_(["Delivered"])
-    ).count()
+    leads_completed = stats.count(LEAD, statuses=["Delivered"])
 
     # Leads currently active in the sales pipeline
     # We exclude Final states (Won or Lost) to find what is "Pending"
-    leads_pending = db.query(Lead).filter(
-        Lead.status.notin_(["Delivered"])
-    ).count()
+    leads_pending = stats.count(LEAD, exclude=["Delivered"])
 
     return {
         "total_delivered_count": total_delivered,
         "pending_deliveries_count": pending_deliveries,
         "leads_completed_count": leads_completed,
-        "leads_pending_count": leads_pending
+        "leads_pending_count": leads_pending,
+        "stats_version": stats.version
     }
 
 # ============= TEAM LEAD MANAGEMENT =============
@@ -114,7 +108,7 @@ def create_team_lead(
     staff_id = generate_staff_id("TL", request.store_assigned, db, TeamLeadStaff)
     
     # Hash password
-    hashed_password = pwd_context.hash(request.password)
+    hashed_password = get_password_hash(request.password)
     
     # Create team lead
     new_staff = TeamLeadStaff(
@@ -139,13 +133,19 @@ def create_team_lead(
 
 @router.get("/team-leads", response_model=list[StaffListItem])
 def get_team_leads(
+    response: Response,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get list of all Team Leads
+    Get list of all Team Leads (newest first)
     """
-    team_leads = db.query(TeamLeadStaff).order_by(TeamLeadStaff.created_at.desc()).all()
+    team_leads, next_cursor = keyset_page(
+        db.query(TeamLeadStaff), [TeamLeadStaff.id], page,
+        key=lambda tl: [tl.id], descending=True
+    )
+    set_next_cursor(response, next_cursor)
     
     return [
         StaffListItem(
@@ -174,7 +174,7 @@ def create_store_manager(
     staff_id = generate_staff_id("SM", request.store_assigned, db, StoreManagerStaff)
     
     # Hash password
-    hashed_password = pwd_context.hash(request.password)
+    hashed_password = get_password_hash(request.password)
     
     # Create store manager
     new_staff = StoreManagerStaff(
@@ -199,13 +199,19 @@ def create_store_manager(
 
 @router.get("/store-managers", response_model=list[StaffListItem])
 def get_store_managers(
+    response: Response,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get list of all Store Managers
+    Get list of all Store Managers (newest first)
     """
-    store_managers = db.query(StoreManagerStaff).order_by(StoreManagerStaff.created_at.desc()).all()
+    store_managers, next_cursor = keyset_page(
+        db.query(StoreManagerStaff), [StoreManagerStaff.id], page,
+        key=lambda sm: [sm.id], descending=True
+    )
+    set_next_cursor(response, next_cursor)
     
     return [
         StaffListItem(
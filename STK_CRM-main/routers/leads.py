@@ -1,69 +1,49 @@
 # routers/leads.py
 
-from fastapi import APIRouter, Depends, HTTPException ,Query
+from fastapi import APIRouter, Depends, HTTPException ,Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Lead, FollowUp
+from database import get_db, get_async_db
+from models import Lead, FollowUp, User
 from schemas import FollowUpDetailResponse, FolowupLeadUpdateRequest, LeadCreateSchema, LeadCreateResponseSchema
 from datetime import datetime
-from utils.security import get_current_user
-from typing import List
+from utils.security import get_current_user, get_current_user_async
+from utils.lead_codes import lead_code_allocator
+from utils.followup_inbox import followup_inbox_statement, serialize_inbox_row
+from utils.pagination import PageParams, keyset_page_async, set_next_cursor
+from utils.customer_lookup import lookup_customer_by_phone, search_customers_by_prefix
+from utils.lead_events import (
+    record_lead_event, record_lead_events_bulk, creation_events, executive_store, FOLLOWUP_UPDATED
+)
+from utils.lead_import import lead_row_from_schema, detect_format, import_leads
+from utils.rollup import creation_deltas, apply_deltas
+from typing import List, Optional
+import io
+import tempfile
 
 router = APIRouter(prefix="/leads", tags=["Leads"])
 
-def generate_lead_code(db):
-    last_lead = db.query(Lead).order_by(Lead.id.desc()).first()
-    next_number = 1 if not last_lead else last_lead.id + 1
-    year = datetime.now().year
-    return f"L-{year}-{str(next_number).zfill(4)}"
-
-
 @router.post("/create-lead", response_model=LeadCreateResponseSchema)
 def create_lead(
     data: LeadCreateSchema, 
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    lead_code = generate_lead_code(db)
+    lead_code = lead_code_allocator.next_code()
     # Storing Integer ID as string for consistency with DB schema
     sales_executive_db_id = str(current_user["user_id"])
     
-    lead = Lead(
-        lead_code=lead_code,
-        lead_created_at=data.lead_created_at or datetime.now(),
-        sales_executive_id=sales_executive_db_id,
-        status="Today",
-        
-        customer_name=data.customer_name,
-        phone=data.phone,
-        source=data.source,
-        location=data.location,
-        district=data.district,
-        profile=data.profile,
-        
-        area_sqft=data.area_sqft,
-        project_type=data.project_type,
-        board_type=data.board_type,
-        material_brand=data.material_brand,
-        channel=data.channel,
-        channel_thickness=data.channel_thickness,
-        material_category=data.material_category,
-        material_quantity=data.material_quantity,
-        accessory_name=data.accessory_name,
-        accessory_qty=data.accessory_qty,
-        urgency=data.urgency,
-
-        quotation_created_at=data.quotation_created_at,
-        quotation_id=data.quotation_id,
-        total_estimated_cost=data.total_estimated_cost,
-        quotation_ended_at=data.quotation_ended_at,
-        
-        approver_request_at=data.approver_request_at,
-        approver_status="PENDING" if data.approver_request_at else None,
-        last_action="Lead Created"
-    )
+    lead = Lead(**lead_row_from_schema(data, lead_code, sales_executive_db_id))
 
     db.add(lead)
+    db.flush()
+    events = creation_events(
+        lead, actor_id=current_user["user_id"], store=executive_store(db, sales_executive_db_id)
+    )
+    record_lead_events_bulk(db, events)
+    apply_deltas(db, creation_deltas({}, lead, events))
     db.commit()
     db.refresh(lead)
 
@@ -75,81 +55,90 @@ def create_lead(
         "status": lead.status
     }
 
-@router.get("/follow-up-leads")
-def get_followup_leads(
-    tab: str = Query("today", regex="^(today|upcoming|delivered)$"),
+def import_owner(db: Session, current_user: dict, sales_executive_id: Optional[int]) -> str:
+    """
+    Owner of imported leads: the caller, or `sales_executive_id` when a team
+    lead (for an executive of their store) or a director imports on someone's behalf.
+    """
+    if sales_executive_id is None or sales_executive_id == current_user["user_id"]:
+        return str(current_user["user_id"])
+
+    role = current_user.get("role")
+    if role not in ("TEAM_LEAD", "director"):
+        raise HTTPException(status_code=403, detail="Only team leads and directors can import leads for another executive")
+
+    executive = db.query(User.store_assigned, User.role).filter(User.id == sales_executive_id).first()
+    if not executive or executive.role != "sales_executive":
+        raise HTTPException(status_code=404, detail="Sales executive not found")
+    if role == "TEAM_LEAD" and executive.store_assigned != current_user.get("store_assigned"):
+        raise HTTPException(status_code=403, detail="Sales executive is not in your store")
+    return str(sales_executive_id)
+
+
+@router.post("/bulk-import")
+async def bulk_import_leads(
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(csv|ndjson)$"),
+    sales_executive_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk-creates leads from a CSV (header row = LeadCreateSchema fields) or
+    NDJSON request body. Returns a per-row report.
+    """
+    fmt = format or detect_format(request.headers.get("content-type"))
+    owner_id = await run_in_threadpool(import_owner, db, current_user, sales_executive_id)
+
+    # Stream the upload to disk instead of holding it in memory (file writes off the event loop)
+    upload = tempfile.TemporaryFile()
+    async for chunk in request.stream():
+        await run_in_threadpool(upload.write, chunk)
+    upload.seek(0)
+
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    try:
+        report = await run_in_threadpool(import_leads, db, stream, fmt, owner_id)
+    finally:
+        stream.close()
+
+    return report
+
+# Hot read paths below are async def on the async engine (database.get_async_db)
+@router.get("/follow-up-leads")
+async def get_followup_leads(
+    response: Response,
+    tab: str = Query("today", regex="^(today|upcoming|delivered)$"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_async)
 ):
     user_id = str(current_user["user_id"])
-    today = datetime.now().date()
 
-    query = db.query(Lead).filter(
-        Lead.sales_executive_id == user_id
+    # Latest follow-up + tab bucket resolved in one query (no per-lead lookups)
+    rows, next_cursor = await keyset_page_async(
+        db, followup_inbox_statement(user_id, tab), [Lead.id], page,
+        key=lambda row: [row[0].id]
     )
+    set_next_cursor(response, next_cursor)
 
-    # --- STATUS FILTER BASED ON TAB ---
-    if tab == "delivered":
-        leads = query.filter(Lead.status == "Delivered").all()
-
-    elif tab == "upcoming":
-        leads = query.filter(Lead.status.notin_(["Delivered"])).all()
-
-    else:  # today
-        leads = query.filter(Lead.status.notin_(["Delivered"])).all()
-
-    final_list = []
-
-    for l in leads:
-        last_fu = db.query(FollowUp).filter(
-            FollowUp.lead_code == l.lead_code
-        ).order_by(FollowUp.id.desc()).first()
-
-        if last_fu and last_fu.next_followup_date:
-            target_date = last_fu.next_followup_date.date()
-        else:
-            target_date = l.lead_created_at.date()
-
-        if tab == "today" and target_date <= today:
-            final_list.append(l)
-
-        elif tab == "upcoming" and target_date > today:
-            final_list.append(l)
-
-        elif tab == "delivered":
-            final_list.append(l)
-
-    return [
-        {
-            "lead_id": l.id,
-            "lead_code": l.lead_code,
-            "customer_name": l.customer_name,
-            "status": l.status,
-            "district": l.district,
-            "phone": l.phone,
-            "last_action": l.last_action,
-            "next_followup": (
-                last_fu.next_followup_date if last_fu else l.lead_created_at
-            )
-        }
-        for l in final_list
-    ]
+    return [serialize_inbox_row(l, next_followup) for l, next_followup in rows]
 
 
 @router.get("/follow-up-leads/{lead_id}", response_model=FollowUpDetailResponse)
-def get_followup_detail(
+async def get_followup_detail(
     lead_id: str,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_async)
 ):
-    lead = db.query(Lead).filter(Lead.lead_code == lead_id).first()
+    lead = (await db.execute(select(Lead).filter(Lead.lead_code == lead_id).limit(1))).scalar()
     
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
 
-    last_fu = db.query(FollowUp).filter(
+    last_fu = (await db.execute(select(FollowUp).filter(
         FollowUp.lead_code == lead.lead_code
-    ).order_by(FollowUp.id.desc()).first()
+    ).order_by(FollowUp.id.desc()).limit(1))).scalar()
 
     return {
         "lead_id": lead.id, # Added this to match schema
@@ -174,9 +163,9 @@ def lookup_customer(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    lead = db.query(Lead).filter(Lead.phone == phone).first()
+    details = lookup_customer_by_phone(db, phone)
 
-    if not lead:
+    if not details:
         return {
             "found": False,
             "message": "No customer found. Redirect to Create Lead."
@@ -184,18 +173,21 @@ def lookup_customer(
 
     return {
         "found": True,
-        "customer_details": {
-            "lead_id": lead.id,
-            "lead_code": lead.lead_code,
-            "source": lead.source,
-            "name": lead.customer_name,
-            "location": lead.location,
-            "district": lead.district,
-            "profile": lead.profile,
-        }
+        "customer_details": details
     }
 
 
+@router.get("/customers/search")
+def search_customers(
+    phone: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """ Type-ahead: customers whose phone starts with the digits entered so far """
+    return search_customers_by_prefix(db, phone, limit)
+
+
 @router.post("/follow-up-lead-update")
 def add_followup(
     data: FolowupLeadUpdateRequest,
@@ -215,11 +207,19 @@ def add_followup(
 
     db.add(followup)
 
-    db.query(Lead).filter(
-        Lead.lead_code == data.lead_code
-    ).update({
-        "status": "Upcoming"
-    })
+    # Updated through the ORM so the change is picked up by /sync
+    lead = db.query(Lead).filter(Lead.lead_code == data.lead_code).first()
+    if lead:
+        lead.status = "Upcoming"
+        record_lead_event(
+            db, lead, FOLLOWUP_UPDATED, data.followup_updated_at,
+            actor_id=current_user["user_id"],
+            details={
+                "stage": data.update_stage,
+                "next_followup": clean_date.isoformat(),
+                "reason": data.reason
+            }
+        )
 
     db.commit()
 
@@ -1,15 +1,32 @@
 # routers/quotations.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from typing import List
 from database import get_db
-from models import Lead
+from models import Lead, Quotation, QuotationRevision, RenderJob
 from schemas import (
+    SaveQuotationRevisionRequest,
+    QuotationSummary,
+    QuotationRevisionSummary,
+    QuotationRevisionResponse,
     SubmitQuotationApprovalToTeamLead,
     TeamleadResponseToApproval, 
     SendQuotationToCustomerRequest, 
-    SendQuotationToCustomerResponse
+    SendQuotationToCustomerResponse,
+    RenderJobResponse,
+    PricePreviewRequest,
+    PricePreviewResponse
 )
 from utils.security import get_current_user
+from utils.lead_events import record_lead_event, SENT_FOR_APPROVAL, QUOTATION_SENT
+from utils.rollup import count_first_quotation, set_lead_total
+from utils.quotation_store import save_revision, find_quotation, render_revision
+from utils.render_queue import enqueue_render, DONE
+from utils.quote_document import CONTENT_TYPES
+from utils import document_store
+from utils.pricing_engine import (
+    current_price_arrays, QuoteSpec, price_quote, compare_quotes, resolve_sub_category, PricingError
+)
 
 router = APIRouter(prefix="/quotations", tags=["Quotations"])
 
@@ -30,11 +47,39 @@ def submit_for_approval(
     if lead.approver_status == "PENDING":
         raise HTTPException(status_code=400, detail="Quotation already sent for approval")
 
-    # 3. Update Lead Status & Save ID
+    # 3. Pin the revision under review (quotations saved through /save-revision)
+    quotation = find_quotation(db, lead, data.quotation_id, for_update=True)
+    if quotation is not None and quotation.quotation_code == data.quotation_id:
+        revision = data.revision or quotation.current_revision
+        if not 1 <= revision <= quotation.current_revision:
+            raise HTTPException(status_code=400, detail=f"Quotation has no revision {revision}")
+        quotation.status = "PENDING"
+        quotation.submitted_revision = revision
+        quotation.approved_revision = None
+        submitted_total = db.query(QuotationRevision.total).filter(
+            QuotationRevision.quotation_id == quotation.id, QuotationRevision.revision == revision
+        ).scalar()
+        if submitted_total is not None:
+            set_lead_total(db, lead, submitted_total)
+        details = {"quotation_id": data.quotation_id, "revision": revision}
+    else:
+        details = {"quotation_id": data.quotation_id}
+
+    # 4. Update Lead Status & Save ID
+    # Quotations saved through /save-revision were counted when the quotation was created
+    first_quotation = lead.quotation_id is None
     lead.approver_request_at = data.sent_at
     lead.approver_status = "PENDING"
     lead.quotation_id = data.quotation_id  # ✅ Saves "#Q-1001" correctly now
 
+    record_lead_event(
+        db, lead, SENT_FOR_APPROVAL, data.sent_at, lead.total_estimated_cost or 0,
+        status="Pending", actor_id=current_user["user_id"],
+        details=details
+    )
+    if first_quotation and data.quotation_id:
+        count_first_quotation(db, lead)
+
     db.commit()
 
     return {
@@ -60,10 +105,233 @@ def send_to_customer(
 
     lead.customer_quotation_sent_at = data.sent_at
     lead.last_action = "Quotation Sent"
+    quotation = find_quotation(db, lead, lead.quotation_id)
+    if quotation is not None:
+        quotation.status = "SENT"
+    # Rendered by render_worker.py; the request never waits for it
+    job = enqueue_render(db, lead, actor_id=current_user["user_id"])
+
+    record_lead_event(
+        db, lead, QUOTATION_SENT, data.sent_at, lead.total_estimated_cost or 0,
+        actor_id=current_user["user_id"], details={"method": data.method}
+    )
 
     db.commit()
 
     return {
         "status": "SUCCESS",
-        "message": f"Quotation sent to customer via {data.method}"
-    }
\ No newline at end of file
+        "message": f"Quotation sent to customer via {data.method}",
+        "render_job_id": job.id
+    }
+
+
+# 3. PRICE PREVIEW (Sales Exec, on site)
+@router.post("/price-preview", response_model=PricePreviewResponse)
+def price_preview(
+    data: PricePreviewRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Prices the lead's bill of materials from the catalog, plus an optional
+    brand x thickness x area comparison, without saving anything. With
+    as_of (or a saved revision) the prices in effect at that time are used.
+    """
+    lead = None
+    if data.lead_id:
+        lead = db.query(Lead).filter(Lead.lead_code == data.lead_id).first()
+        if not lead:
+            raise HTTPException(status_code=404, detail="Lead not found")
+
+    def pick(field):
+        value = getattr(data, field, None)
+        return value if value not in (None, "") else getattr(lead, field, None)
+
+    area = pick("area_sqft")
+    if not area:
+        raise HTTPException(status_code=400, detail="area_sqft is required")
+
+    accessories = [(a.name, a.quantity) for a in data.accessories or []]
+    if not accessories and lead is not None and lead.accessory_name:
+        accessories = [(lead.accessory_name, lead.accessory_qty)]
+
+    spec = QuoteSpec(
+        area_sqft=area,
+        sub_category=pick("material_category"),
+        board=pick("board_type"),
+        channel=pick("channel"),
+        grid_type=data.grid_type,
+        accessories=accessories,
+        brand=pick("material_brand"),
+        thickness=pick("channel_thickness")
+    )
+
+    when = data.as_of
+    if data.revision is not None:
+        quotation = find_quotation(db, lead) if lead is not None else None
+        saved_at = db.query(QuotationRevision.created_at).filter(
+            QuotationRevision.quotation_id == quotation.id, QuotationRevision.revision == data.revision
+        ).scalar() if quotation is not None else None
+        if saved_at is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        when = saved_at
+
+    arrays = current_price_arrays(db, when)
+    try:
+        quote = price_quote(arrays, spec)
+        comparisons = []
+        if data.compare_brands or data.compare_thicknesses or data.compare_areas:
+            comparisons = compare_quotes(
+                arrays, spec, data.compare_brands, data.compare_thicknesses, data.compare_areas
+            )
+        sub_category = resolve_sub_category(arrays, spec.sub_category, spec.board)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"sub_category": arrays.sub_labels.get(sub_category, sub_category), "quote": quote, "comparisons": comparisons}
+
+
+# 4. QUOTATION REVISIONS (see utils/quotation_store.py)
+def _summary(q: Quotation) -> dict:
+    return {
+        "id": q.id,
+        "quotation_id": q.quotation_code,
+        "lead_id": q.lead_id,
+        "status": q.status,
+        "current_revision": q.current_revision,
+        "submitted_revision": q.submitted_revision,
+        "approved_revision": q.approved_revision,
+        "total": q.total,
+        "created_at": q.created_at,
+        "updated_at": q.updated_at
+    }
+
+
+def _get_quotation(db: Session, quotation_pk: int) -> Quotation:
+    quotation = db.query(Quotation).filter(Quotation.id == quotation_pk).first()
+    if not quotation:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    return quotation
+
+
+@router.post("/save-revision", response_model=QuotationRevisionResponse)
+def save_quotation_revision(
+    data: SaveQuotationRevisionRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """ Saves the edited quotation as a new revision (only the diff is stored) """
+    lead = db.query(Lead).filter(Lead.lead_code == data.lead_id).first()
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+
+    document = data.quotation.dict()
+    quotation, revision = save_revision(
+        db, lead, document, quotation_code=data.quotation_id, note=data.note, actor_id=current_user["user_id"]
+    )
+    db.commit()
+
+    return {
+        "id": quotation.id,
+        "quotation_id": quotation.quotation_code,
+        "revision": revision,
+        "status": quotation.status,
+        "quotation": document
+    }
+
+
+@router.get("/lead/{lead_id}", response_model=List[QuotationSummary])
+def list_lead_quotations(
+    lead_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    quotations = db.query(Quotation).filter(Quotation.lead_id == lead_id).order_by(
+        Quotation.created_at.desc(), Quotation.id.desc()
+    ).all()
+    return [_summary(q) for q in quotations]
+
+
+@router.get("/{quotation_pk}/revisions", response_model=List[QuotationRevisionSummary])
+def list_revisions(
+    quotation_pk: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    _get_quotation(db, quotation_pk)
+    rows = db.query(
+        QuotationRevision.revision, QuotationRevision.total, QuotationRevision.note,
+        QuotationRevision.created_by, QuotationRevision.created_at
+    ).filter(QuotationRevision.quotation_id == quotation_pk).order_by(QuotationRevision.revision).all()
+    return [row._asdict() for row in rows]
+
+
+@router.get("/{quotation_pk}/revisions/{revision}", response_model=QuotationRevisionResponse)
+def get_revision(
+    quotation_pk: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    quotation = _get_quotation(db, quotation_pk)
+    document = render_revision(db, quotation, revision)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+
+    return {
+        "id": quotation.id,
+        "quotation_id": quotation.quotation_code,
+        "revision": revision,
+        "status": quotation.status,
+        "quotation": document
+    }
+
+
+# 5. RENDERED DOCUMENTS (see utils/render_queue.py)
+def _get_render_job(db: Session, job_id: int) -> RenderJob:
+    job = db.query(RenderJob).filter(RenderJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job
+
+
+@router.get("/render-jobs/{job_id}", response_model=RenderJobResponse)
+def get_render_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    job = _get_render_job(db, job_id)
+    return {
+        "id": job.id,
+        "lead_id": job.lead_id,
+        "quotation_id": job.quotation_id,
+        "revision": job.revision,
+        "format": job.format,
+        "status": job.status,
+        "attempts": job.attempts or 0,
+        "content_hash": job.content_hash,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
+
+
+@router.get("/render-jobs/{job_id}/document")
+def get_rendered_document(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    job = _get_render_job(db, job_id)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Document is not ready (status {job.status})")
+
+    content = document_store.get(job.content_hash)
+    if content is None:
+        raise HTTPException(status_code=410, detail="Rendered document is missing from the store")
+    return Response(
+        content=content,
+        media_type=CONTENT_TYPES[job.format],
+        headers={"ETag": f'"{job.content_hash}"', "Cache-Control": "private, max-age=31536000, immutable"}
+    )
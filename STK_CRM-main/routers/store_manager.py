@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Lead, StoreManagerDashboard, User
 from schemas import (
     LeadHandoverToStoreRequest, 
@@ -16,7 +18,11 @@ from schemas import (
     DeliveredListResponse,
     DeliveredDetailResponse
 )
-from utils.security import get_current_user
+from utils.security import get_current_user, get_current_user_async
+from utils.pagination import PageParams, keyset_page_async, set_next_cursor
+from utils.lead_events import record_lead_event, HANDED_OVER, DISPATCHED, DELIVERED
+from utils.rollup import bump_rollup
+from utils.quotation_store import lead_quotation_document
 
 router = APIRouter(prefix="/store-manager", tags=["Store Manager"])
 
@@ -60,25 +66,37 @@ def handover_lead_to_store(
     lead.status = "Handover_Pending"
 
     db.add(store_entry)
+    event = record_lead_event(
+        db, lead, HANDED_OVER, data.handover_at, data.advance_received_amount or 0,
+        actor_id=current_user["user_id"],
+        details={"store_name": data.store_name, "payment_mode": data.payment_mode}
+    )
+    bump_rollup(db, event, handovers=1)
     db.commit()
 
     return {"message": f"Lead successfully handed over to {data.store_name} Store Manager"}
 
 
 @router.get("/fetch-pending-leads", response_model=List[GetPendingLeadsResponse])
-def fetch_pending_leads(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+async def fetch_pending_leads(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_async)
 ):
     # my_store = get_my_store(db, current_user["username"])
     my_store = "Palakad"
 
-    items = db.query(StoreManagerDashboard).options(
-        joinedload(StoreManagerDashboard.lead)
-    ).filter(
-        StoreManagerDashboard.store_name == my_store,
-        StoreManagerDashboard.status == "Pending"
-    ).all()
+    items, next_cursor = await keyset_page_async(
+        db, select(StoreManagerDashboard).options(
+            joinedload(StoreManagerDashboard.lead)
+        ).filter(
+            StoreManagerDashboard.store_name == my_store,
+            StoreManagerDashboard.status == "Pending"
+        ),
+        [StoreManagerDashboard.id], page, key=lambda item: [item.id]
+    )
+    set_next_cursor(response, next_cursor)
 
     return [{
         "lead_id": item.lead.lead_code,
@@ -144,7 +162,7 @@ def get_pending_lead_detail(
         "advance_paid": paid,
         "balance_remaining": total - paid,
         "payment_mode_handover": dashboard_entry.payment_mode,
-        "quotation": lead.quotation_snapshot 
+        "quotation": lead_quotation_document(db, lead)
     }
 
 
@@ -183,25 +201,36 @@ def move_to_dispatch(
     entry.pending_to_dispatched_at = data.dispatch_timestamp
 
     lead.status = "Dispatched"
+    record_lead_event(
+        db, lead, DISPATCHED, data.dispatch_timestamp, data.payment_received_amount,
+        actor_id=current_user["user_id"],
+        details={"driver_name": data.driver_name, "vehicle_number": data.vehicle_number}
+    )
     db.commit()
 
     return {"message": "Order Dispatched Successfully"}
 
 
 @router.get("/fetch-dispatch-details", response_model=List[DispatchListResponse])
-def fetch_dispatched_leads(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+async def fetch_dispatched_leads(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_async)
 ):
     # my_store = get_my_store(db, current_user["username"])
     my_store= 'Palakad'
 
-    items = db.query(StoreManagerDashboard).options(
-        joinedload(StoreManagerDashboard.lead)
-    ).filter(
-        StoreManagerDashboard.store_name == my_store,
-        StoreManagerDashboard.status == "Dispatched"
-    ).all()
+    items, next_cursor = await keyset_page_async(
+        db, select(StoreManagerDashboard).options(
+            joinedload(StoreManagerDashboard.lead)
+        ).filter(
+            StoreManagerDashboard.store_name == my_store,
+            StoreManagerDashboard.status == "Dispatched"
+        ),
+        [StoreManagerDashboard.id], page, key=lambda item: [item.id]
+    )
+    set_next_cursor(response, next_cursor)
 
     return [{
         "lead_id": item.lead.id,
@@ -275,7 +304,7 @@ def get_dispatch_lead_detail(
         
         "expected_delivery_at": entry.estimated_delivery_at,
         "dispatched_at": entry.pending_to_dispatched_at,
-        "quotation": lead.quotation_snapshot 
+        "quotation": lead_quotation_document(db, lead)
     }
 
 
@@ -312,6 +341,12 @@ def move_to_delivered(
 
     lead.status = "Delivered"
     lead.lead_ended_at = datetime.now()
+
+    event = record_lead_event(
+        db, lead, DELIVERED, entry.delivered_at, data.payment_received_amount,
+        actor_id=current_user["user_id"], details={"payment_mode": data.payment_mode}
+    )
+    bump_rollup(db, event, deliveries=1)
     
     db.commit()
 
@@ -319,19 +354,25 @@ def move_to_delivered(
 
 
 @router.get("/fetch-delivered-details", response_model=List[DeliveredListResponse])
-def fetch_delivered_leads(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+async def fetch_delivered_leads(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_async)
 ):
     # my_store = get_my_store(db, current_user["username"])
     my_store = 'Palakad'
 
-    items = db.query(StoreManagerDashboard).options(
-        joinedload(StoreManagerDashboard.lead)
-    ).filter(
-        StoreManagerDashboard.store_name == my_store,
-        StoreManagerDashboard.status == "Delivered"
-    ).all()
+    items, next_cursor = await keyset_page_async(
+        db, select(StoreManagerDashboard).options(
+            joinedload(StoreManagerDashboard.lead)
+        ).filter(
+            StoreManagerDashboard.store_name == my_store,
+            StoreManagerDashboard.status == "Delivered"
+        ),
+        [StoreManagerDashboard.id], page, key=lambda item: [item.id]
+    )
+    set_next_cursor(response, next_cursor)
 
     results = []
     for item in items:
@@ -408,5 +449,5 @@ def get_delivered_lead_detail(
         "final_balance": total - paid,
         
         "delivered_at": entry.delivered_at,
-        "quotation": lead.quotation_snapshot 
+        "quotation": lead_quotation_document(db, lead)
     }
\ No newline at end of file
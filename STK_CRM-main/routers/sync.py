@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, select, cast, String
+
+from database import get_db
+from models import ChangeLog, Lead, User, TeamLeadStaff, StoreManagerStaff
+from utils.security import get_current_user
+from utils.pagination import encode_cursor, decode_cursor
+from utils.change_tracking import SYNC_ENTITIES, stamp_committed
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+
+# ==========================================
+# HELPER: Resolve caller's store
+# ==========================================
+def resolve_store(db: Session, current_user: dict):
+    store = current_user.get("store_assigned")
+    if store:
+        return store
+
+    role = (current_user.get("role") or "").upper()
+    model = {"TEAM_LEAD": TeamLeadStaff, "STORE_MANAGER": StoreManagerStaff}.get(role, User)
+    return db.query(model.store_assigned).filter(model.id == current_user["user_id"]).scalar()
+
+
+def scope_filter(db: Session, current_user: dict):
+    """ change_log predicate for what the caller is allowed to see (None = everything) """
+    role = (current_user.get("role") or "").lower()
+    user_id = str(current_user["user_id"])
+
+    if role == "director":
+        return None
+
+    if role == "sales_executive":
+        my_leads = select(Lead.lead_code).where(Lead.sales_executive_id == user_id)
+        return or_(ChangeLog.owner_id == user_id, ChangeLog.lead_code.in_(my_leads))
+
+    # Team leads / store managers: everything belonging to their store
+    store = resolve_store(db, current_user)
+    store_users = select(cast(User.id, String)).where(User.store_assigned == store)
+    store_leads = select(Lead.lead_code).where(Lead.sales_executive_id.in_(store_users))
+    return or_(
+        ChangeLog.store == store,
+        ChangeLog.owner_id.in_(store_users),
+        ChangeLog.lead_code.in_(store_leads)
+    )
+
+
+def sync_position(db: Session, since: str):
+    """
+    (commit_seq, id) from a /sync cursor. Cursors handed out before
+    commit_seq existed hold a change_log id: resume from that row's commit_seq
+    (rows in between may be sent twice, which clients apply idempotently).
+    """
+    if not since:
+        return 0, 0
+    try:
+        seq, last_id = decode_cursor(since, 2)
+        return seq, last_id
+    except HTTPException:
+        last_id = decode_cursor(since, 1)[0]  # Still 400 when it is neither
+    seq = db.query(ChangeLog.commit_seq).filter(ChangeLog.id == last_id).scalar()
+    return (seq, last_id) if seq is not None else (0, 0)
+
+
+def serialize_row(obj):
+    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+
+
+# ==========================================
+# DELTA SYNC
+# ==========================================
+@router.get("")
+def delta_sync(
+    since: str = Query(None, description="Cursor from the previous /sync response; omit for a full sync"),
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Returns rows changed after `since`, scoped to the caller, plus tombstones
+    for deleted rows. Keep calling with the returned cursor while has_more.
+    """
+    last_seq, last_id = sync_position(db, since)
+    # Commits, so the query below reads a snapshot that includes the new stamps
+    stamp_committed(db)
+
+    query = db.query(ChangeLog).filter(
+        ChangeLog.commit_seq.isnot(None),
+        or_(ChangeLog.commit_seq > last_seq, and_(ChangeLog.commit_seq == last_seq, ChangeLog.id > last_id))
+    )
+    scope = scope_filter(db, current_user)
+    if scope is not None:
+        query = query.filter(scope)
+
+    entries = query.order_by(ChangeLog.commit_seq, ChangeLog.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Latest op per row wins within the page
+    latest = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry.op
+
+    upsert_ids = {}
+    deleted = []
+    for (entity, entity_id), op in latest.items():
+        if op == "delete":
+            deleted.append({"entity": entity, "id": entity_id})
+        else:
+            upsert_ids.setdefault(entity, []).append(entity_id)
+
+    changes = {entity: [] for entity in SYNC_ENTITIES}
+    for entity, ids in upsert_ids.items():
+        model, _ = SYNC_ENTITIES[entity]
+        rows = db.query(model).filter(model.id.in_(ids)).order_by(model.id).all()
+        changes[entity] = [serialize_row(r) for r in rows]
+
+    position = [entries[-1].commit_seq, entries[-1].id] if entries else [last_seq, last_id]
+
+    return {
+        "cursor": encode_cursor(position),
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted
+    }
@@ -1,12 +1,19 @@
 # schemas.py
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import datetime, date
 
 class LoginSchema(BaseModel):
     username: str
     password: str
 
+class RefreshTokenSchema(BaseModel):
+    refresh_token: Optional[str] = None
+
+class ChangePasswordSchema(BaseModel):
+    current_password: str
+    new_password: str
+
 class LeadCreateSchema(BaseModel):
     lead_created_at: Optional[datetime] = None
 
@@ -62,10 +69,93 @@ class QuotationSnapshotSchema(BaseModel):
     tax: Optional[int] = None
     grand_total: int
 
+class PriceAccessoryItem(BaseModel):
+    name: str
+    quantity: Optional[int] = None  # Defaults to the per-sqft estimate
+
+class PricePreviewRequest(BaseModel):
+    lead_id: Optional[str] = None  # lead_code; fields left empty are taken from the lead
+    area_sqft: Optional[int] = None
+    material_category: Optional[str] = None
+    board_type: Optional[str] = None
+    material_brand: Optional[str] = None
+    channel: Optional[str] = None
+    channel_thickness: Optional[str] = None
+    grid_type: Optional[str] = None
+    accessories: Optional[List[PriceAccessoryItem]] = None
+    # What-if comparison (any subset); every combination is priced
+    compare_brands: Optional[List[str]] = None
+    compare_thicknesses: Optional[List[str]] = None
+    compare_areas: Optional[List[int]] = None
+    # Catalog prices in effect at this time (default now); `revision` re-prices
+    # that revision of the lead's quotation as of when it was saved
+    as_of: Optional[datetime] = None
+    revision: Optional[int] = None
+
+class PriceComparisonItem(BaseModel):
+    brand: Optional[str] = None
+    thickness: Optional[str] = None
+    area_sqft: int
+    total: Optional[int] = None
+    available: bool
+
+class PricePreviewResponse(BaseModel):
+    sub_category: str
+    quote: QuotationSnapshotSchema
+    comparisons: List[PriceComparisonItem] = []
+
+class SaveQuotationRevisionRequest(BaseModel):
+    lead_id: str  # lead_code
+    quotation_id: Optional[str] = None  # Defaults to the lead's current quotation; a new id starts a new quotation
+    quotation: QuotationSnapshotSchema
+    note: Optional[str] = None
+
+class QuotationRevisionSummary(BaseModel):
+    revision: int
+    total: Optional[int]
+    note: Optional[str]
+    created_by: Optional[str]
+    created_at: Optional[datetime]
+
+class QuotationSummary(BaseModel):
+    id: int
+    quotation_id: Optional[str]
+    lead_id: int
+    status: str
+    current_revision: int
+    submitted_revision: Optional[int]
+    approved_revision: Optional[int]
+    total: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+class QuotationRevisionResponse(BaseModel):
+    id: int
+    quotation_id: Optional[str]
+    revision: int
+    status: str
+    quotation: QuotationSnapshotSchema
+
 class SubmitQuotationApprovalToTeamLead(BaseModel):
     lead_id: str
     quotation_id: str
     sent_at: datetime 
+    revision: Optional[int] = None  # Defaults to the quotation's current revision
+
+class ReassignmentItem(BaseModel):
+    lead_id: int
+    to_user_id: int
+
+class BulkReassignRequest(BaseModel):
+    # Either explicit moves, or every open lead of from_user_id spread round-robin over to_user_ids
+    assignments: Optional[List[ReassignmentItem]] = None
+    from_user_id: Optional[int] = None
+    to_user_ids: Optional[List[int]] = None
+    reason: Optional[str] = None
+
+class BulkReassignResponse(BaseModel):
+    summary: Dict[str, int]   # outcome -> number of leads
+    results: List[dict]       # lead_id, lead_code, status, from, to
 
 class TeamleadResponseToApproval(BaseModel):
     status: str
@@ -88,6 +178,7 @@ class PendingApprovalDetailResponse(BaseModel):
     submitted_at: Optional[datetime]
     total_estimated_cost: int
     quotation: Optional[QuotationSnapshotSchema]
+    revision: Optional[int] = None
 
 class SendQuotationToCustomerRequest(BaseModel):
     lead_id: str
@@ -97,13 +188,20 @@ class SendQuotationToCustomerRequest(BaseModel):
 class SendQuotationToCustomerResponse(BaseModel):
     status: str
     message: str
+    render_job_id: Optional[int] = None  # Poll /quotations/render-jobs/{id} for the document
 
-class PendingApprovalDetailResponse(BaseModel):
-    lead_id: str
-    customer_name: str
-    phone: str
-    total_estimated_cost: int
-    quotation: QuotationSnapshotSchema
+class RenderJobResponse(BaseModel):
+    id: int
+    lead_id: int
+    quotation_id: Optional[int]
+    revision: Optional[int]
+    format: str
+    status: str
+    attempts: int
+    content_hash: Optional[str]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    finished_at: Optional[datetime]
 
 class LeadHandoverToStoreRequest(BaseModel):
     lead_id: int
@@ -265,6 +363,7 @@ class TeamLeadDashboardStats(BaseModel):
     deliveries_completed: int
     deliveries_total: int
     team_goal_percentage: int
+    stats_version: int = 0  # Bumps whenever the underlying counters change
     
 class CreateStaffRequest(BaseModel):
     full_name: str          # e.g. "Rahul Sharma"
@@ -495,6 +594,16 @@ class ColleagueResponse(BaseModel):
     username: str
     full_name: Optional[str]
 
+class LeaveCoverageUser(BaseModel):
+    user_id: int
+    username: Optional[str]
+
+class LeaveCoverageDay(BaseModel):
+    day: date
+    on_leave: List[LeaveCoverageUser]
+    available_count: int
+    staff_count: int
+
 class LeaveHistoryItem(BaseModel):
     date_str: str  # e.g. "12 Oct"
     reason: str    # e.g. "Viral Fever"
@@ -0,0 +1,42 @@
+"""
+Apply a catalog CSV (clean_products.csv layout) incrementally
+
+Usage:
+    python sync_catalog.py clean_products.csv
+    python sync_catalog.py supplier_prices.csv --keep-missing   # partial list: never deactivate
+    python sync_catalog.py clean_products.csv --dry-run
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import time
+
+from database import SessionLocal
+from utils.catalog_import import sync_catalog, LEVELS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally sync the product catalog")
+    parser.add_argument("path", help="Catalog CSV file")
+    parser.add_argument("--keep-missing", action="store_true", help="Do not deactivate rows missing from the file")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without applying them")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = sync_catalog(db, stream, deactivate_missing=not args.keep_missing, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    for level in LEVELS:
+        c = report[level]
+        print(f"  {level}: +{c['inserted']} ~{c['updated']} -{c['deactivated']} ({c['unchanged']} unchanged)")
+    print(f"✓ Catalog {'checked' if args.dry_run else 'synced'} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Test setup: a throwaway SQLite database, created before the app is imported.
+
+Run from the project root:  python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix="crm-tests-")
+os.environ["DATABASE_URI"] = f"sqlite:///{os.path.join(TMP, 'test.db')}"
+os.environ["QUOTE_STORE_DIR"] = os.path.join(TMP, "quote_store")
+sys.path.insert(0, ROOT)
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import models
+from database import engine, SessionLocal, Base
+from utils.auth_cache import claims_cache
+from utils.security import create_access_token, get_password_hash
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    """ Every test starts from empty tables """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    claims_cache.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user():
+    def make(username, role="sales_executive", store="Palakad", password="pw"):
+        session = SessionLocal()
+        try:
+            user = models.User(
+                username=username, full_name=username.title(), hashed_password=get_password_hash(password),
+                role=role, store_assigned=store
+            )
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            session.expunge(user)
+            return user
+        finally:
+            session.close()
+    return make
+
+
+def auth_headers(user) -> dict:
+    token = create_access_token({
+        "sub": user.username, "role": user.role, "user_id": user.id,
+        "sales_executive_id": user.username, "store_assigned": user.store_assigned
+    })
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,22 @@
+from conftest import auth_headers
+
+
+def test_monthly_list_is_the_callers_store_sales_team_only(client, make_user):
+    lead = make_user("tl1", role="TEAM_LEAD")
+    mine = make_user("se1")
+    make_user("se2", store="Kochi")
+    make_user("tl2", role="TEAM_LEAD")
+
+    response = client.get("/attendance/monitor-monthly-list", params={"month": 1, "year": 2026},
+                          headers=auth_headers(lead))
+    assert response.status_code == 200
+    assert [report["user_id"] for report in response.json()] == [mine.id]
+
+
+def test_monthly_list_without_a_store_is_refused(client, make_user):
+    director = make_user("dir", role="director", store=None)
+    make_user("se1")
+
+    response = client.get("/attendance/monitor-monthly-list", params={"month": 1, "year": 2026},
+                          headers=auth_headers(director))
+    assert response.status_code == 403
@@ -0,0 +1,30 @@
+from datetime import datetime, date, timedelta
+
+from models import Lead, FollowUp
+from utils.followup_inbox import followup_inbox_statement
+
+
+def _codes(db, executive_id, tab, today):
+    return sorted(lead.lead_code for lead, _ in db.execute(followup_inbox_statement(executive_id, tab, today)))
+
+
+def test_latest_followup_decides_the_tab(db):
+    today = date(2026, 3, 10)
+    created = datetime(2026, 3, 1)
+    db.add_all([
+        Lead(lead_code="L-1", customer_name="A", phone="1", sales_executive_id="7", status="FollowUp", lead_created_at=created),
+        Lead(lead_code="L-2", customer_name="B", phone="2", sales_executive_id="7", status="FollowUp", lead_created_at=created),
+        Lead(lead_code="L-3", customer_name="C", phone="3", sales_executive_id="8", status="FollowUp", lead_created_at=created),
+    ])
+    # L-1: an old follow-up for today, then a newer one moving it to next week
+    db.add_all([
+        FollowUp(lead_code="L-1", next_followup_date=datetime(2026, 3, 10, 9)),
+        FollowUp(lead_code="L-1", next_followup_date=datetime(2026, 3, 17, 9)),
+        FollowUp(lead_code="L-3", next_followup_date=datetime(2026, 3, 17, 9)),
+    ])
+    db.commit()
+
+    assert _codes(db, "7", "today", today) == ["L-2"]        # No follow-up: due since creation
+    assert _codes(db, "7", "upcoming", today) == ["L-1"]
+    assert _codes(db, "8", "upcoming", today) == ["L-3"]
+    assert _codes(db, "7", "upcoming", today + timedelta(days=7)) == []
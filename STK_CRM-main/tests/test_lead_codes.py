@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from models import Lead, LeadCodeCounter
+from utils.lead_codes import LeadCodeAllocator, reserve_block, format_lead_code
+
+
+def test_first_block_starts_after_legacy_codes(db):
+    year = datetime.now().year
+    db.add_all([
+        Lead(lead_code=format_lead_code(year, 9), customer_name="A", phone="1"),
+        Lead(lead_code=format_lead_code(year, 10), customer_name="B", phone="2"),   # Longer code sorts last
+    ])
+    db.commit()
+
+    assert reserve_block(year, 5) == (11, 16)
+    assert reserve_block(year, 5) == (16, 21)
+    assert db.query(LeadCodeCounter.next_value).filter(LeadCodeCounter.year == year).scalar() == 21
+
+
+def test_allocators_never_share_codes():
+    year = datetime.now().year
+    workers = [LeadCodeAllocator(block_size=3), LeadCodeAllocator(block_size=3)]
+
+    codes = [workers[i % 2].next_code() for i in range(10)]
+    codes += workers[0].take(7)   # Spans more than one block
+
+    assert len(set(codes)) == len(codes) == 17
+    assert all(code.startswith(f"L-{year}-") for code in codes)
+    assert codes[:3] == [format_lead_code(year, n) for n in (1, 4, 2)]
+
+
+def test_threads_share_one_allocator_safely():
+    allocator = LeadCodeAllocator(block_size=4)
+    with ThreadPoolExecutor(8) as pool:
+        codes = list(pool.map(lambda _: allocator.next_code(), range(50)))
+
+    year = datetime.now().year
+    assert sorted(codes) == sorted(format_lead_code(year, n) for n in range(1, 51))
@@ -0,0 +1,65 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from utils import password_service
+
+
+def test_pool_is_replaced_after_a_process_dies():
+    hashed = password_service.hash_password("secret")
+    pool = password_service._get_pool()
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+
+    # Calls fail fast at most once while the dead pool is noticed, then recover
+    for _ in range(20):
+        try:
+            assert password_service.verify_and_update("secret", hashed)[0]
+            break
+        except HTTPException as e:
+            assert e.status_code == 503
+            time.sleep(0.1)
+    else:
+        pytest.fail("password pool did not recover")
+    assert password_service._get_pool() is not pool
+
+
+def test_timeout_is_503_and_keeps_the_slot_until_the_job_ends(monkeypatch):
+    release = threading.Event()
+
+    class SlowPool:
+        def submit(self, fn, *args):
+            from concurrent.futures import Future
+            future = Future()
+
+            def work():
+                release.wait(5)
+                future.set_result("done")
+            threading.Thread(target=work, daemon=True).start()
+            return future
+
+    monkeypatch.setattr(password_service, "_get_pool", lambda: SlowPool())
+    monkeypatch.setattr(password_service, "PASSWORD_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(password_service, "_pending", threading.BoundedSemaphore(1))
+
+    with pytest.raises(HTTPException) as timed_out:
+        password_service.hash_password("x")
+    assert timed_out.value.status_code == 503 and timed_out.value.headers["Retry-After"]
+
+    # Still running: no slot for another job
+    with pytest.raises(HTTPException) as busy:
+        password_service.hash_password("y")
+    assert busy.value.status_code == 503
+
+    release.set()
+    for _ in range(50):
+        if password_service._pending.acquire(blocking=False):
+            password_service._pending.release()
+            break
+        time.sleep(0.01)
+    else:
+        pytest.fail("slot was not released when the job finished")
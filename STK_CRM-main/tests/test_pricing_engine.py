@@ -0,0 +1,34 @@
+import pytest
+
+from utils.pricing_engine import PriceArrays, QuoteSpec, PricingError, price_quote
+
+PRODUCTS = [(1, "Standard Board", 40, "Gypsum")]
+VARIANTS = [
+    # id, brand, variant, price, component, type, sub category
+    (1, "Tata", "0.30", 90, "Ceiling Section", "CHANNEL", "Gypsum"),
+    (2, "Jindal", "0.30", 80, "Ceiling Section", "CHANNEL", "Gypsum"),
+    (3, "Tata", None, 12, "Screws", "ACCESSORY", "Gypsum"),
+]
+
+
+def test_quote_prices_each_line():
+    arrays = PriceArrays(PRODUCTS, VARIANTS)
+    spec = QuoteSpec(area_sqft=100, board="Standard Board", channel="Ceiling Section",
+                     accessories=[("Screws", 5)], brand="Tata", thickness="0.30")
+
+    quote = price_quote(arrays, spec)
+
+    names = [item["name"] for item in quote["items"]]
+    assert names == ["Standard Board", "Ceiling Section - Tata - 0.30", "Screws - Tata"]
+    assert quote["items"][2]["total"] == 60
+
+
+def test_missing_channel_names_the_line_and_item():
+    arrays = PriceArrays(PRODUCTS, VARIANTS)
+    spec = QuoteSpec(area_sqft=100, board="Standard Board", channel="Ceiling Section",
+                     accessories=[("Screws", None)], brand="Tata", thickness="0.50")
+
+    with pytest.raises(PricingError) as error:
+        price_quote(arrays, spec)
+
+    assert str(error.value) == "No priced channel 'Ceiling Section' in brand Tata / thickness 0.50"
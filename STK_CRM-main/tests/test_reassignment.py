@@ -0,0 +1,67 @@
+from models import Lead, LeadEvent, ChangeLog
+from utils.lead_events import REASSIGNED
+from utils.reassignment import (
+    reassign_leads, active_lead_ids, summarize, REASSIGNED_OK, UNCHANGED, NOT_FOUND, INVALID_TARGET, FORBIDDEN
+)
+
+
+def _lead(code, owner, status="Open"):
+    return Lead(lead_code=code, customer_name=code, phone=code, sales_executive_id=str(owner.id), status=status)
+
+
+def test_plan_outcomes_within_a_store(db, make_user):
+    leaving = make_user("leaving")
+    staying = make_user("staying")
+    elsewhere = make_user("elsewhere", store="Thrissur")
+    db.add_all([_lead("L-1", leaving), _lead("L-2", leaving, status="Delivered"),
+                _lead("L-3", elsewhere), _lead("L-4", staying)])
+    db.commit()
+    ids = {lead.lead_code: lead.id for lead in db.query(Lead)}
+
+    assert active_lead_ids(db, leaving.id) == [ids["L-1"]]
+
+    outcomes = reassign_leads(db, [
+        (ids["L-1"], elsewhere.id),
+        (ids["L-1"], staying.id),      # Listed twice: the last target wins
+        (ids["L-2"], elsewhere.id),    # Target outside the store
+        (ids["L-3"], staying.id),      # Lead of another store
+        (ids["L-4"], staying.id),
+        (9999, staying.id),
+    ], actor_id=str(leaving.id), store="Palakad")
+    db.commit()
+
+    by_lead = {outcome["lead_id"]: outcome for outcome in outcomes}
+    assert by_lead[ids["L-1"]]["status"] == REASSIGNED_OK
+    assert by_lead[ids["L-1"]]["from"] == str(leaving.id)
+    assert by_lead[ids["L-2"]]["status"] == INVALID_TARGET
+    assert by_lead[ids["L-3"]] == {"lead_id": ids["L-3"], "lead_code": None, "from": None,
+                                    "to": str(staying.id), "status": FORBIDDEN}
+    assert by_lead[ids["L-4"]]["status"] == UNCHANGED
+    assert by_lead[9999]["status"] == NOT_FOUND
+    assert summarize(outcomes) == {REASSIGNED_OK: 1, INVALID_TARGET: 1, FORBIDDEN: 1, UNCHANGED: 1, NOT_FOUND: 1}
+
+    owners = {lead.lead_code: lead.sales_executive_id for lead in db.query(Lead)}
+    assert owners == {"L-1": str(staying.id), "L-2": str(leaving.id), "L-3": str(elsewhere.id), "L-4": str(staying.id)}
+
+    event = db.query(LeadEvent).filter(LeadEvent.event_type == REASSIGNED).one()
+    assert (event.lead_id, event.sales_executive_id, event.store) == (ids["L-1"], str(staying.id), "Palakad")
+
+    changes = [(c.op, c.owner_id) for c in db.query(ChangeLog).filter(
+        ChangeLog.entity == "lead", ChangeLog.entity_id == ids["L-1"]
+    ).order_by(ChangeLog.id)][-2:]
+    assert changes == [("delete", str(leaving.id)), ("upsert", str(staying.id))]
+
+
+def test_without_store_any_executive_can_receive(db, make_user):
+    owner = make_user("owner")
+    other = make_user("other", store="Thrissur")
+    db.add(_lead("L-1", owner))
+    db.commit()
+    lead_id = db.query(Lead.id).scalar()
+
+    outcomes = reassign_leads(db, [(lead_id, other.id)])
+    db.commit()
+
+    assert [outcome["status"] for outcome in outcomes] == [REASSIGNED_OK]
+    assert db.query(Lead.sales_executive_id).scalar() == str(other.id)
+    assert reassign_leads(db, []) == []
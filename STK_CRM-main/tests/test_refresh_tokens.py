@@ -0,0 +1,97 @@
+from sqlalchemy import update
+
+import utils.refresh_tokens as refresh_tokens
+from models import User, RefreshToken
+from utils.principals import load_principal
+from utils.security import create_refresh_token
+
+
+def _login(client, username, device="phone"):
+    response = client.post("/auth/login", json={"username": username, "password": "pw"}, headers={"User-Agent": device})
+    assert response.status_code == 200
+    return response.json()["refresh_token"]
+
+
+def _refresh(client, token):
+    return client.post("/auth/token/refresh", json={"refresh_token": token})
+
+
+def test_refresh_rotates_within_the_family(client, db, make_user):
+    make_user("se1")
+    first = _login(client, "se1")
+
+    response = _refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert second != first
+    assert _refresh(client, second).status_code == 200
+
+    rows = db.query(RefreshToken).order_by(RefreshToken.id).all()
+    assert len(rows) == 3
+    assert len({row.family_id for row in rows}) == 1
+    assert [row.rotated_at is not None for row in rows] == [True, True, False]
+
+
+def test_concurrent_refresh_gets_the_same_successor(client, db, make_user):
+    make_user("se1")
+    first = _login(client, "se1")
+
+    winner = _refresh(client, first)
+    loser = _refresh(client, first)   # Same token again, inside the grace window
+
+    assert winner.status_code == loser.status_code == 200
+    assert winner.json()["refresh_token"] == loser.json()["refresh_token"]
+    assert db.query(RefreshToken).filter(RefreshToken.revoked_at.isnot(None)).count() == 0
+
+
+def test_reuse_after_grace_revokes_only_that_device(client, db, make_user, monkeypatch):
+    make_user("se1")
+    phone = _login(client, "se1", device="phone")
+    laptop = _login(client, "se1", device="laptop")
+    phone_next = _refresh(client, phone).json()["refresh_token"]
+
+    monkeypatch.setattr(refresh_tokens, "REUSE_GRACE_SECONDS", -1)
+    reused = _refresh(client, phone)
+
+    assert reused.status_code == 401
+    assert _refresh(client, phone_next).status_code == 401   # The whole phone family is gone
+    assert _refresh(client, laptop).status_code == 200       # The other device is untouched
+
+
+def test_state_of_rows(db, make_user):
+    make_user("se1")
+    principal = load_principal(db, "se1")
+    token, family_id = refresh_tokens.issue(db, principal)
+    db.commit()
+
+    assert refresh_tokens.state(refresh_tokens.lookup(db, token)) == refresh_tokens.ACTIVE
+    assert refresh_tokens.state(refresh_tokens.lookup(db, "not-a-token")) == refresh_tokens.NOT_FOUND
+
+    successor = refresh_tokens.rotate(db, refresh_tokens.lookup(db, token))
+    assert refresh_tokens.rotate(db, refresh_tokens.lookup(db, token)) is None   # Already rotated
+    assert refresh_tokens.state(refresh_tokens.lookup(db, token)) == refresh_tokens.REUSED
+    assert refresh_tokens.successor(db, refresh_tokens.lookup(db, token)) == successor
+
+    refresh_tokens.revoke_family(db, family_id)
+    db.commit()
+    assert refresh_tokens.state(refresh_tokens.lookup(db, successor)) == refresh_tokens.REVOKED
+    assert refresh_tokens.successor(db, refresh_tokens.lookup(db, token)) is None
+
+
+def test_legacy_token_is_migrated_once(client, db, make_user):
+    user = make_user("se1")
+    legacy = create_refresh_token({"sub": "se1", "user_id": user.id})
+    db.execute(update(User).where(User.id == user.id).values(refresh_token=legacy))
+    db.commit()
+
+    response = _refresh(client, legacy)
+    assert response.status_code == 200
+    assert _refresh(client, response.json()["refresh_token"]).status_code == 200
+    assert _refresh(client, legacy).status_code == 401
+    db.expire_all()
+    assert db.query(User.refresh_token).filter(User.id == user.id).scalar() is None
+
+
+def test_missing_or_invalid_token(client):
+    assert client.post("/auth/token/refresh", json={}).status_code == 400
+    assert _refresh(client, "garbage").status_code == 401
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+
+from models import Lead, RenderJob
+from utils.render_queue import requeue_stale, MAX_ATTEMPTS, QUEUED, RUNNING, FAILED
+
+
+def test_stale_jobs_are_requeued_until_they_run_out_of_attempts(db):
+    lead = Lead(lead_code="L-1", customer_name="C", phone="9800000000")
+    db.add(lead)
+    db.flush()
+    long_ago = datetime.now() - timedelta(hours=1)
+    retry = RenderJob(lead_id=lead.id, status=RUNNING, attempts=1, started_at=long_ago)
+    poison = RenderJob(lead_id=lead.id, status=RUNNING, attempts=MAX_ATTEMPTS, started_at=long_ago)
+    fresh = RenderJob(lead_id=lead.id, status=RUNNING, attempts=MAX_ATTEMPTS, started_at=datetime.now())
+    db.add_all([retry, poison, fresh])
+    db.commit()
+
+    assert requeue_stale(db) == 1
+    db.expire_all()
+    assert (retry.status, poison.status, fresh.status) == (QUEUED, FAILED, RUNNING)
+    assert poison.finished_at is not None
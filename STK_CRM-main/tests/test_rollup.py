@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import rebuild_daily_rollup
+from models import Lead, DailyExecRollup
+from utils.lead_events import creation_events, record_lead_events_bulk
+from utils.rollup import creation_deltas, apply_deltas, set_lead_total
+
+
+def _rows(db):
+    return sorted(
+        (r.sales_executive_id, r.store, r.leads_created, r.revenue)
+        for r in db.query(DailyExecRollup) if r.leads_created or r.revenue
+    )
+
+
+def test_revised_total_stays_with_the_creator(db, make_user, monkeypatch):
+    creator = make_user("creator", store="Palakad")
+    successor = make_user("successor", store="Thrissur")
+    lead = Lead(lead_code="L-1", customer_name="A", phone="1", sales_executive_id=str(creator.id),
+                status="New", total_estimated_cost=1000, lead_created_at=datetime(2026, 3, 1, 10))
+    db.add(lead)
+    db.flush()
+    events = creation_events(lead, store="Palakad")
+    record_lead_events_bulk(db, events)
+    apply_deltas(db, creation_deltas({}, lead, events))
+    db.commit()
+
+    lead.sales_executive_id = str(successor.id)
+    db.commit()
+    set_lead_total(db, lead, 400)
+    db.commit()
+
+    live = _rows(db)
+    assert live == [(str(creator.id), "Palakad", 1, 400)]
+
+    monkeypatch.setattr("sys.argv", ["rebuild_daily_rollup.py"])
+    rebuild_daily_rollup.main()
+    db.expire_all()
+    assert _rows(db) == live
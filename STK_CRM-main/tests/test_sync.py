@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import Lead
+from utils.change_tracking import change_row, record_changes
+from utils.pagination import encode_cursor
+from conftest import auth_headers
+
+
+def _write_lead(session, lead_code, owner_id, change_id):
+    """ A lead and its change_log row with a chosen id, as a transaction that flushed at that point would have """
+    lead_id = session.execute(
+        insert(Lead).values(lead_code=lead_code, customer_name=lead_code, phone="9800000000",
+                            sales_executive_id=owner_id)
+    ).inserted_primary_key[0]
+    row = SimpleNamespace(id=lead_id, lead_code=lead_code, sales_executive_id=owner_id)
+    record_changes(session, [dict(change_row(row, "upsert", entity="lead"), id=change_id)])
+
+
+def _sync(client, headers, since=None, limit=None):
+    params = {}
+    if since:
+        params["since"] = since
+    if limit:
+        params["limit"] = limit
+    response = client.get("/sync", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_lower_id_committed_after_a_sync_is_not_skipped(client, make_user):
+    se = make_user("se1")
+    headers = auth_headers(se)
+    owner = str(se.id)
+
+    # Transaction A flushed first (change_log id 10) but commits last; B (id 20) commits first
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        _write_lead(second, "L-B", owner, 20)
+        second.commit()
+
+        page = _sync(client, headers)
+        assert [lead["lead_code"] for lead in page["changes"]["lead"]] == ["L-B"]
+
+        _write_lead(first, "L-A", owner, 10)
+        first.commit()
+    finally:
+        first.close()
+        second.close()
+
+    page = _sync(client, headers, since=page["cursor"])
+    assert [lead["lead_code"] for lead in page["changes"]["lead"]] == ["L-A"]
+
+    page = _sync(client, headers, since=page["cursor"])
+    assert page["changes"]["lead"] == [] and not page["has_more"]
+
+
+def test_pages_return_every_change_once(client, make_user):
+    se = make_user("se1")
+    headers = auth_headers(se)
+    session = SessionLocal()
+    try:
+        for i, change_id in enumerate([5, 3, 4, 1, 2]):
+            _write_lead(session, f"L-{i}", str(se.id), change_id)
+            session.commit()
+    finally:
+        session.close()
+
+    seen, cursor = [], None
+    while True:
+        page = _sync(client, headers, since=cursor, limit=2)
+        seen += [lead["lead_code"] for lead in page["changes"]["lead"]]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert sorted(seen) == [f"L-{i}" for i in range(5)]
+
+
+def test_cursor_from_before_commit_seq_resumes_after_that_row(client, make_user):
+    se = make_user("se1")
+    headers = auth_headers(se)
+    session = SessionLocal()
+    try:
+        _write_lead(session, "L-OLD", str(se.id), 1)
+        _write_lead(session, "L-NEW", str(se.id), 2)
+        session.commit()
+    finally:
+        session.close()
+    _sync(client, headers)  # Stamps both rows
+
+    page = _sync(client, headers, since=encode_cursor([1]))
+    assert [lead["lead_code"] for lead in page["changes"]["lead"]] == ["L-NEW"]
+
+    assert client.get("/sync", params={"since": "not-a-cursor"}, headers=headers).status_code == 400
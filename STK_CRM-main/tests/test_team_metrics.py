@@ -0,0 +1,33 @@
+from datetime import datetime, date
+
+from models import Lead, StoreManagerDashboard
+from utils.team_metrics import executive_metrics
+
+
+def test_orders_are_counted_once_per_lead_for_requested_executives(db):
+    created = datetime(2026, 3, 10, 10)
+    db.add_all([
+        Lead(lead_code="L-1", customer_name="A", phone="1", sales_executive_id="7", status="Delivered",
+             total_estimated_cost=500, lead_created_at=created),
+        Lead(lead_code="L-2", customer_name="B", phone="2", sales_executive_id="7", status="Today",
+             total_estimated_cost=300, lead_created_at=datetime(2026, 3, 9)),
+        Lead(lead_code="L-3", customer_name="C", phone="3", sales_executive_id="8", status="Delivered",
+             lead_created_at=created),
+    ])
+    db.add_all([
+        StoreManagerDashboard(lead_code="L-1", status="Delivered"),
+        StoreManagerDashboard(lead_code="L-1", status="Pending"),
+        StoreManagerDashboard(lead_code="L-3", status="Delivered"),
+    ])
+    db.commit()
+
+    metrics = executive_metrics(db, [7, 9], day=date(2026, 3, 10))
+
+    assert set(metrics) == {"7", "9"}
+    assert metrics["7"]["total_leads"] == 2
+    assert metrics["7"]["pending_leads"] == 1
+    assert metrics["7"]["delivered_leads"] == 1
+    assert metrics["7"]["handovers"] == 2
+    assert metrics["7"]["handovers_delivered"] == 1
+    assert metrics["7"]["daily_revenue"] == 500
+    assert metrics["9"]["total_leads"] == 0
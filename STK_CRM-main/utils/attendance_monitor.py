@@ -0,0 +1,76 @@
+"""
+Attendance reads and writes keyed on (user_id, attendance_date).
+
+Check-in inserts the day's row under a savepoint and falls back to the
+existing row when the unique key says it is already there, so two racing
+check-ins cannot create two rows. today_snapshot() reads a whole store's
+day in one statement: users LEFT JOIN that day's attendance, plus an EXISTS
+probe of the leave calendar for that day.
+"""
+from datetime import date, datetime, time
+
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Attendance, User
+from utils.leave_calendar import on_leave_clause
+
+OFFICE_START_TIME = time(9, 30)  # 9:30 AM is the cutoff for "Late"
+
+
+def attendance_for(db: Session, user_id: int, day: date):
+    return db.query(Attendance).filter(
+        Attendance.user_id == user_id, Attendance.attendance_date == day
+    ).first()
+
+
+def check_in(db: Session, user_id: int, location: str, now: datetime = None):
+    """ (attendance row, created) for today's check-in; the caller commits """
+    now = now or datetime.now()
+    today = now.date()
+
+    existing = attendance_for(db, user_id, today)
+    if existing:
+        return existing, False
+
+    is_late = now.time() > OFFICE_START_TIME
+    attendance = Attendance(
+        user_id=user_id,
+        date=datetime.combine(today, time.min),
+        attendance_date=today,
+        check_in=now,
+        location=location,
+        status="Late" if is_late else "Present",
+        is_late=is_late
+    )
+    try:
+        with db.begin_nested():
+            db.add(attendance)
+    except IntegrityError:
+        return attendance_for(db, user_id, today), False
+    return attendance, True
+
+
+def check_out(db: Session, user_id: int, now: datetime = None):
+    """ Today's attendance row with check_out set, or None if there was no check-in """
+    now = now or datetime.now()
+    entry = attendance_for(db, user_id, now.date())
+    if entry:
+        entry.check_out = now
+    return entry
+
+
+def today_snapshot(db: Session, store: str, day: date = None):
+    """ One row per sales executive of `store`: attendance columns (None if absent) and on_leave """
+    day = day or date.today()
+    return db.query(
+        User.id, User.username,
+        Attendance.status, Attendance.check_in, Attendance.check_out, Attendance.location, Attendance.is_late,
+        on_leave_clause(User.id, day).label("on_leave")
+    ).outerjoin(
+        Attendance, and_(Attendance.user_id == User.id, Attendance.attendance_date == day)
+    ).filter(
+        User.store_assigned == store,
+        User.role == "sales_executive"
+    ).order_by(User.id).all()
@@ -0,0 +1,102 @@
+"""
+Monthly attendance reports for many staff at once.
+
+monthly_reports() reads a month with two range-bounded queries, whatever
+the number of staff: users LEFT JOIN their attendance rows for the month
+(on the (user_id, attendance_date) key), and those users' leave calendar
+days in the month (utils/leave_calendar.py). Rows are grouped per user in
+memory and every report is computed in one pass.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from models import Attendance, User
+from utils.leave_calendar import leave_days_by_user
+
+PRESENT_STATUSES = ("Present", "Late", "On Duty")
+
+
+def month_bounds(month: int, year: int):
+    """ [first day, first day of next month) """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def attendance_score(leaves_taken: int, late_marks: int) -> int:
+    raw_score = (leaves_taken * 5) - (late_marks * 2)
+    if raw_score <= 0:
+        return 0
+    return max(0, 100 - raw_score)
+
+
+def monthly_reports(db: Session, month: int, year: int, store: str = None, user_id: int = None) -> list:
+    """
+    MonthlyAttendanceReport dicts for the sales executives of `store`
+    (optionally only `user_id` among them), or without a store for the one
+    user `user_id`. Callers must pass one of the two.
+    """
+    if store is None and user_id is None:
+        raise ValueError("monthly_reports needs a store or a user_id")
+    start, end = month_bounds(month, year)
+
+    staff = db.query(
+        User.id, User.username,
+        Attendance.status, Attendance.is_late, Attendance.date, Attendance.check_in
+    ).outerjoin(
+        Attendance, and_(
+            Attendance.user_id == User.id,
+            Attendance.attendance_date >= start,
+            Attendance.attendance_date < end
+        )
+    )
+    if store is not None:
+        staff = staff.filter(User.store_assigned == store, User.role == "sales_executive")
+    if user_id is not None:
+        staff = staff.filter(User.id == user_id)
+    staff = staff.order_by(User.id, Attendance.attendance_date).all()
+
+    users = {}
+    attendance = defaultdict(list)
+    for row in staff:
+        users.setdefault(row.id, row.username)
+        if row.check_in is not None:
+            attendance[row.id].append(row)
+
+    # Leave days inside the month only, so a leave crossing months is split between them
+    leaves = leave_days_by_user(db, users, start, end - timedelta(days=1))
+
+    reports = []
+    for uid, username in users.items():
+        days_present = 0
+        late_history = []
+        for att in attendance[uid]:
+            if att.status in PRESENT_STATUSES:
+                days_present += 1
+            if att.is_late:
+                late_history.append({
+                    "date_str": att.date.strftime("%d %b"),
+                    "time_str": att.check_in.strftime("%I:%M %p")
+                })
+
+        leave_days = {day for day, _, _ in leaves[uid]}  # Overlapping leaves count once
+        leave_history = {}
+        for day, leave_id, reason in leaves[uid]:
+            leave_history.setdefault(leave_id, {"date_str": day.strftime("%d %b"), "reason": reason or ""})
+
+        leaves_taken = len(leave_days)
+        reports.append({
+            "user_id": uid,
+            "user_name": username,
+            "role": "Sales Executive",
+            "score_percentage": attendance_score(leaves_taken, len(late_history)),
+            "leaves_taken_count": leaves_taken,
+            "days_present_count": days_present,
+            "late_marks_count": len(late_history),
+            "leave_history": list(leave_history.values()),
+            "late_history": late_history
+        })
+    return reports
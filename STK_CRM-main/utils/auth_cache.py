@@ -0,0 +1,179 @@
+"""
+Per-process caches behind get_current_user.
+
+Every authenticated request used to jwt.decode its bearer token and rebuild
+the user dict. ClaimsCache keeps the verified result per token, keyed by the
+sha256 of the token string (so a hit is exactly a token that already passed
+signature verification) and dropped at the token's own exp; it is bounded
+and evicts least recently used tokens.
+
+A cached token must still be refused once revoked, without a database hit
+per request. RevocationSet holds the unexpired rows of token_revocations in
+memory and reloads them at most every REVOCATION_REFRESH_SECONDS, so logout
+and password change reach every worker within that interval (immediately in
+the worker that handled them).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import TokenRevocation
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "10"))
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class ClaimsCache:
+    """ token digest -> (value, exp); bounded LRU, entries expire at the token's exp """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: bytes, value, exp: float):
+        if self.maxsize <= 0 or exp <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (value, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RevocationSet:
+    """ In-memory copy of token_revocations: revoked jtis and per-login not_before """
+
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._jtis = {}         # jti -> expires_at
+        self._not_before = {}   # login name -> (not_before, expires_at)
+        self._loaded_at = None
+        self._refresh_lock = threading.Lock()
+
+    def _add(self, jtis: dict, not_before: dict, jti, login_name, nb, expires_at):
+        if jti:
+            jtis[jti] = expires_at
+        if login_name and nb is not None:
+            current = not_before.get(login_name)
+            if current is None or nb > current[0]:
+                not_before[login_name] = (nb, expires_at)
+
+    def refresh(self):
+        """ Reloads all unexpired revocations (one indexed range read) """
+        now = datetime.utcnow()
+        jtis, not_before = {}, {}
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(TokenRevocation.jti, TokenRevocation.login_name, TokenRevocation.not_before,
+                       TokenRevocation.expires_at)
+                .where(TokenRevocation.expires_at > now)
+            )
+            for row in rows:
+                self._add(jtis, not_before, row.jti, row.login_name, row.not_before, row.expires_at)
+        finally:
+            db.close()
+        # Swap whole dicts: readers never see a half-loaded set
+        self._jtis, self._not_before = jtis, not_before
+        self._loaded_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def refresh_if_stale(self):
+        if not self.is_stale():
+            return
+        # One thread reloads; the others keep using the current copy
+        if not self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self.is_stale():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    if self._loaded_at is None:
+                        raise
+                    print(f"Token revocation refresh failed, keeping the previous set: {e}")
+                    self._loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def is_revoked(self, claims: dict) -> bool:
+        self.refresh_if_stale()
+        jti = claims.get("jti")
+        if jti and jti in self._jtis:
+            return True
+        entry = self._not_before.get(claims.get("sub"))
+        # Tokens issued before iat was added count as issued at 0
+        return entry is not None and (claims.get("iat") or 0) < entry[0]
+
+    def note(self, jti=None, login_name=None, not_before=None, expires_at=None):
+        """ Applies a revocation written by this process right away """
+        self._add(self._jtis, self._not_before, jti, login_name, not_before, expires_at)
+
+
+claims_cache = ClaimsCache()
+revocations = RevocationSet()
+
+
+# ==========================================
+# Writing revocations (the caller commits)
+# ==========================================
+def _expiry(exp) -> datetime:
+    return datetime.utcfromtimestamp(exp) if exp else datetime.utcnow() + timedelta(days=7)
+
+
+def revoke_token(db, claims: dict):
+    """ Logout: revokes one token by its jti until it expires """
+    jti = claims.get("jti")
+    if not jti:
+        return False
+    expires_at = _expiry(claims.get("exp"))
+    try:
+        with db.begin_nested():
+            db.execute(insert(TokenRevocation).values(jti=jti, expires_at=expires_at))
+    except IntegrityError:
+        pass  # Already revoked
+    revocations.note(jti=jti, expires_at=expires_at)
+    return True
+
+
+def revoke_login(db, login_name: str, lifetime: timedelta):
+    """ Password change: revokes every token of login_name issued before now """
+    # iat has one-second resolution: tokens issued in this second are revoked too
+    not_before = int(time.time()) + 1
+    expires_at = datetime.utcnow() + lifetime
+    db.execute(insert(TokenRevocation).values(login_name=login_name, not_before=not_before, expires_at=expires_at))
+    revocations.note(login_name=login_name, not_before=not_before, expires_at=expires_at)
+    return not_before
@@ -0,0 +1,119 @@
+"""
+Cross-worker cache invalidation.
+
+Each gunicorn worker keeps its own in-memory caches. Writers bump a row in
+cache_versions, either inside their transaction (rare writes such as the
+catalog) or right after commit in a short transaction of its own (hot
+writes such as the stats counters, so the row is never locked for long);
+readers poll the version (a primary key lookup) at most every few seconds
+and rebuild when it moved.
+"""
+import asyncio
+import os
+import time
+import threading
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from models import CacheVersion
+
+CACHE_VERSION_CHECK_SECONDS = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "2"))
+
+# name -> VersionedCache instances in this worker
+_caches = {}
+
+
+def bump_version(conn, name: str):
+    """ Increments `name` on a Connection that is part of the writer's transaction """
+    table = CacheVersion.__table__
+    bumped = conn.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1)
+    ).rowcount
+    if bumped:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(table).values(name=name, version=1))
+    except IntegrityError:
+        conn.execute(update(table).where(table.c.name == name).values(version=table.c.version + 1))
+
+
+def bump_version_now(bind, name: str):
+    """ Increments `name` in its own transaction on `bind` (an Engine or Connection), after the writer committed """
+    engine = getattr(bind, "engine", bind)
+    with engine.begin() as conn:
+        bump_version(conn, name)
+
+
+def read_version(conn, name: str) -> int:
+    table = CacheVersion.__table__
+    return conn.execute(select(table.c.version).where(table.c.name == name)).scalar() or 0
+
+
+class VersionedCache:
+    """
+    Holds one value built by `loader(db)` and rebuilds it when the named
+    version changes. The version is polled at most every
+    CACHE_VERSION_CHECK_SECONDS, so readers see writes from other workers
+    within that window.
+    """
+
+    def __init__(self, name: str, loader, check_seconds: float = CACHE_VERSION_CHECK_SECONDS):
+        self.name = name
+        self.loader = loader
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._async_lock = None
+        _caches.setdefault(name, []).append(self)
+
+    def _fresh(self) -> bool:
+        return self._version is not None and time.monotonic() - self._checked_at < self.check_seconds
+
+    def get(self, db):
+        """ (value, version) """
+        if self._fresh():
+            return self._value, self._version
+
+        with self._lock:
+            if self._fresh():
+                return self._value, self._version
+            version = read_version(db.connection(), self.name)
+            if version != self._version:
+                self._value = self.loader(db)
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._value, self._version
+
+    async def get_async(self, db):
+        """
+        get() for an AsyncSession. Waits on an asyncio lock rather than the
+        thread lock, which would block the event loop while another coroutine reloads.
+        """
+        if self._fresh():
+            return self._value, self._version
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self._fresh():
+                return self._value, self._version
+            version = await db.run_sync(lambda session: read_version(session.connection(), self.name))
+            if version != self._version:
+                self._value = await db.run_sync(self.loader)
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._value, self._version
+
+    def invalidate(self):
+        """ Forces a version check on the next get() (used after local writes) """
+        self._checked_at = 0.0
+
+
+def invalidate_caches(name: str):
+    """ Makes every cache built on `name` in this worker re-check its version """
+    for cache in _caches.get(name, []):
+        cache.invalidate()
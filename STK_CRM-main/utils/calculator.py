@@ -1,5 +1,24 @@
+import numpy as np
+
+BOARD_SQFT = 32  # One 8 ft x 4 ft sheet
+
+# Material needed per sqft of ceiling, by bill-of-materials line
+MATERIAL_RATES = {
+    "board": 1 / BOARD_SQFT,
+    "channel": 0.06,    # ceiling_section
+    "grid": 0.08,       # main_tee
+    "accessory": 0.08,  # Default when no accessory quantity is given
+}
+
+
 def calculate_material(area_sqft: int):
     return {
-        "ceiling_section": area_sqft * 0.06,
-        "main_tee": area_sqft * 0.08
+        "ceiling_section": area_sqft * MATERIAL_RATES["channel"],
+        "main_tee": area_sqft * MATERIAL_RATES["grid"]
     }
+
+
+def material_quantities(areas) -> dict:
+    """ Whole units needed per BOM line for each area (vectorized over `areas`) """
+    areas = np.asarray(areas, dtype=np.float64)
+    return {line: np.ceil(areas * rate) for line, rate in MATERIAL_RATES.items()}
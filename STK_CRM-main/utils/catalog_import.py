@@ -0,0 +1,254 @@
+"""
+Incremental catalog sync from the products CSV (clean_products.csv layout).
+
+The CSV is streamed with the csv module and reduced to the desired set of
+categories, sub categories, products, components and variants keyed by
+their natural keys (names, plus component type / brand / variant). That set
+is diffed against the existing rows and only the differences are written:
+multi-row INSERTs for new keys, bulk UPDATEs by primary key for changed
+prices or reactivated rows, and is_active = False for rows that are no
+longer in the file. Rows are never deleted, so ids referenced elsewhere stay
+valid, and everything commits in one transaction so readers see either the
+old or the new catalog. Price strings are parsed here into the typed price
+columns, and every new or changed price appends a price_history row.
+"""
+import csv
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import Category, SubCategory, Product, Component, ComponentVariant
+from utils.cache_versions import bump_version
+from utils.catalog_snapshot import CATALOG_CACHE
+from utils.price_index import (
+    product_prices, variant_prices, history_row, record_price_history, PRODUCT, VARIANT
+)
+
+CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_SYNC_BATCH_SIZE", "1000"))
+
+PRODUCT_GROUP = "SUGGESTED_PRODUCT"
+LEVELS = ("categories", "sub_categories", "products", "components", "variants")
+PRICE_FIELDS = ("price", "price_min", "price_max")
+PRICED_LEVELS = {"products": PRODUCT, "variants": VARIANT}
+
+
+def _clean(value) -> str:
+    """ Strips cells; "nan" is what the old pandas seeding stored for empty cells """
+    value = str(value or "").strip()
+    return "" if value.lower() == "nan" else value
+
+
+def read_catalog(stream) -> dict:
+    """ level -> {natural key: updatable fields} for every row of the CSV """
+    desired = {level: {} for level in LEVELS}
+
+    for row in csv.DictReader(stream):
+        category = _clean(row.get("Category"))
+        sub = _clean(row.get("Sub Category"))
+        item_group = _clean(row.get("Item Group")).upper()
+        item_name = _clean(row.get("Item Name"))
+        if not (category and sub and item_group and item_name):
+            continue  # Blank separator lines and incomplete rows
+
+        desired["categories"][(category,)] = {}
+        desired["sub_categories"][(category, sub)] = {}
+
+        if item_group == PRODUCT_GROUP:
+            price_str = _clean(row.get("Price"))
+            price_bar = _clean(row.get("Price Bar"))
+            desired["products"][(category, sub, item_name)] = {
+                "price_str": price_str,
+                "price_bar": price_bar,
+                **product_prices(price_str, price_bar)
+            }
+        else:
+            brand = _clean(row.get("Brand"))
+            variant = _clean(row.get("Variant"))
+            desired["components"][(category, sub, item_name, item_group)] = {}
+            price_range = _clean(row.get("Price Bar"))
+            desired["variants"][(category, sub, item_name, item_group, brand, variant)] = {
+                "brand_name": brand,
+                "variant": variant,
+                "price_range": price_range,
+                **variant_prices(price_range)
+            }
+
+    return desired
+
+
+def _load_existing(db: Session):
+    """ level -> ({natural key: row}, [duplicate rows]) for the current tables """
+    existing = {}
+
+    def index(level, rows, key_of):
+        by_key, duplicates = {}, []
+        for row in rows:
+            key = key_of(row)
+            if key in by_key:
+                duplicates.append(row)
+            else:
+                by_key[key] = row
+        existing[level] = (by_key, duplicates)
+        return by_key
+
+    categories = db.query(Category).order_by(Category.id).all()
+    category_names = {c.id: _clean(c.name) for c in categories}
+    index("categories", categories, lambda c: (_clean(c.name),))
+
+    subs = db.query(SubCategory).order_by(SubCategory.id).all()
+    sub_keys = {s.id: (category_names.get(s.category_id), _clean(s.name)) for s in subs}
+    index("sub_categories", subs, lambda s: sub_keys[s.id])
+
+    products = db.query(Product).order_by(Product.id).all()
+    index("products", products, lambda p: sub_keys.get(p.sub_category_id, (None, None)) + (_clean(p.name),))
+
+    components = db.query(Component).order_by(Component.id).all()
+    component_keys = {
+        c.id: sub_keys.get(c.sub_category_id, (None, None)) + (_clean(c.name), _clean(c.type).upper())
+        for c in components
+    }
+    index("components", components, lambda c: component_keys[c.id])
+
+    variants = db.query(ComponentVariant).order_by(ComponentVariant.id).all()
+    index("variants", variants, lambda v: component_keys.get(v.component_id, (None,) * 4) + (
+        _clean(v.brand_name), _clean(v.variant)
+    ))
+
+    return existing
+
+
+def _reload_ids(db: Session, level: str, ids: dict):
+    """ Refreshes natural key -> id for a level after inserting into it """
+    if level == "categories":
+        rows = db.query(Category.id, Category.name)
+        ids[level] = {(_clean(name),): id_ for id_, name in rows}
+    elif level == "sub_categories":
+        category_names = {id_: key[0] for key, id_ in ids["categories"].items()}
+        rows = db.query(SubCategory.id, SubCategory.category_id, SubCategory.name).order_by(SubCategory.id.desc())
+        ids[level] = {(category_names.get(cat_id), _clean(name)): id_ for id_, cat_id, name in rows}
+    elif level == "components":
+        sub_keys = {id_: key for key, id_ in ids["sub_categories"].items()}
+        rows = db.query(Component.id, Component.sub_category_id, Component.name, Component.type) \
+            .order_by(Component.id.desc())
+        ids[level] = {
+            sub_keys.get(sub_id, (None, None)) + (_clean(name), _clean(type_).upper()): id_
+            for id_, sub_id, name, type_ in rows
+        }
+    elif level == "products":
+        sub_keys = {id_: key for key, id_ in ids["sub_categories"].items()}
+        rows = db.query(Product.id, Product.sub_category_id, Product.name).order_by(Product.id.desc())
+        ids[level] = {sub_keys.get(sub_id, (None, None)) + (_clean(name),): id_ for id_, sub_id, name in rows}
+    elif level == "variants":
+        component_keys = {id_: key for key, id_ in ids["components"].items()}
+        rows = db.query(
+            ComponentVariant.id, ComponentVariant.component_id, ComponentVariant.brand_name, ComponentVariant.variant
+        ).order_by(ComponentVariant.id.desc())
+        ids[level] = {
+            component_keys.get(component_id, (None,) * 4) + (_clean(brand), _clean(variant)): id_
+            for id_, component_id, brand, variant in rows
+        }
+
+
+def _new_row(level, key, fields, ids):
+    if level == "categories":
+        return {"name": key[0], "is_active": True}
+    if level == "sub_categories":
+        return {"name": key[1], "category_id": ids["categories"][key[:1]], "is_active": True}
+    if level == "products":
+        return {"name": key[2], "sub_category_id": ids["sub_categories"][key[:2]], "is_active": True, **fields}
+    if level == "components":
+        return {"name": key[2], "type": key[3], "sub_category_id": ids["sub_categories"][key[:2]], "is_active": True}
+    return {"component_id": ids["components"][key[:4]], "is_active": True, **fields}
+
+
+def _batches(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def sync_catalog(db: Session, stream, deactivate_missing: bool = True, dry_run: bool = False,
+                 batch_size: int = CATALOG_BATCH_SIZE) -> dict:
+    """
+    Applies the CSV in `stream` to the catalog tables.
+    Returns level -> {"inserted", "updated", "deactivated", "unchanged"}.
+    """
+    models = {
+        "categories": Category, "sub_categories": SubCategory, "products": Product,
+        "components": Component, "variants": ComponentVariant
+    }
+    desired = read_catalog(stream)
+    existing = _load_existing(db)
+    report = {level: {"inserted": 0, "updated": 0, "deactivated": 0, "unchanged": 0} for level in LEVELS}
+    ids = {level: {key: row.id for key, row in existing[level][0].items()} for level in LEVELS}
+    repriced = {level: [] for level in PRICED_LEVELS}
+
+    try:
+        for level in LEVELS:
+            model = models[level]
+            by_key, duplicates = existing[level]
+            wanted = desired[level]
+            counts = report[level]
+
+            updates = []
+            for key, row in by_key.items():
+                if key in wanted:
+                    changes = {f: v for f, v in wanted[key].items() if getattr(row, f) != v}
+                    if row.is_active is False:
+                        changes["is_active"] = True
+                    if changes:
+                        updates.append({"id": row.id, **changes})
+                        if level in PRICED_LEVELS and any(f in changes for f in PRICE_FIELDS):
+                            repriced[level].append(key)
+                        counts["updated"] += 1
+                    else:
+                        counts["unchanged"] += 1
+                elif deactivate_missing and row.is_active is not False:
+                    updates.append({"id": row.id, "is_active": False})
+                    counts["deactivated"] += 1
+
+            for row in duplicates:
+                if deactivate_missing and row.is_active is not False:
+                    updates.append({"id": row.id, "is_active": False})
+                    counts["deactivated"] += 1
+
+            new_keys = [key for key in wanted if key not in by_key]
+            counts["inserted"] = len(new_keys)
+            if level in PRICED_LEVELS:
+                repriced[level].extend(new_keys)
+
+            if dry_run:
+                continue
+
+            for batch in _batches(updates, batch_size):
+                db.execute(update(model), batch)
+
+            if new_keys:
+                rows = [_new_row(level, key, wanted[key], ids) for key in new_keys]
+                for batch in _batches(rows, batch_size):
+                    db.execute(insert(model), batch)
+                # Children one level down (and price history) need the new ids
+                _reload_ids(db, level, ids)
+
+        if not dry_run:
+            effective_from = datetime.now()
+            record_price_history(db, [
+                history_row(PRICED_LEVELS[level], ids[level][key], desired[level][key], effective_from)
+                for level in PRICED_LEVELS for key in repriced[level]
+            ])
+
+        changed = any(c["inserted"] or c["updated"] or c["deactivated"] for c in report.values())
+        if dry_run or not changed:
+            db.rollback()
+            return report
+
+        # Bulk statements bypass the flush listener that invalidates /master-data
+        bump_version(db.connection(), CATALOG_CACHE)
+        db.info["catalog_changed"] = True
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return report
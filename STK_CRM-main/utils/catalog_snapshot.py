@@ -0,0 +1,168 @@
+"""
+Precomputed /master-data payload.
+
+The catalog changes rarely, so the whole Category -> SubCategory ->
+Product / Component -> ComponentVariant tree is loaded with eager loading,
+serialized to JSON bytes once and kept per worker with its sha256 ETag.
+Any ORM flush touching a catalog table bumps the "catalog" cache version,
+which makes every worker rebuild on its next request. Scripts that write
+the catalog with raw SQL call bump_version(conn, CATALOG_CACHE) themselves.
+
+Importing this module registers the flush listener.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from models import Category, SubCategory, Product, Component, ComponentVariant
+from utils.cache_versions import bump_version, invalidate_caches, VersionedCache
+
+CATALOG_CACHE = "catalog"
+CATALOG_MODELS = (Category, SubCategory, Product, Component, ComponentVariant)
+
+SOURCES = ["Indiamart", "Walk-In", "Google", "JustDial", "Site Visit"]
+DISTRICTS = ["Salem", "Palakkad", "Malappuram", "Coimbatore", "Thrissur", "Erode", "Tirupur"]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    body: bytes
+    etag: str
+    content_hash: str
+
+
+def _by_id(items):
+    """ Active rows in id order (rows dropped from the catalog CSV are kept but deactivated) """
+    return sorted((item for item in items if item.is_active is not False), key=lambda item: item.id)
+
+
+def build_master_data(db) -> dict:
+    """ The /master-data document, from four eager-load queries """
+    categories = db.query(Category).options(
+        selectinload(Category.sub_categories).selectinload(SubCategory.products),
+        selectinload(Category.sub_categories).selectinload(SubCategory.components)
+            .selectinload(Component.variants)
+    ).all()
+
+    data = {
+        "categories": [],
+        "sources": SOURCES
+    }
+
+    # 🔹 These are for DUMMY FORMAT (frontend use)
+    materials = []
+    accessories = []
+
+    for cat in _by_id(categories):
+        cat_dict = {
+            "name": cat.name,
+            "sub_categories": []
+        }
+
+        for sub in _by_id(cat.sub_categories):
+            sub_dict = {
+                "name": sub.name,
+                "Suggested_product": [],
+                "channel": [],
+                "accessories": [],
+                "gridtype": []
+            }
+
+            # Suggested Products
+            for prod in _by_id(sub.products):
+                sub_dict["Suggested_product"].append({
+                    "name": prod.name,
+                    "price": prod.price_str,
+                    "price_bar": prod.price_bar
+                })
+
+                # ➕ Dummy MATERIAL format
+                materials.append({
+                    "id": len(materials) + 1,
+                    "name": prod.name,
+                    "brand": "Standard",
+                    "price": prod.price,
+                    "unit": "per sheet"
+                })
+
+            # Components
+            for comp in _by_id(sub.components):
+                variants = []
+                for v in _by_id(comp.variants):
+                    variants.append({
+                        "brand": v.brand_name,
+                        "variant": v.variant,
+                        "price_bar": v.price_range
+                    })
+
+                    # ➕ Dummy ACCESSORY format
+                    accessories.append({
+                        "id": len(accessories) + 1,
+                        "name": f"{comp.name} ({v.variant})",
+                        "price": v.price,
+                        "unit": "per piece"
+                    })
+
+                item_entry = {
+                    "name": comp.name,
+                    "variants": variants
+                }
+
+                if comp.type == "CHANNEL":
+                    sub_dict["channel"].append(item_entry)
+                elif comp.type == "GRID_TYPE":
+                    sub_dict["gridtype"].append(item_entry)
+                elif comp.type == "ACCESSORY":
+                    sub_dict["accessories"].append(item_entry)
+
+            cat_dict["sub_categories"].append(sub_dict)
+
+        data["categories"].append(cat_dict)
+
+    # 🔹 Attach dummy-format arrays WITHOUT breaking existing response
+    data["materials"] = materials
+    data["accessories"] = accessories
+    data["districts"] = DISTRICTS
+
+    return data
+
+
+def build_snapshot(db) -> CatalogSnapshot:
+    body = json.dumps(build_master_data(db), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    content_hash = hashlib.sha256(body).hexdigest()
+    return CatalogSnapshot(body=body, etag=f'"{content_hash}"', content_hash=content_hash)
+
+
+catalog_snapshot = VersionedCache(CATALOG_CACHE, build_snapshot)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_catalog_version(session, flush_context):
+    touched = any(
+        isinstance(obj, CATALOG_MODELS)
+        for objects in (session.new, session.dirty, session.deleted) for obj in objects
+    )
+    if touched:
+        bump_version(session.connection(), CATALOG_CACHE)
+        session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_local_catalog(session):
+    if session.info.pop("catalog_changed", False):
+        invalidate_caches(CATALOG_CACHE)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_flag(session):
+    session.info.pop("catalog_changed", None)
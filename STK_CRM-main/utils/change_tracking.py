@@ -0,0 +1,144 @@
+"""
+Change log for the mobile delta sync (/sync).
+
+Every ORM flush that inserts, updates or deletes one of the synced models
+appends rows to change_log in the same transaction; deletes are kept as
+tombstones. Paths that bypass the ORM unit of work (bulk INSERT/UPDATE
+statements) call record_changes().
+
+The id alone cannot be the sync cursor: ids are taken at flush time, so a
+long transaction (a bulk import batch) can commit rows with lower ids after
+a client was handed a cursor past them. stamp_committed() gives committed,
+unstamped rows the next commit_seq, one batch at a time under a lock, so a
+batch only becomes visible after every earlier batch; /sync pages by
+(commit_seq, id) and never skips a row that commits late.
+
+Importing this module registers the flush listener.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Lead, FollowUp, StoreManagerDashboard, Attendance, LeaveRequest, ChangeLog, CacheVersion
+
+# cache_versions row used as the commit_seq counter (and the lock that orders batches)
+COMMIT_SEQ_NAME = "change_log_seq"
+STAMP_BATCH_SIZE = 5000
+
+
+def _lead_scope(obj):
+    return {"owner_id": obj.sales_executive_id, "lead_code": obj.lead_code, "store": None}
+
+
+def _followup_scope(obj):
+    return {"owner_id": None, "lead_code": obj.lead_code, "store": None}
+
+
+def _store_order_scope(obj):
+    return {"owner_id": None, "lead_code": obj.lead_code, "store": obj.store_name}
+
+
+def _user_scope(obj):
+    return {"owner_id": str(obj.user_id) if obj.user_id is not None else None, "lead_code": None, "store": None}
+
+
+# entity name -> (model, scope keys extractor)
+SYNC_ENTITIES = {
+    "lead": (Lead, _lead_scope),
+    "followup": (FollowUp, _followup_scope),
+    "store_order": (StoreManagerDashboard, _store_order_scope),
+    "attendance": (Attendance, _user_scope),
+    "leave_request": (LeaveRequest, _user_scope),
+}
+
+ENTITY_BY_MODEL = {model: name for name, (model, _) in SYNC_ENTITIES.items()}
+
+
+def change_row(obj, op: str, changed_at: datetime = None, entity: str = None) -> dict:
+    """ `obj` may also be a column row; pass `entity` explicitly in that case """
+    entity = entity or ENTITY_BY_MODEL[type(obj)]
+    _, scope = SYNC_ENTITIES[entity]
+    return dict(
+        entity=entity,
+        entity_id=obj.id,
+        op=op,
+        changed_at=changed_at or datetime.utcnow(),
+        **scope(obj)
+    )
+
+
+def record_changes(db: Session, rows: list):
+    """ Appends change_log rows built with change_row() (for bulk statements) """
+    if rows:
+        db.execute(insert(ChangeLog.__table__), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _log_synced_changes(session, flush_context):
+    now = datetime.utcnow()
+    rows = []
+
+    for obj in session.new:
+        if type(obj) in ENTITY_BY_MODEL:
+            rows.append(change_row(obj, "upsert", now))
+
+    for obj in session.dirty:
+        if type(obj) in ENTITY_BY_MODEL and session.is_modified(obj, include_collections=False):
+            rows.append(change_row(obj, "upsert", now))
+
+    for obj in session.deleted:
+        if type(obj) in ENTITY_BY_MODEL:
+            rows.append(change_row(obj, "delete", now))
+
+    if rows:
+        session.connection().execute(insert(ChangeLog.__table__), rows)
+
+
+def _lock_commit_seq(db: Session) -> int:
+    """ Locks the counter row until the caller commits; returns the last assigned commit_seq """
+    table = CacheVersion.__table__
+    locked = select(table.c.version).where(table.c.name == COMMIT_SEQ_NAME).with_for_update()
+    current = db.execute(locked).scalar()
+    if current is not None:
+        return current
+    try:
+        with db.begin_nested():
+            db.execute(insert(table).values(name=COMMIT_SEQ_NAME, version=0))
+    except IntegrityError:
+        pass
+    return db.execute(locked).scalar() or 0
+
+
+def stamp_committed(db: Session) -> int:
+    """
+    Gives committed change_log rows without a commit_seq the next one, a batch
+    per transaction; commits, and returns the number of rows stamped.
+    Uncommitted rows are invisible here and get a later commit_seq once they commit.
+    """
+    table = ChangeLog.__table__
+    stamped = 0
+    while True:
+        # Plain (snapshot) read: sees committed rows only and waits on no writer
+        ids = [row_id for (row_id,) in db.execute(
+            select(table.c.id).where(table.c.commit_seq.is_(None)).order_by(table.c.id).limit(STAMP_BATCH_SIZE)
+        )]
+        if not ids:
+            db.commit()
+            return stamped
+
+        seq = _lock_commit_seq(db) + 1
+        # Rows another request stamped while this one waited for the lock keep their commit_seq
+        count = db.execute(
+            update(table).where(table.c.id.in_(ids), table.c.commit_seq.is_(None)).values(commit_seq=seq)
+        ).rowcount
+        if count:
+            db.execute(
+                update(CacheVersion.__table__).where(CacheVersion.__table__.c.name == COMMIT_SEQ_NAME)
+                .values(version=seq)
+            )
+        db.commit()
+        stamped += count
+        if len(ids) < STAMP_BATCH_SIZE:
+            return stamped
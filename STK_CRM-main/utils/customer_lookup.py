@@ -0,0 +1,133 @@
+"""
+Customer lookup by phone number.
+
+Phones are stored twice: as typed (Lead.phone) and as a normalized key
+(Lead.phone_key) that is indexed, so "+91 98470 12345", "098470 12345" and
+"9847012345" all resolve to the same customer. Recent lookups are kept in a
+small in-process LRU cache.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from models import Lead
+
+COUNTRY_CODE = "91"
+LOCAL_NUMBER_LENGTH = 10
+CUSTOMER_LOOKUP_CACHE_SIZE = int(os.getenv("CUSTOMER_LOOKUP_CACHE_SIZE", "2048"))
+
+
+def normalize_phone(phone: str):
+    """ Digits only, without trunk prefix (0) or the +91 country code """
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone).lstrip("0")
+    if len(digits) == LOCAL_NUMBER_LENGTH + len(COUNTRY_CODE) and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    return digits or None
+
+
+def normalize_phone_prefix(partial: str):
+    """ Same as normalize_phone, but for a number that is still being typed """
+    if not partial:
+        return None
+    explicit_country_code = partial.strip().startswith("+")
+    digits = re.sub(r"\D", "", partial)
+    if explicit_country_code and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    return digits.lstrip("0") or None
+
+
+def customer_details(lead: Lead) -> dict:
+    return {
+        "lead_id": lead.id,
+        "lead_code": lead.lead_code,
+        "source": lead.source,
+        "name": lead.customer_name,
+        "location": lead.location,
+        "district": lead.district,
+        "profile": lead.profile,
+    }
+
+
+class CustomerLookupCache:
+    """ Thread-safe LRU of phone_key -> customer details (hits only) """
+
+    def __init__(self, max_size: int = CUSTOMER_LOOKUP_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+customer_cache = CustomerLookupCache()
+
+
+def lookup_customer_by_phone(db: Session, phone: str):
+    """ First lead recorded for this phone number, or None """
+    key = normalize_phone(phone)
+    if not key:
+        return None
+
+    cached = customer_cache.get(key)
+    if cached is not None:
+        return cached
+
+    lead = db.query(Lead).filter(Lead.phone_key == key).order_by(Lead.id).first()
+    if not lead:
+        return None
+
+    details = customer_details(lead)
+    customer_cache.put(key, details)
+    return details
+
+
+def search_customers_by_prefix(db: Session, partial: str, limit: int = 10):
+    """
+    Customers whose normalized phone starts with the typed digits.
+    Uses an index range scan on phone_key; one row per distinct phone.
+    """
+    prefix = normalize_phone_prefix(partial)
+    if not prefix:
+        return []
+
+    leads = db.query(Lead).filter(
+        Lead.phone_key.like(f"{prefix}%")
+    ).order_by(Lead.phone_key, Lead.id).limit(limit * 3).all()
+
+    results = []
+    seen = set()
+    for lead in leads:
+        if lead.phone_key in seen:
+            continue
+        seen.add(lead.phone_key)
+
+        details = customer_details(lead)
+        details["phone"] = lead.phone
+        results.append(details)
+        if len(results) >= limit:
+            break
+
+    return results
@@ -0,0 +1,65 @@
+"""
+Content-addressed file store for generated documents.
+
+A document is saved under its SHA-256 (QUOTE_STORE_DIR/ab/abcdef...), so
+rendering the same quotation twice stores one file, and a stored file never
+changes. Writes go to a temporary file that is renamed into place, so
+concurrent workers writing the same content are safe.
+
+Render workers write and the API reads, possibly on different hosts, so
+QUOTE_STORE_DIR must be an absolute path on storage they all mount; there
+is no default.
+"""
+import hashlib
+import os
+import tempfile
+
+QUOTE_STORE_DIR = os.getenv("QUOTE_STORE_DIR")
+
+
+def store_dir() -> str:
+    """ QUOTE_STORE_DIR, refusing an unset or relative path (each host would get its own store) """
+    if not QUOTE_STORE_DIR or not os.path.isabs(QUOTE_STORE_DIR):
+        raise RuntimeError(
+            "QUOTE_STORE_DIR must be an absolute path on storage shared by the API and every render worker"
+        )
+    return QUOTE_STORE_DIR
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def path_for(digest: str) -> str:
+    return os.path.join(store_dir(), digest[:2], digest)
+
+
+def put(content: bytes) -> str:
+    """ Stores `content` (once) and returns its hash """
+    digest = content_hash(content)
+    path = path_for(digest)
+    if os.path.exists(path):
+        return digest
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return digest
+
+
+def get(digest: str):
+    """ Stored bytes, or None if missing """
+    if not digest or not all(c in "0123456789abcdef" for c in digest):
+        return None
+    try:
+        with open(path_for(digest), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
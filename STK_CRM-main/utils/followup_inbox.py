@@ -0,0 +1,63 @@
+"""
+Follow-up inbox for sales executives.
+
+Resolves each lead's latest follow-up and its today/upcoming/delivered bucket
+in a single statement instead of one FollowUp query per lead.
+"""
+from datetime import datetime, date, time, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from models import Lead, FollowUp
+
+
+def latest_followup_id():
+    """
+    Id of the newest follow-up of the outer query's lead: correlated, so it is
+    one followups(lead_code, id) index probe per lead of this executive rather
+    than a GROUP BY over every lead's follow-ups
+    """
+    newer = aliased(FollowUp)
+    return select(func.max(newer.id)).where(newer.lead_code == Lead.lead_code).correlate(Lead).scalar_subquery()
+
+
+def followup_inbox_statement(sales_executive_id: str, tab: str, today: date = None):
+    """
+    Returns a select() yielding (Lead, next_followup) rows for the given tab
+    (run on the async session by /leads/follow-up-leads).
+    next_followup is the latest follow-up's date, falling back to lead_created_at.
+    """
+    today = today or datetime.now().date()
+    tomorrow_start = datetime.combine(today + timedelta(days=1), time.min)
+
+    next_followup = func.coalesce(FollowUp.next_followup_date, Lead.lead_created_at).label("next_followup")
+
+    query = select(Lead, next_followup).outerjoin(
+        FollowUp, FollowUp.id == latest_followup_id()
+    ).filter(
+        Lead.sales_executive_id == sales_executive_id
+    )
+
+    if tab == "delivered":
+        return query.filter(Lead.status == "Delivered")
+
+    query = query.filter(Lead.status.notin_(["Delivered"]))
+
+    if tab == "upcoming":
+        return query.filter(next_followup >= tomorrow_start)
+
+    return query.filter(next_followup < tomorrow_start)
+
+
+def serialize_inbox_row(lead: Lead, next_followup):
+    return {
+        "lead_id": lead.id,
+        "lead_code": lead.lead_code,
+        "customer_name": lead.customer_name,
+        "status": lead.status,
+        "district": lead.district,
+        "phone": lead.phone,
+        "last_action": lead.last_action,
+        "next_followup": next_followup
+    }
@@ -0,0 +1,120 @@
+"""
+Lead code allocator.
+
+Codes look like L-YYYY-NNNN. Numbers come from a per-year row in
+lead_code_counters that is bumped atomically, so concurrent requests (and
+gunicorn workers) never hand out the same code. Each process reserves a
+block of numbers at a time and serves codes from memory until it runs out.
+"""
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+
+from database import engine
+from models import Lead, LeadCodeCounter
+
+LEAD_CODE_BLOCK_SIZE = int(os.getenv("LEAD_CODE_BLOCK_SIZE", "20"))
+MAX_RESERVE_ATTEMPTS = 5
+
+
+def format_lead_code(year: int, number: int) -> str:
+    return f"L-{year}-{str(number).zfill(4)}"
+
+
+def _highest_existing_number(conn, year: int) -> int:
+    """ Largest number already used for this year (codes issued before the counter existed) """
+    prefix = f"L-{year}-"
+    last_code = conn.execute(
+        select(Lead.lead_code)
+        .where(Lead.lead_code.like(f"{prefix}%"))
+        .order_by(func.length(Lead.lead_code).desc(), Lead.lead_code.desc())
+        .limit(1)
+    ).scalar()
+
+    if not last_code:
+        return 0
+    try:
+        return int(last_code[len(prefix):])
+    except ValueError:
+        return 0
+
+
+def reserve_block(year: int, size: int):
+    """
+    Atomically reserves `size` numbers for `year`.
+    Returns (first, end) where end is exclusive.
+    """
+    counter = LeadCodeCounter.__table__
+
+    for _ in range(MAX_RESERVE_ATTEMPTS):
+        try:
+            with engine.begin() as conn:
+                # The UPDATE takes the row lock; reading back inside the same
+                # transaction therefore sees our own increment.
+                bumped = conn.execute(
+                    update(counter)
+                    .where(counter.c.year == year)
+                    .values(next_value=counter.c.next_value + size)
+                ).rowcount
+
+                if not bumped:
+                    # First code of the year: start after any legacy codes
+                    first = _highest_existing_number(conn, year) + 1
+                    conn.execute(insert(counter).values(year=year, next_value=first + size))
+                    return first, first + size
+
+                end = conn.execute(
+                    select(counter.c.next_value).where(counter.c.year == year)
+                ).scalar()
+                return end - size, end
+        except IntegrityError:
+            # Another worker created this year's row first; bump it instead
+            continue
+
+    raise RuntimeError(f"Could not reserve lead codes for {year}")
+
+
+class LeadCodeAllocator:
+    """ Hands out lead codes from a per-process block of reserved numbers """
+
+    def __init__(self, block_size: int = LEAD_CODE_BLOCK_SIZE):
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._year = None
+        self._next = 0
+        self._end = 0
+
+    def next_code(self) -> str:
+        return self.take(1)[0]
+
+    def take(self, count: int):
+        """ Returns `count` unused codes for the current year """
+        year = datetime.now().year
+        codes = []
+
+        with self._lock:
+            # Never share a block with a forked parent/sibling process
+            if self._pid != os.getpid() or self._year != year:
+                self._reset()
+                self._year = year
+
+            while len(codes) < count:
+                if self._next >= self._end:
+                    wanted = max(self.block_size, count - len(codes))
+                    self._next, self._end = reserve_block(year, wanted)
+
+                take_now = min(count - len(codes), self._end - self._next)
+                codes.extend(format_lead_code(year, n) for n in range(self._next, self._next + take_now))
+                self._next += take_now
+
+        return codes
+
+
+lead_code_allocator = LeadCodeAllocator()
@@ -0,0 +1,200 @@
+"""
+Bulk lead ingestion for marketplace feeds (Indiamart, JustDial, Google ...).
+
+Rows are read lazily from a CSV or NDJSON text stream, validated with
+LeadCreateSchema, given lead codes in blocks and written with multi-row
+INSERTs, one batch per transaction. Every input row gets an entry in the
+returned report.
+"""
+import csv
+import json
+import os
+from datetime import datetime
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Lead
+from schemas import LeadCreateSchema
+from utils.lead_codes import lead_code_allocator
+from utils.customer_lookup import normalize_phone
+from utils.change_tracking import change_row, record_changes
+from utils.lead_events import creation_events, record_lead_events_bulk, executive_store
+from utils.rollup import creation_deltas, apply_deltas
+from utils.stats_snapshot import apply_counter_deltas, LEAD
+
+IMPORT_BATCH_SIZE = int(os.getenv("LEAD_IMPORT_BATCH_SIZE", "1000"))
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+
+def lead_row_from_schema(data: LeadCreateSchema, lead_code: str, sales_executive_id: str) -> dict:
+    """ Column values for a new Lead, shared by /create-lead and the bulk importer """
+    return dict(
+        lead_code=lead_code,
+        lead_created_at=data.lead_created_at or datetime.now(),
+        sales_executive_id=sales_executive_id,
+        status="Today",
+
+        customer_name=data.customer_name,
+        phone=data.phone,
+        phone_key=normalize_phone(data.phone),
+        source=data.source,
+        location=data.location,
+        district=data.district,
+        profile=data.profile,
+
+        area_sqft=data.area_sqft,
+        project_type=data.project_type,
+        board_type=data.board_type,
+        material_brand=data.material_brand,
+        channel=data.channel,
+        channel_thickness=data.channel_thickness,
+        material_category=data.material_category,
+        material_quantity=data.material_quantity,
+        accessory_name=data.accessory_name,
+        accessory_qty=data.accessory_qty,
+        urgency=data.urgency,
+
+        quotation_created_at=data.quotation_created_at,
+        quotation_id=data.quotation_id,
+        total_estimated_cost=data.total_estimated_cost,
+        quotation_ended_at=data.quotation_ended_at,
+
+        approver_request_at=data.approver_request_at,
+        approver_status="PENDING" if data.approver_request_at else None,
+        last_action="Lead Created"
+    )
+
+
+def detect_format(content_type: str, filename: str = "") -> str:
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def iter_raw_rows(stream, fmt: str):
+    """ Yields (row_number, dict_or_None, error_or_None); row numbers are 1-based data rows """
+    if fmt == "ndjson":
+        row_no = 0
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            row_no += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_no, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row_no, None, "Each line must be a JSON object"
+                continue
+            yield row_no, record, None
+        return
+
+    reader = csv.DictReader(stream)
+    for row_no, record in enumerate(reader, start=1):
+        # Blank cells mean "not provided" so Optional fields validate
+        cleaned = {
+            (k or "").strip(): (v.strip() if isinstance(v, str) else v)
+            for k, v in record.items() if k
+        }
+        yield row_no, {k: v for k, v in cleaned.items() if v not in ("", None)}, None
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    parts = []
+    for err in e.errors():
+        field = ".".join(str(loc) for loc in err.get("loc", ()))
+        parts.append(f"{field}: {err.get('msg')}")
+    return "; ".join(parts)
+
+
+def _flush_batch(db: Session, pending: list, results: list, store=None):
+    """ Assigns codes to a validated batch and inserts it with one multi-row statement """
+    if not pending:
+        return 0
+
+    codes = lead_code_allocator.take(len(pending))
+    rows = []
+    for (row_no, data, sales_executive_id), code in zip(pending, codes):
+        rows.append(lead_row_from_schema(data, code, sales_executive_id))
+
+    try:
+        db.execute(insert(Lead), rows)
+
+        # Bulk INSERT bypasses the flush listener; log the new leads for /sync
+        created_leads = db.query(Lead).filter(Lead.lead_code.in_(codes)).all()
+        record_changes(db, [change_row(lead, "upsert", entity="lead") for lead in created_leads])
+
+        events = []
+        rollup = {}
+        for lead in created_leads:
+            lead_events = creation_events(lead, store=store)
+            creation_deltas(rollup, lead, lead_events)
+            events.extend(lead_events)
+        record_lead_events_bulk(db, events)
+        apply_deltas(db, rollup)
+
+        # Bulk INSERT also bypasses the status counter listener
+        counts = {}
+        for lead in created_leads:
+            key = (LEAD, store or "", lead.status or "")
+            counts[key] = counts.get(key, 0) + 1
+        if apply_counter_deltas(db.connection(), counts):
+            db.info["stats_changed"] = True
+
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for row_no, _, _ in pending:
+            results.append({"row": row_no, "status": "error", "errors": f"Database error: {e.__class__.__name__}"})
+        return 0
+
+    for (row_no, _, _), code in zip(pending, codes):
+        results.append({"row": row_no, "status": "created", "lead_code": code})
+    return len(rows)
+
+
+def import_leads(db: Session, stream, fmt: str, sales_executive_id: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Imports every row of `stream` for the given sales executive.
+    Returns {"total", "created", "failed", "results": [{"row", "status", ...}]}.
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'")
+
+    results = []
+    pending = []
+    total = 0
+    created = 0
+    store = executive_store(db, sales_executive_id)
+
+    for row_no, record, error in iter_raw_rows(stream, fmt):
+        total += 1
+        if error:
+            results.append({"row": row_no, "status": "error", "errors": error})
+            continue
+
+        try:
+            data = LeadCreateSchema(**record)
+        except ValidationError as e:
+            results.append({"row": row_no, "status": "error", "errors": _format_validation_error(e)})
+            continue
+
+        pending.append((row_no, data, sales_executive_id))
+        if len(pending) >= batch_size:
+            created += _flush_batch(db, pending, results, store)
+            pending = []
+
+    created += _flush_batch(db, pending, results, store)
+    results.sort(key=lambda r: r["row"])
+
+    return {
+        "total": total,
+        "created": created,
+        "failed": total - created,
+        "results": results
+    }
@@ -0,0 +1,141 @@
+"""
+Leave calendar: approved leaves materialized as one leave_days row per day.
+
+"Is X on leave on D", "who is free between A and B" and per-day coverage
+become equality / range lookups on the (day, user_id) and
+(user_id, day, leave_id) indexes, i.e. B-tree probes instead of scans over
+leave_requests comparing start/end dates. Per-day rows also split leaves
+that cross a month boundary correctly: a month counts exactly its own days.
+
+Every flush that creates an approved leave, approves or un-approves one,
+changes its dates or deletes it rewrites that leave's rows in the same
+transaction. rebuild_leave_days.py rebuilds the table from leave_requests.
+
+Importing this module registers the flush listener.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, insert, delete, exists
+from sqlalchemy.orm import Session, attributes
+
+from models import LeaveDay, LeaveRequest, User
+
+APPROVED = "Approved"
+MAX_LEAVE_DAYS = 366  # Guards against a mistyped end date expanding into years of rows
+
+_TRACKED = ("status", "start_date", "end_date", "user_id")
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def leave_dates(start, end) -> list:
+    """ Calendar days from start to end, inclusive """
+    start, end = _as_date(start), _as_date(end)
+    if start is None or end is None or end < start:
+        return []
+    count = min((end - start).days + 1, MAX_LEAVE_DAYS)
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def leave_day_rows(leave) -> list:
+    if leave.status != APPROVED or leave.user_id is None:
+        return []
+    return [dict(leave_id=leave.id, user_id=leave.user_id, day=d) for d in leave_dates(leave.start_date, leave.end_date)]
+
+
+def replace_leave_days(conn, leave_ids: list, rows: list):
+    """ Rewrites the rows of `leave_ids` on a Connection in the writer's transaction """
+    table = LeaveDay.__table__
+    if leave_ids:
+        conn.execute(delete(table).where(table.c.leave_id.in_(leave_ids)))
+    if rows:
+        conn.execute(insert(table), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_leave_days(session, flush_context):
+    leave_ids, rows = [], []
+
+    for obj in session.new:
+        if isinstance(obj, LeaveRequest):
+            rows.extend(leave_day_rows(obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, LeaveRequest) and any(attributes.get_history(obj, key).has_changes() for key in _TRACKED):
+            leave_ids.append(obj.id)
+            rows.extend(leave_day_rows(obj))
+
+    for obj in session.deleted:
+        if isinstance(obj, LeaveRequest):
+            leave_ids.append(obj.id)
+
+    if leave_ids or rows:
+        replace_leave_days(session.connection(), leave_ids, rows)
+
+
+# ==========================================
+# Queries
+# ==========================================
+def on_leave_clause(user_id_column, start: date, end: date = None):
+    """ EXISTS: the user has a leave day in [start, end] (end defaults to start) """
+    if end is None or end == start:
+        return exists().where(LeaveDay.user_id == user_id_column, LeaveDay.day == start)
+    return exists().where(LeaveDay.user_id == user_id_column, LeaveDay.day >= start, LeaveDay.day <= end)
+
+
+def leave_days_by_user(db: Session, user_ids, start: date, end: date) -> dict:
+    """ user_id -> [(day, leave_id, reason)] for leave days in [start, end], by day """
+    found = defaultdict(list)
+    if not user_ids:
+        return found
+    rows = db.query(LeaveDay.user_id, LeaveDay.day, LeaveDay.leave_id, LeaveRequest.reason).join(
+        LeaveRequest, LeaveRequest.id == LeaveDay.leave_id
+    ).filter(
+        LeaveDay.user_id.in_(list(user_ids)), LeaveDay.day >= start, LeaveDay.day <= end
+    ).order_by(LeaveDay.user_id, LeaveDay.day, LeaveDay.leave_id)
+    for user_id, day, leave_id, reason in rows:
+        found[user_id].append((day, leave_id, reason))
+    return found
+
+
+def available_colleagues(db: Session, store: str, start: date, end: date = None, exclude_user_id=None):
+    """ Sales executives of `store` with no leave day in [start, end] """
+    query = db.query(User).filter(
+        User.store_assigned == store,
+        User.role == "sales_executive",
+        ~on_leave_clause(User.id, start, end)
+    )
+    if exclude_user_id is not None:
+        query = query.filter(User.id != exclude_user_id)
+    return query.order_by(User.id).all()
+
+
+def coverage(db: Session, store: str, start: date, end: date) -> list:
+    """ Per day in [start, end]: who of the store's sales executives is on leave and how many are available """
+    staff = dict(
+        db.query(User.id, User.username).filter(User.store_assigned == store, User.role == "sales_executive").all()
+    )
+    away = defaultdict(list)
+    rows = db.query(LeaveDay.day, LeaveDay.user_id).join(User, User.id == LeaveDay.user_id).filter(
+        User.store_assigned == store,
+        User.role == "sales_executive",
+        LeaveDay.day >= start,
+        LeaveDay.day <= end
+    ).distinct().order_by(LeaveDay.day, LeaveDay.user_id)
+    for day, user_id in rows:
+        away[day].append({"user_id": user_id, "username": staff.get(user_id)})
+
+    days = []
+    day = start
+    while day <= end:
+        days.append({
+            "day": day,
+            "on_leave": away.get(day, []),
+            "available_count": len(staff) - len(away.get(day, [])),
+            "staff_count": len(staff)
+        })
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+List routes accept `limit` and an opaque `cursor`. Paging is opt-in: a
+request with neither gets the full list, as before pagination existed, so
+clients that don't read the header never lose rows. The response body keeps
+its existing list shape; when more rows exist, the cursor for the next page
+is returned in the X-Next-Cursor response header.
+"""
+import base64
+import json
+
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """ Dependency: ?limit=&cursor=; limit is None (no paging) when neither is sent """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str = Query(None)
+    ):
+        if limit is None and cursor:
+            limit = DEFAULT_PAGE_SIZE  # A cursor from a paged response keeps paging
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _after(columns, values, descending: bool):
+    """ (c1, c2, ...) > (v1, v2, ...) expanded so each prefix can use the index """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def _paged(query, columns, page: PageParams, descending: bool):
+    """ Cursor predicate, ordering and limit (+1 to detect a next page); Query or select() """
+    if page.cursor:
+        values = decode_cursor(page.cursor, len(columns))
+        query = query.filter(_after(columns, values, descending))
+
+    order = [c.desc() for c in columns] if descending else list(columns)
+    query = query.order_by(*order)
+    return query if page.limit is None else query.limit(page.limit + 1)
+
+
+def _split(rows, page: PageParams, key):
+    next_cursor = None
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return rows, next_cursor
+
+
+def keyset_page(query, columns, page: PageParams, key, descending: bool = False):
+    """
+    Applies ordering, the cursor predicate and the limit to `query`.
+    `columns` must form a unique sort key; `key(row)` returns the matching
+    values for a result row. Returns (rows, next_cursor_or_None).
+    """
+    rows = _paged(query, columns, page, descending).all()
+    return _split(rows, page, key)
+
+
+async def keyset_page_async(db, stmt, columns, page: PageParams, key, descending: bool = False):
+    """
+    keyset_page() for a select() run on an AsyncSession. A statement selecting
+    one entity yields the objects, like a single-entity Query; otherwise rows.
+    """
+    result = await db.execute(_paged(stmt, columns, page, descending))
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+    return _split(rows, page, key)
+
+
+def set_next_cursor(response: Response, next_cursor):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,196 @@
+"""
+Password hashing off the request threads.
+
+argon2/bcrypt are CPU-bound on purpose; run inline, a burst of logins keeps
+every threadpool thread of a gunicorn worker busy hashing and starves all
+other endpoints. Hashes are computed in a small per-worker process pool
+instead, and admission control bounds how much of that pool (and how many
+waiting request threads) logins may take:
+
+- at most PASSWORD_MAX_PENDING hash jobs per worker in flight or queued
+  (a job holds its slot until it finishes, even after its request timed
+  out); beyond that requests get 503 with Retry-After instead of waiting,
+- at most LOGIN_MAX_INFLIGHT_PER_IP / _PER_USER concurrent attempts per
+  client IP / login name (429),
+- at most LOGIN_ATTEMPTS_PER_MINUTE attempts per login name (429).
+
+argon2 parameters come from ARGON2_TIME_COST / ARGON2_MEMORY_COST /
+ARGON2_PARALLELISM (calibrate_argon2.py picks them for a target latency).
+verify_and_update() also returns a replacement hash when the stored one is
+bcrypt or uses older argon2 parameters, so hashes are upgraded on login.
+
+A pool process that dies (e.g. OOM-killed) breaks the whole pool; the
+broken pool is replaced on the next call instead of failing every login
+until the worker restarts.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "2"))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_POOL_WORKERS * 8)))
+PASSWORD_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_TIMEOUT_SECONDS", "10"))
+
+LOGIN_MAX_INFLIGHT_PER_IP = int(os.getenv("LOGIN_MAX_INFLIGHT_PER_IP", "4"))
+LOGIN_MAX_INFLIGHT_PER_USER = int(os.getenv("LOGIN_MAX_INFLIGHT_PER_USER", "2"))
+LOGIN_ATTEMPTS_PER_MINUTE = int(os.getenv("LOGIN_ATTEMPTS_PER_MINUTE", "10"))
+
+ARGON2_PARAMS = dict(
+    argon2__time_cost=int(os.getenv("ARGON2_TIME_COST", "3")),
+    argon2__memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "65536")),  # KiB
+    argon2__parallelism=int(os.getenv("ARGON2_PARALLELISM", "4")),
+)
+
+
+def make_context(**argon2_params) -> CryptContext:
+    """ argon2 for new hashes; bcrypt (and argon2 with other parameters) still verify but need an update """
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto", **(argon2_params or ARGON2_PARAMS))
+
+
+pwd_context = make_context()
+
+
+# ==========================================
+# Work done in the pool processes
+# ==========================================
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str):
+    try:
+        return pwd_context.verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        return False, None  # Empty or unrecognised hash
+
+
+# ==========================================
+# Pool and admission control (request side)
+# ==========================================
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_MAX_PENDING)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the request process is multi-threaded, forking it could copy held locks
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(fn, *args):
+    """ (pool, future); a pool found broken is replaced once """
+    pool = _get_pool()
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool()
+        return pool, pool.submit(fn, *args)
+
+
+def _busy():
+    return HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+def _run(fn, *args):
+    if not _pending.acquire(blocking=False):
+        raise _busy()
+    try:
+        pool, future = _submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    # The slot is freed when the job is done, not when this request stops waiting for it
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=PASSWORD_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        raise _busy()
+    except BrokenProcessPool:
+        # A pool process died while running this job; the next call gets a fresh pool
+        _discard_pool(pool)
+        raise _busy()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def verify_and_update(password: str, hashed: str):
+    """ (matches, new hash or None) """
+    if not hashed:
+        return False, None
+    return _run(_verify_and_update, password, hashed)
+
+
+class AdmissionControl:
+    """ Per-key in-flight limits plus a per-login attempt window (one per worker process) """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = defaultdict(int)
+        self._attempts = defaultdict(deque)
+
+    def _prune(self, now):
+        for key in [k for k, attempts in self._attempts.items() if not attempts or now - attempts[-1] > 60]:
+            del self._attempts[key]
+
+    def _recent_attempts(self, key, now) -> deque:
+        attempts = self._attempts[key]
+        while attempts and now - attempts[0] > 60:
+            attempts.popleft()
+        return attempts
+
+    @contextmanager
+    def admit(self, ip: str = None, login_name: str = None):
+        ip_key, user_key = ("ip", ip), ("user", (login_name or "").lower())
+        now = time.monotonic()
+        with self._lock:
+            if ip and self._inflight.get(ip_key, 0) >= LOGIN_MAX_INFLIGHT_PER_IP:
+                raise HTTPException(status_code=429, detail="Too many concurrent login attempts", headers={"Retry-After": "1"})
+            if login_name and self._inflight.get(user_key, 0) >= LOGIN_MAX_INFLIGHT_PER_USER:
+                raise HTTPException(status_code=429, detail="Too many concurrent login attempts", headers={"Retry-After": "1"})
+            if len(self._attempts) > 10000:
+                self._prune(now)
+            if login_name:
+                attempts = self._recent_attempts(user_key, now)
+                if len(attempts) >= LOGIN_ATTEMPTS_PER_MINUTE:
+                    retry = max(1, int(60 - (now - attempts[0])) + 1)
+                    raise HTTPException(status_code=429, detail="Too many login attempts", headers={"Retry-After": str(retry)})
+                attempts.append(now)
+            self._inflight[ip_key] += 1
+            self._inflight[user_key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for key in (ip_key, user_key):
+                    self._inflight[key] -= 1
+                    if self._inflight[key] <= 0:
+                        del self._inflight[key]
+                if login_name and not self._attempts.get(user_key, True):
+                    del self._attempts[user_key]
+
+
+login_admission = AdmissionControl()
@@ -0,0 +1,127 @@
+"""
+Typed catalog prices and the effective-dated price index.
+
+Catalog prices arrive as strings ("410", "410-390"). parse_price() and
+parse_price_range() turn them into integers once, when the catalog is
+synced; requests only read the typed columns.
+
+price_history keeps one row per price change of a product or variant.
+PriceIndex holds every item's history as sorted effective_from lists, so
+"price of item X on date D" is a bisect, and pricing a whole quotation (or
+re-pricing many) needs no queries at all. The index is rebuilt when the
+catalog cache version moves, i.e. after a catalog sync. The pricing engine
+uses it to price a quote as of a past date (utils/pricing_engine.py).
+"""
+import re
+from bisect import bisect_right
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models import PriceHistory
+from utils.cache_versions import VersionedCache
+from utils.catalog_snapshot import CATALOG_CACHE
+
+PRODUCT = "product"
+VARIANT = "variant"
+
+# Effective date for prices that existed before price_history did
+HISTORY_START = datetime(1970, 1, 1)
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_price(text):
+    """ "410" / "₹ 1,250.00" -> 410 / 1250; None when there is no number """
+    if text is None:
+        return None
+    match = _NUMBER.search(str(text).replace(",", ""))
+    return int(float(match.group())) if match else None
+
+
+def parse_price_range(text):
+    """ "115-110" -> (price 115, min 110, max 115); a single number gives a zero-width range """
+    numbers = [int(float(n)) for n in _NUMBER.findall(str(text or "").replace(",", ""))]
+    if not numbers:
+        return None, None, None
+    return numbers[0], min(numbers), max(numbers)
+
+
+def product_prices(price_str, price_bar) -> dict:
+    price = parse_price(price_str)
+    _, low, high = parse_price_range(price_bar)
+    return {"price": price, "price_min": low if low is not None else price, "price_max": high if high is not None else price}
+
+
+def variant_prices(price_range) -> dict:
+    price, low, high = parse_price_range(price_range)
+    return {"price": price, "price_min": low, "price_max": high}
+
+
+def history_row(item_type: str, item_id: int, prices: dict, effective_from: datetime) -> dict:
+    return dict(
+        item_type=item_type,
+        item_id=item_id,
+        price=prices.get("price"),
+        price_min=prices.get("price_min"),
+        price_max=prices.get("price_max"),
+        effective_from=effective_from
+    )
+
+
+def record_price_history(db, rows: list):
+    """ Inserts history_row() dicts with one multi-row statement """
+    if rows:
+        db.execute(insert(PriceHistory.__table__), rows)
+
+
+class PriceIndex:
+    """ (item_type, item_id) -> parallel sorted lists of effective_from and price tuples """
+
+    def __init__(self, entries: dict):
+        self._entries = entries
+
+    @classmethod
+    def load(cls, db):
+        rows = db.query(
+            PriceHistory.item_type, PriceHistory.item_id, PriceHistory.effective_from,
+            PriceHistory.price, PriceHistory.price_min, PriceHistory.price_max
+        ).order_by(PriceHistory.item_type, PriceHistory.item_id, PriceHistory.effective_from, PriceHistory.id)
+
+        entries = {}
+        for item_type, item_id, effective_from, price, low, high in rows:
+            dates, prices = entries.setdefault((item_type, item_id), ([], []))
+            if dates and dates[-1] == effective_from:
+                prices[-1] = (price, low, high)  # Same instant: the later row wins
+            else:
+                dates.append(effective_from)
+                prices.append((price, low, high))
+        return cls(entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def prices_at(self, item_type: str, item_id: int, when: datetime = None):
+        """ (price, min, max) in effect at `when` (default now), or None """
+        entry = self._entries.get((item_type, item_id))
+        if not entry:
+            return None
+        dates, prices = entry
+        pos = bisect_right(dates, when or datetime.now())
+        return prices[pos - 1] if pos else None
+
+    def price_at(self, item_type: str, item_id: int, when: datetime = None):
+        found = self.prices_at(item_type, item_id, when)
+        return found[0] if found else None
+
+    def price_many(self, items, when: datetime = None) -> dict:
+        """ Bulk lookup: {(item_type, item_id): price or None} for every requested item """
+        return {key: self.price_at(key[0], key[1], when) for key in items}
+
+
+price_index_cache = VersionedCache(CATALOG_CACHE, PriceIndex.load)
+
+
+def current_price_index(db) -> PriceIndex:
+    index, _ = price_index_cache.get(db)
+    return index
@@ -0,0 +1,273 @@
+"""
+Server-side quotation pricing.
+
+A lead's area, board type, channel, grid type and accessories expand into a
+bill of materials (quantities from utils.calculator) over the catalog
+tables. The active catalog is cached per worker as NumPy arrays (rebuilt
+when the catalog cache version moves), and every line of every what-if
+combination (brand x channel thickness x area) is priced in one broadcast
+pass: variant selection is a masked argmin over the candidate prices and
+totals are a sum of price x quantity arrays.
+
+Quotes priced as of a past date (a stored revision being re-priced) swap in
+the prices the effective-dated price index had at that time; the set of
+active items is the current catalog.
+"""
+import copy
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+
+from models import Product, Component, ComponentVariant, SubCategory
+from utils.cache_versions import VersionedCache
+from utils.calculator import material_quantities
+from utils.catalog_snapshot import CATALOG_CACHE
+from utils.price_index import current_price_index, PRODUCT, VARIANT
+
+MAX_COMBINATIONS = 2000
+
+
+def _key(value):
+    return str(value).strip().lower() if value not in (None, "") else None
+
+
+def _active(model):
+    return or_(model.is_active.is_(None), model.is_active == True)  # noqa: E712
+
+
+class PricingError(ValueError):
+    """ The request names something the active catalog does not have """
+
+
+class PriceArrays:
+    """ Column arrays over the active catalog (products and component variants) """
+
+    def __init__(self, products: list, variants: list):
+        self.p_id = np.array([r[0] for r in products], dtype=np.int64)
+        self.p_name = np.array([_key(r[1]) for r in products], dtype=object)
+        self.p_label = [r[1] for r in products]
+        self.p_price = np.array([np.nan if r[2] is None else r[2] for r in products], dtype=np.float64)
+        self.p_sub = np.array([_key(r[3]) for r in products], dtype=object)
+
+        self.v_id = np.array([r[0] for r in variants], dtype=np.int64)
+        self.v_brand = np.array([_key(r[1]) for r in variants], dtype=object)
+        self.v_variant = np.array([_key(r[2]) for r in variants], dtype=object)
+        self.v_price = np.array([np.nan if r[3] is None else r[3] for r in variants], dtype=np.float64)
+        self.v_component = np.array([_key(r[4]) for r in variants], dtype=object)
+        self.v_type = np.array([str(r[5] or "").upper() for r in variants], dtype=object)
+        self.v_sub = np.array([_key(r[6]) for r in variants], dtype=object)
+        self.v_label = [(r[4], r[1], r[2]) for r in variants]  # (component, brand, variant) as stored
+
+        self.sub_names = set(self.p_sub) | set(self.v_sub)
+        self.sub_labels = {_key(r[3]): r[3] for r in products}
+        self.sub_labels.update({_key(r[6]): r[6] for r in variants})
+
+    @classmethod
+    def load(cls, db):
+        products = db.query(Product.id, Product.name, Product.price, SubCategory.name).join(
+            SubCategory, SubCategory.id == Product.sub_category_id
+        ).filter(_active(Product), _active(SubCategory)).order_by(Product.id).all()
+
+        variants = db.query(
+            ComponentVariant.id, ComponentVariant.brand_name, ComponentVariant.variant, ComponentVariant.price,
+            Component.name, Component.type, SubCategory.name
+        ).join(Component, Component.id == ComponentVariant.component_id).join(
+            SubCategory, SubCategory.id == Component.sub_category_id
+        ).filter(
+            _active(ComponentVariant), _active(Component), _active(SubCategory)
+        ).order_by(ComponentVariant.id).all()
+
+        return cls(products, variants)
+
+    def at(self, index, when: datetime) -> "PriceArrays":
+        """ Copy with the prices in effect at `when`; items without any price history keep their current price """
+        arrays = copy.copy(self)
+        arrays.p_price = _prices_at(index, PRODUCT, self.p_id, self.p_price, when)
+        arrays.v_price = _prices_at(index, VARIANT, self.v_id, self.v_price, when)
+        return arrays
+
+    def candidates(self, sub: str, name: str, type_: str) -> np.ndarray:
+        """ Indices of the priced variants of one component """
+        mask = (self.v_sub == sub) & (self.v_component == _key(name)) & (self.v_type == type_) & ~np.isnan(self.v_price)
+        found = np.flatnonzero(mask)
+        if not found.size:
+            raise PricingError(f"No priced {type_.lower().replace('_', ' ')} '{name}' in {sub}")
+        return found
+
+
+def _prices_at(index, item_type: str, ids: np.ndarray, current: np.ndarray, when: datetime) -> np.ndarray:
+    prices = current.copy()
+    for i, item_id in enumerate(ids.tolist()):
+        if (item_type, item_id) in index:
+            price = index.price_at(item_type, item_id, when)
+            prices[i] = np.nan if price is None else price  # Not priced yet at `when`
+    return prices
+
+
+pricing_arrays_cache = VersionedCache(CATALOG_CACHE, PriceArrays.load)
+
+
+def current_price_arrays(db, when: datetime = None) -> PriceArrays:
+    """ The active catalog priced now, or as of `when` """
+    arrays, _ = pricing_arrays_cache.get(db)
+    if when is None:
+        return arrays
+    return arrays.at(current_price_index(db), when)
+
+
+@dataclass
+class QuoteSpec:
+    area_sqft: int
+    sub_category: Optional[str] = None
+    board: Optional[str] = None
+    channel: Optional[str] = None
+    grid_type: Optional[str] = None
+    accessories: List[Tuple[str, Optional[int]]] = field(default_factory=list)  # (name, quantity or None)
+    brand: Optional[str] = None
+    thickness: Optional[str] = None
+
+
+def _match(values: np.ndarray, wanted: list) -> np.ndarray:
+    """ (len(wanted), len(values)) mask; None in `wanted` matches everything """
+    mask = np.empty((len(wanted), len(values)), dtype=bool)
+    for i, w in enumerate(wanted):
+        mask[i] = True if w is None else (values == w)
+    return mask
+
+
+def _cheapest(arrays: PriceArrays, idx: np.ndarray, mask: np.ndarray):
+    """ Chosen variant index and price along the last axis of mask (-1 / NaN where nothing matches) """
+    prices = np.where(mask, arrays.v_price[idx], np.inf)
+    pos = prices.argmin(axis=-1)
+    best = np.take_along_axis(prices, pos[..., None], axis=-1)[..., 0]
+    found = np.isfinite(best)
+    return np.where(found, idx[pos], -1), np.where(found, best, np.nan)
+
+
+def _preferred(arrays: PriceArrays, idx: np.ndarray, brands: list):
+    """ Per brand: cheapest variant of that brand, else the cheapest of any brand """
+    chosen, price = _cheapest(arrays, idx, _match(arrays.v_brand[idx], brands))
+    any_choice, any_price = _cheapest(arrays, idx, np.ones((1, idx.size), dtype=bool))
+    missing = chosen < 0
+    return np.where(missing, any_choice[0], chosen), np.where(missing, any_price[0], price)
+
+
+def resolve_sub_category(arrays: PriceArrays, sub_category: Optional[str], board: Optional[str]) -> str:
+    for candidate in (sub_category, board):
+        if _key(candidate) in arrays.sub_names:
+            return _key(candidate)
+    if board:
+        hits = np.flatnonzero(arrays.p_name == _key(board))
+        if hits.size:
+            return arrays.p_sub[hits[0]]
+    raise PricingError("Could not determine the material category; pass material_category or a known board_type")
+
+
+def price_grid(arrays: PriceArrays, spec: QuoteSpec, brands: list, thicknesses: list, areas: list) -> dict:
+    """
+    Prices every (brand, thickness, area) combination at once.
+    Returns (kind, requested name, chosen variants, unit prices, quantities)
+    per line and totals shaped (B, T, A).
+    """
+    sub = resolve_sub_category(arrays, spec.sub_category, spec.board)
+    brand_keys = [_key(b) for b in brands]
+    thickness_keys = [_key(t) for t in thicknesses]
+    qty = material_quantities(areas)
+    B, T, A = len(brands), len(thicknesses), len(areas)
+    totals = np.zeros((B, T, A))
+    lines = []
+
+    # Board (suggested product): one price, quantity by area
+    if spec.board and _key(spec.board) not in arrays.sub_names:
+        hits = np.flatnonzero((arrays.p_sub == sub) & (arrays.p_name == _key(spec.board)))
+        if not hits.size:
+            raise PricingError(f"Unknown board type '{spec.board}' in {sub}")
+        p = hits[0]
+        if np.isnan(arrays.p_price[p]):
+            raise PricingError(f"Board type '{spec.board}' has no price")
+        totals += arrays.p_price[p] * qty["board"][None, None, :]
+        lines.append(("board", spec.board, p, arrays.p_price[p], qty["board"]))
+
+    # Channel: brand x thickness is the what-if dimension, so no fallback
+    if spec.channel:
+        idx = arrays.candidates(sub, spec.channel, "CHANNEL")
+        mask = _match(arrays.v_brand[idx], brand_keys)[:, None, :] & _match(arrays.v_variant[idx], thickness_keys)[None, :, :]
+        chosen, price = _cheapest(arrays, idx, mask)            # (B, T)
+        totals += price[:, :, None] * qty["channel"][None, None, :]
+        lines.append(("channel", spec.channel, chosen, price, qty["channel"]))
+
+    # Grid type and accessories follow the brand where it has them
+    if spec.grid_type:
+        idx = arrays.candidates(sub, spec.grid_type, "GRID_TYPE")
+        chosen, price = _preferred(arrays, idx, brand_keys)      # (B,)
+        totals += price[:, None, None] * qty["grid"][None, None, :]
+        lines.append(("grid", spec.grid_type, chosen, price, qty["grid"]))
+
+    for name, quantity in spec.accessories:
+        idx = arrays.candidates(sub, name, "ACCESSORY")
+        chosen, price = _preferred(arrays, idx, brand_keys)
+        line_qty = np.full(A, float(quantity)) if quantity else qty["accessory"]
+        totals += price[:, None, None] * line_qty[None, None, :]
+        lines.append(("accessory", name, chosen, price, line_qty))
+
+    return {"sub_category": sub, "totals": totals, "lines": lines}
+
+
+def price_quote(arrays: PriceArrays, spec: QuoteSpec) -> dict:
+    """ Line items for one quote, shaped like QuotationSnapshotSchema """
+    grid = price_grid(arrays, spec, [spec.brand], [spec.thickness], [spec.area_sqft])
+    items = []
+
+    for kind, item, chosen, price, quantity in grid["lines"]:
+        if kind == "board":
+            name = arrays.p_label[chosen]
+            unit_price = price
+        else:
+            index = chosen.flat[0]
+            if index < 0:
+                where = f"brand {spec.brand or 'any'}"
+                if kind == "channel":
+                    where += f" / thickness {spec.thickness or 'any'}"
+                raise PricingError(f"No priced {kind} '{item}' in {where}")
+            component, brand, variant = arrays.v_label[index]
+            name = " - ".join(part for part in (component, brand, variant) if part)
+            unit_price = price.flat[0]
+        qty = int(quantity[0])
+        items.append({
+            "name": name,
+            "quantity": qty,
+            "unit_price": int(round(unit_price)),
+            "total": int(round(unit_price)) * qty
+        })
+
+    subtotal = sum(item["total"] for item in items)
+    return {"items": items, "subtotal": subtotal, "tax": None, "grand_total": subtotal}
+
+
+def compare_quotes(arrays: PriceArrays, spec: QuoteSpec, brands=None, thicknesses=None, areas=None) -> list:
+    """ Totals for every brand x thickness x area combination, cheapest available first """
+    brands = brands or [spec.brand]
+    thicknesses = thicknesses or [spec.thickness]
+    areas = areas or [spec.area_sqft]
+    if len(brands) * len(thicknesses) * len(areas) > MAX_COMBINATIONS:
+        raise PricingError(f"At most {MAX_COMBINATIONS} combinations per request")
+
+    totals = price_grid(arrays, spec, brands, thicknesses, areas)["totals"]
+    b, t, a = np.meshgrid(np.arange(len(brands)), np.arange(len(thicknesses)), np.arange(len(areas)), indexing="ij")
+    flat = totals.ravel()
+    available = ~np.isnan(flat)
+    order = np.lexsort((np.where(available, flat, 0), ~available))
+
+    return [
+        {
+            "brand": brands[b.flat[i]],
+            "thickness": thicknesses[t.flat[i]],
+            "area_sqft": int(areas[a.flat[i]]),
+            "total": int(round(flat[i])) if available[i] else None,
+            "available": bool(available[i])
+        }
+        for i in order
+    ]
@@ -0,0 +1,141 @@
+"""
+Unified login index.
+
+Accounts live in three tables (users, team_lead_staff, store_manager_staff).
+principals maps every login name to its account, role, password hash and
+store, under a unique index, so a login is one indexed lookup and one
+password verification however many account tables there are.
+
+A flush listener mirrors every insert, update and delete of an account in
+the same transaction. When two tables use the same login name, the table
+earlier in SOURCES wins, as it did when login tried the tables in turn.
+backfill_principals.py fills the table for existing accounts and lists such
+collisions.
+
+Importing this module registers the flush listener.
+"""
+from sqlalchemy import event, select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from models import Principal, User, TeamLeadStaff, StoreManagerStaff
+
+USER = "user"
+TEAM_LEAD = "team_lead"
+STORE_MANAGER = "store_manager"
+
+# source -> (model, login name attribute, fixed role or None to use model.role); in login priority order
+SOURCES = {
+    USER: (User, "username", None),
+    TEAM_LEAD: (TeamLeadStaff, "staff_id", "TEAM_LEAD"),
+    STORE_MANAGER: (StoreManagerStaff, "staff_id", "STORE_MANAGER"),
+}
+SOURCE_BY_MODEL = {model: source for source, (model, _, _) in SOURCES.items()}
+PRIORITY = {source: i for i, source in enumerate(SOURCES)}
+
+_TRACKED = ("hashed_password", "role", "store_assigned", "username", "staff_id")
+
+
+def principal_row(obj, source: str = None) -> dict:
+    source = source or SOURCE_BY_MODEL[type(obj)]
+    _, name_attr, role = SOURCES[source]
+    return dict(
+        login_name=getattr(obj, name_attr),
+        source=source,
+        source_id=obj.id,
+        role=role or obj.role,
+        hashed_password=obj.hashed_password,
+        store_assigned=obj.store_assigned
+    )
+
+
+def upsert_principal(conn, row: dict) -> bool:
+    """ Writes `row` unless its login name belongs to a higher-priority account; False if shadowed """
+    table = Principal.__table__
+    if not row["login_name"]:
+        return False
+
+    # Renamed account: drop its old login name
+    conn.execute(delete(table).where(
+        table.c.source == row["source"], table.c.source_id == row["source_id"],
+        table.c.login_name != row["login_name"]
+    ))
+
+    for _ in range(2):
+        owner = conn.execute(
+            select(table.c.source, table.c.source_id).where(table.c.login_name == row["login_name"])
+        ).first()
+        if owner is not None:
+            same = (owner.source, owner.source_id) == (row["source"], row["source_id"])
+            if not same and PRIORITY[owner.source] <= PRIORITY[row["source"]]:
+                return False
+            conn.execute(update(table).where(table.c.login_name == row["login_name"]).values(**row))
+            return True
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(table).values(**row))
+            return True
+        except IntegrityError:
+            continue  # Inserted concurrently; re-read the owner
+    return False
+
+
+def delete_principal(conn, source: str, source_id: int):
+    table = Principal.__table__
+    conn.execute(delete(table).where(table.c.source == source, table.c.source_id == source_id))
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_principals(session, flush_context):
+    upserts, deletes = [], []
+
+    for obj in session.new:
+        if type(obj) in SOURCE_BY_MODEL:
+            upserts.append(principal_row(obj))
+
+    for obj in session.dirty:
+        if type(obj) in SOURCE_BY_MODEL and any(
+            key in obj.__table__.c and attributes.get_history(obj, key).has_changes() for key in _TRACKED
+        ):
+            upserts.append(principal_row(obj))
+
+    for obj in session.deleted:
+        if type(obj) in SOURCE_BY_MODEL:
+            deletes.append((SOURCE_BY_MODEL[type(obj)], obj.id))
+
+    if upserts or deletes:
+        conn = session.connection()
+        for source, source_id in deletes:
+            delete_principal(conn, source, source_id)
+        for row in upserts:
+            upsert_principal(conn, row)
+
+
+def find_principal(db: Session, login_name: str):
+    """ The principals row for a login name (one unique-index lookup), or None """
+    return db.query(Principal).filter(Principal.login_name == login_name).first()
+
+
+def load_principal(db: Session, login_name: str):
+    """
+    find_principal(), falling back to the account tables for names the index
+    does not have yet (accounts created by raw SQL, or a higher-priority
+    account that was deleted). A found account is indexed for next time.
+    """
+    principal = find_principal(db, login_name)
+    if principal is not None:
+        return principal
+
+    for source, (model, name_attr, _) in SOURCES.items():
+        account = db.query(model).filter(getattr(model, name_attr) == login_name).first()
+        if account is not None:
+            upsert_principal(db.connection(), principal_row(account, source))
+            return find_principal(db, login_name)
+    return None
+
+
+def set_password_hash(db: Session, principal: Principal, hashed_password: str):
+    """ Replaces the account's hash (e.g. upgraded on login); the caller commits """
+    model = SOURCES[principal.source][0]
+    db.execute(update(model).where(model.id == principal.source_id).values(hashed_password=hashed_password))
+    principal.hashed_password = hashed_password  # The UPDATE above bypasses the flush listener
@@ -0,0 +1,255 @@
+"""
+Versioned quotation documents.
+
+A quotation keeps its first document in quotations.base_snapshot. Every
+later save appends a quotation_revisions row holding only the diff against
+the previous revision (changed top-level fields, changed line items by
+name), and every CHECKPOINT_EVERY-th revision also stores the full document.
+Rendering revision N therefore starts from the nearest checkpoint at or
+below N and applies fewer than CHECKPOINT_EVERY diffs, all read with one
+query on the (quotation_id, revision) unique index. Revisions never change,
+so rendered documents are also kept in a per-worker LRU.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from models import Lead, Quotation, QuotationRevision
+from utils.rollup import count_first_quotation, set_lead_total
+
+CHECKPOINT_EVERY = int(os.getenv("QUOTATION_CHECKPOINT_EVERY", "10"))
+REVISION_CACHE_SIZE = int(os.getenv("QUOTATION_REVISION_CACHE_SIZE", "1024"))
+
+ITEMS = "items"
+_MISSING = object()
+
+
+# ==========================================
+# Diffs
+# ==========================================
+def _items_diff(old_items: list, new_items: list):
+    names_old = [item.get("name") for item in old_items]
+    names_new = [item.get("name") for item in new_items]
+    keyed = (
+        None not in names_old and None not in names_new
+        and len(set(names_old)) == len(names_old) and len(set(names_new)) == len(names_new)
+    )
+    if not keyed:
+        return {"replace": new_items}
+
+    old_by_name = dict(zip(names_old, old_items))
+    upsert = []
+    for item in new_items:
+        previous = old_by_name.get(item["name"])
+        if previous is None:
+            upsert.append(item)
+        elif previous != item:
+            if set(previous) - set(item):
+                return {"replace": new_items}  # A field was dropped; not expressible as an update
+            upsert.append({"name": item["name"], **{k: v for k, v in item.items() if previous.get(k, _MISSING) != v}})
+
+    remove = [name for name in names_old if name not in set(names_new)]
+    diff = {}
+    if upsert:
+        diff["upsert"] = upsert
+    if remove:
+        diff["remove"] = remove
+
+    added = [name for name in names_new if name not in old_by_name]
+    if [name for name in names_old if name not in remove] + added != names_new:
+        diff["order"] = names_new
+    return diff
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """ Compact diff turning `old` into `new` (see apply_diff) """
+    diff = {}
+    changed = {k: v for k, v in new.items() if k != ITEMS and old.get(k, _MISSING) != v}
+    removed = [k for k in old if k != ITEMS and k not in new]
+    if changed:
+        diff["set"] = changed
+    if removed:
+        diff["unset"] = removed
+
+    old_items, new_items = old.get(ITEMS) or [], new.get(ITEMS) or []
+    if old_items != new_items:
+        diff[ITEMS] = _items_diff(old_items, new_items)
+    return diff
+
+
+def apply_diff(snapshot: dict, diff: dict) -> dict:
+    result = copy.deepcopy(snapshot)
+    for key in diff.get("unset", []):
+        result.pop(key, None)
+    result.update(copy.deepcopy(diff.get("set", {})))
+
+    items_diff = diff.get(ITEMS)
+    if items_diff:
+        if "replace" in items_diff:
+            result[ITEMS] = copy.deepcopy(items_diff["replace"])
+        else:
+            removed = set(items_diff.get("remove", []))
+            items = [item for item in result.get(ITEMS, []) if item.get("name") not in removed]
+            by_name = {item["name"]: item for item in items}
+            for change in items_diff.get("upsert", []):
+                if change["name"] in by_name:
+                    by_name[change["name"]].update(copy.deepcopy(change))
+                else:
+                    items.append(copy.deepcopy(change))
+                    by_name[change["name"]] = items[-1]
+            if "order" in items_diff:
+                items = [by_name[name] for name in items_diff["order"]]
+            result[ITEMS] = items
+    return result
+
+
+# ==========================================
+# Rendering
+# ==========================================
+class RevisionCache:
+    """ Thread-safe LRU of (quotation id, revision) -> document """
+
+    def __init__(self, max_size: int = REVISION_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+revision_cache = RevisionCache()
+
+
+def render_revision(db: Session, quotation: Quotation, revision: int = None) -> dict:
+    """ Full document of `revision` (default: current); None if it does not exist """
+    revision = revision or quotation.current_revision
+    if revision < 1 or revision > quotation.current_revision:
+        return None
+
+    cached = revision_cache.get((quotation.id, revision))
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    start = max(1, revision - revision % CHECKPOINT_EVERY)
+    rows = db.query(QuotationRevision).filter(
+        QuotationRevision.quotation_id == quotation.id,
+        QuotationRevision.revision >= start,
+        QuotationRevision.revision <= revision
+    ).order_by(QuotationRevision.revision).all()
+
+    if start == 1 or not rows or rows[0].checkpoint is None:
+        document = copy.deepcopy(quotation.base_snapshot)
+        pending = [row for row in rows if row.revision > 1]
+        if start > 1:
+            # Checkpoint missing (e.g. legacy rows): replay from the beginning
+            pending = db.query(QuotationRevision).filter(
+                QuotationRevision.quotation_id == quotation.id,
+                QuotationRevision.revision > 1,
+                QuotationRevision.revision <= revision
+            ).order_by(QuotationRevision.revision).all()
+    else:
+        document = copy.deepcopy(rows[0].checkpoint)
+        pending = rows[1:]
+
+    for row in pending:
+        document = apply_diff(document, row.diff or {})
+
+    revision_cache.put((quotation.id, revision), document)
+    return copy.deepcopy(document)
+
+
+# ==========================================
+# Writes / lookups
+# ==========================================
+def find_quotation(db: Session, lead: Lead, quotation_code: str = None, for_update: bool = False):
+    """ The lead's quotation with this code, else its most recent one """
+    query = db.query(Quotation).filter(Quotation.lead_id == lead.id)
+    if quotation_code:
+        query = query.filter(Quotation.quotation_code == quotation_code)
+    if for_update:
+        query = query.with_for_update()
+    return query.order_by(Quotation.created_at.desc(), Quotation.id.desc()).first()
+
+
+def save_revision(db: Session, lead: Lead, document: dict, quotation_code: str = None,
+                  note: str = None, actor_id=None):
+    """
+    Appends `document` as the next revision of the lead's quotation (creating
+    the quotation on first save). Returns (quotation, revision number).
+    The caller commits.
+    """
+    actor = str(actor_id) if actor_id is not None else None
+    total = document.get("grand_total")
+    quotation_code = quotation_code or lead.quotation_id
+    quotation = find_quotation(db, lead, quotation_code, for_update=True)
+    # A lead that already had a quotation code was counted when it was submitted
+    first_quotation = quotation is None and not lead.quotation_id
+
+    if quotation is None:
+        quotation = Quotation(
+            quotation_code=quotation_code,
+            lead_id=lead.id,
+            lead_code=lead.lead_code,
+            status="DRAFT",
+            base_snapshot=document,
+            current_revision=1,
+            total=total,
+            created_by=actor
+        )
+        db.add(quotation)
+        db.flush()
+        if not quotation.quotation_code:
+            quotation.quotation_code = f"Q-{quotation.id:04d}"
+        db.add(QuotationRevision(
+            quotation_id=quotation.id, revision=1, diff=None, total=total, note=note, created_by=actor
+        ))
+        revision = 1
+    else:
+        previous = render_revision(db, quotation)
+        revision = quotation.current_revision + 1
+        db.add(QuotationRevision(
+            quotation_id=quotation.id,
+            revision=revision,
+            diff=diff_snapshots(previous, document),
+            checkpoint=document if revision % CHECKPOINT_EVERY == 0 else None,
+            total=total,
+            note=note,
+            created_by=actor
+        ))
+        quotation.current_revision = revision
+        quotation.total = total
+        if quotation.status in ("APPROVED", "REJECTED", "SENT"):
+            quotation.status = "DRAFT"  # A revised quotation needs a fresh approval
+
+    lead.quotation_id = quotation.quotation_code
+    if first_quotation:
+        count_first_quotation(db, lead)
+    if total is not None and quotation.status != "PENDING":
+        set_lead_total(db, lead, total)  # While pending, the lead keeps the submitted revision's total
+    return quotation, revision
+
+
+def lead_quotation_document(db: Session, lead: Lead):
+    """ Approved (else submitted, else current) revision of the lead's quotation; falls back to the legacy blob """
+    quotation = find_quotation(db, lead, lead.quotation_id)
+    if quotation is None:
+        return lead.quotation_snapshot
+    revision = quotation.approved_revision or quotation.submitted_revision or quotation.current_revision
+    return render_revision(db, quotation, revision)
@@ -0,0 +1,59 @@
+"""
+Quotation document rendering.
+
+render_quotation_html() is a pure function of a plain dict, so it can run in
+a worker process without a database session (see render_worker.py).
+"""
+from html import escape
+
+CONTENT_TYPES = {"html": "text/html; charset=utf-8"}
+
+
+def _money(value) -> str:
+    return "-" if value is None else f"₹ {int(value):,}"
+
+
+def document_context(lead, document: dict, quotation_code=None, revision=None) -> dict:
+    """ Everything the renderer needs, as picklable values """
+    return {
+        "quotation_id": quotation_code or lead.quotation_id,
+        "revision": revision,
+        "lead_code": lead.lead_code,
+        "customer_name": lead.customer_name,
+        "phone": lead.phone,
+        "address": ", ".join(part for part in (lead.location, lead.district) if part),
+        "area_sqft": lead.area_sqft,
+        "document": document or {"items": [], "subtotal": 0, "tax": None, "grand_total": 0}
+    }
+
+
+def render_quotation_html(context: dict) -> bytes:
+    document = context["document"]
+    rows = "".join(
+        "<tr><td>{}</td><td class=\"n\">{}</td><td class=\"n\">{}</td><td class=\"n\">{}</td></tr>".format(
+            escape(str(item.get("name", ""))), item.get("quantity", ""),
+            _money(item.get("unit_price")), _money(item.get("total"))
+        )
+        for item in document.get("items", [])
+    )
+    title = f"Quotation {context['quotation_id'] or ''}".strip()
+    revision = f" (revision {context['revision']})" if context.get("revision") else ""
+    area = f"<p>Area: {context['area_sqft']} sqft</p>" if context.get("area_sqft") else ""
+
+    html = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{escape(title)}</title>
+<style>body{{font-family:sans-serif}}table{{border-collapse:collapse;width:100%}}td,th{{border:1px solid #ccc;padding:4px}}.n{{text-align:right}}</style>
+</head><body>
+<h1>{escape(title)}{revision}</h1>
+<p>{escape(context.get('customer_name') or '')} &middot; {escape(context.get('phone') or '')}</p>
+<p>{escape(context.get('address') or '')}</p>
+{area}
+<table><thead><tr><th>Item</th><th>Qty</th><th>Unit price</th><th>Total</th></tr></thead>
+<tbody>{rows}</tbody></table>
+<p class="n">Subtotal: {_money(document.get('subtotal'))}</p>
+<p class="n">Tax: {_money(document.get('tax'))}</p>
+<p class="n"><b>Grand total: {_money(document.get('grand_total'))}</b></p>
+<p>Ref: {escape(context.get('lead_code') or '')}</p>
+</body></html>
+"""
+    return html.encode("utf-8")
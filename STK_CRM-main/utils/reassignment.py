@@ -0,0 +1,148 @@
+"""
+Bulk lead reassignment.
+
+reassign_leads() applies a whole plan of (lead id -> executive) moves with a
+fixed number of statements, whatever the plan size:
+- one SELECT ... FOR UPDATE for the leads and one for the executives involved,
+- one UPDATE leads ... WHERE id IN (...) per target executive (chunked),
+- one multi-row INSERT each for the REASSIGNED events and the /sync change log
+  (a tombstone for the previous owner, then an upsert for the new one),
+- status counter deltas for leads that changed store.
+
+The UPDATEs bypass the ORM flush listeners, so the change log and counters
+are written here explicitly (as the bulk lead import does). The caller
+commits.
+"""
+from collections import defaultdict
+from types import SimpleNamespace
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import Lead, User
+from utils.change_tracking import change_row, record_changes
+from utils.lead_events import lead_event_row, record_lead_events_bulk, REASSIGNED
+from utils.stats_snapshot import apply_counter_deltas, LEAD
+from utils.team_metrics import CLOSED_STATUSES
+
+CHUNK_SIZE = 500
+
+REASSIGNED_OK = "reassigned"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+INVALID_TARGET = "invalid_target"
+FORBIDDEN = "forbidden"  # The lead's current owner is outside `store`
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def active_lead_ids(db: Session, sales_executive_id) -> list:
+    """ Open leads of one executive (e.g. someone leaving the company) """
+    return [
+        lead_id for (lead_id,) in db.query(Lead.id).filter(
+            Lead.sales_executive_id == str(sales_executive_id),
+            Lead.status.notin_(CLOSED_STATUSES)
+        ).order_by(Lead.id)
+    ]
+
+
+def reassign_leads(db: Session, plan, actor_id=None, details: dict = None, store: str = None) -> list:
+    """
+    plan: iterable of (lead_id, to_user_id); a lead listed twice goes to its last target.
+    store: when given, both the lead's current owner and the target must be
+    sales executives of that store.
+    Returns one outcome dict per lead: lead_id, lead_code, status, from, to.
+    """
+    targets_by_lead = {}
+    for lead_id, to_user_id in plan:
+        targets_by_lead[int(lead_id)] = int(to_user_id)
+    if not targets_by_lead:
+        return []
+
+    leads = {
+        row.id: row for row in db.query(Lead.id, Lead.lead_code, Lead.sales_executive_id, Lead.status).filter(
+            Lead.id.in_(list(targets_by_lead))
+        ).with_for_update()
+    }
+
+    owner_ids = {int(row.sales_executive_id) for row in leads.values() if (row.sales_executive_id or "").isdigit()}
+    user_query = db.query(User.id, User.store_assigned, User.role).filter(
+        User.id.in_(list(set(targets_by_lead.values()) | owner_ids))
+    )
+    users = {row.id: row for row in user_query}
+
+    def in_store(executive_id) -> bool:
+        user = users.get(int(executive_id)) if executive_id and str(executive_id).isdigit() else None
+        return user is not None and user.store_assigned == store and user.role == "sales_executive"
+
+    outcomes = []
+    moves = defaultdict(list)  # target id (str) -> leads
+    for lead_id, target in targets_by_lead.items():
+        lead = leads.get(lead_id)
+        target_user = users.get(target)
+        outcome = {"lead_id": lead_id, "lead_code": lead.lead_code if lead else None,
+                   "from": lead.sales_executive_id if lead else None, "to": str(target)}
+        if lead is None:
+            outcome["status"] = NOT_FOUND
+        elif store is not None and not in_store(lead.sales_executive_id):
+            # Don't reveal anything about another store's lead
+            outcome.update({"status": FORBIDDEN, "lead_code": None, "from": None})
+        elif target_user is None or (store is not None and not in_store(target)):
+            outcome["status"] = INVALID_TARGET
+        elif lead.sales_executive_id == str(target):
+            outcome["status"] = UNCHANGED
+        else:
+            outcome["status"] = REASSIGNED_OK
+            moves[str(target)].append(lead)
+        outcomes.append(outcome)
+
+    if not moves:
+        return outcomes
+
+    for target, moved in moves.items():
+        for chunk in _chunks([lead.id for lead in moved]):
+            db.execute(
+                update(Lead).where(Lead.id.in_(chunk)).values(sales_executive_id=target)
+                .execution_options(synchronize_session=False)
+            )
+
+    def store_of(executive_id):
+        user = users.get(int(executive_id)) if executive_id and str(executive_id).isdigit() else None
+        return user.store_assigned if user else None
+
+    events, changes, counts = [], [], {}
+    for target, moved in moves.items():
+        new_store = store_of(target)
+        for lead in moved:
+            after = SimpleNamespace(id=lead.id, lead_code=lead.lead_code, sales_executive_id=target)
+            events.append(lead_event_row(
+                after, REASSIGNED, actor_id=actor_id, store=new_store,
+                details={"from": lead.sales_executive_id, "to": target, **(details or {})}
+            ))
+            # The previous owner's /sync scope is owner_id: tell it the lead left
+            before = SimpleNamespace(id=lead.id, lead_code=None, sales_executive_id=lead.sales_executive_id)
+            changes.append(change_row(before, "delete", entity="lead"))
+            changes.append(change_row(after, "upsert", entity="lead"))
+
+            old_store = store_of(lead.sales_executive_id)
+            if (old_store or "") != (new_store or ""):
+                for key_store, n in ((old_store, -1), (new_store, 1)):
+                    key = (LEAD, key_store or "", lead.status or "")
+                    counts[key] = counts.get(key, 0) + n
+
+    record_lead_events_bulk(db, events)
+    record_changes(db, changes)
+    if apply_counter_deltas(db.connection(), counts):
+        db.info["stats_changed"] = True
+
+    return outcomes
+
+
+def summarize(outcomes: list) -> dict:
+    summary = defaultdict(int)
+    for outcome in outcomes:
+        summary[outcome["status"]] += 1
+    return dict(summary)
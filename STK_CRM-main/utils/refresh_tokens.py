@@ -0,0 +1,171 @@
+"""
+Per-device refresh token store.
+
+Every refresh token is a row of refresh_tokens keyed by the sha256 of the
+token, for all three account tables. A login starts a family (one device);
+each /auth/token/refresh exchanges the presented token for a new one in the
+same family and marks the old one rotated. Presenting a rotated token again
+means it was copied: the whole family is revoked, so both the thief and the
+device have to log in again. Other devices of the same account have their own
+families and are unaffected.
+
+Two refreshes racing from one device present the same token. The successor
+of a token is derived from it (jti, iat and exp come from the parent's hash
+and rotation time), so within REFRESH_REUSE_GRACE_SECONDS of the rotation
+the loser gets that same successor back instead of revoking the family;
+later presentations are still treated as reuse.
+
+A refresh is one indexed lookup (token hash joined to principals for the
+current role and store). Expired rows are deleted in batches by
+purge_refresh_tokens.py. The caller commits.
+"""
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.orm import Session
+
+from models import RefreshToken, Principal
+from utils.security import create_refresh_token, REFRESH_TOKEN_EXPIRE_DAYS
+
+ACTIVE = "active"
+NOT_FOUND = "not_found"
+REVOKED = "revoked"
+REUSED = "reused"
+
+PURGE_BATCH_SIZE = 1000
+REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "10"))
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue(db: Session, principal, device: str = None, family_id: str = None, **claims):
+    """ A new refresh token for principal (login_name, source, source_id); returns (token, family_id) """
+    family_id = family_id or uuid.uuid4().hex
+    now = datetime.utcnow()
+    claims.setdefault("exp", now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    token = create_refresh_token(_claims(principal, family_id, **claims))
+    db.execute(RefreshToken.__table__.insert().values(
+        token_hash=hash_token(token),
+        family_id=family_id,
+        source=principal.source,
+        source_id=principal.source_id,
+        device=(device or "")[:200] or None,
+        created_at=now,
+        expires_at=claims["exp"]
+    ))
+    return token, family_id
+
+
+def _claims(principal, family_id: str, **claims) -> dict:
+    return {
+        "sub": principal.login_name,
+        "user_id": principal.source_id,
+        "table": principal.source,
+        "fid": family_id,
+        **claims
+    }
+
+
+def _successor_claims(row, rotated_at: datetime) -> dict:
+    """ jti / iat / exp of the token that replaced `row`, rebuilt from the row alone """
+    return {
+        "jti": hashlib.sha256(f"{row.token_hash}:next".encode()).hexdigest()[:32],
+        "iat": rotated_at,
+        "exp": rotated_at + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    }
+
+
+def lookup(db: Session, token: str):
+    """
+    The token's row with its account's current login name, role and store
+    (one unique-index lookup, locked), or None.
+    """
+    return db.execute(
+        select(
+            RefreshToken.id, RefreshToken.token_hash, RefreshToken.family_id, RefreshToken.source, RefreshToken.source_id,
+            RefreshToken.device, RefreshToken.expires_at, RefreshToken.rotated_at, RefreshToken.revoked_at,
+            Principal.login_name, Principal.role, Principal.store_assigned
+        )
+        .join(Principal, and_(Principal.source == RefreshToken.source, Principal.source_id == RefreshToken.source_id))
+        .where(RefreshToken.token_hash == hash_token(token))
+        .with_for_update()
+    ).first()
+
+
+def state(row) -> str:
+    if row is None or row.expires_at <= datetime.utcnow():
+        return NOT_FOUND
+    if row.revoked_at is not None:
+        return REVOKED
+    if row.rotated_at is not None:
+        return REUSED
+    return ACTIVE
+
+
+def rotate(db: Session, row, device: str = None):
+    """
+    Exchanges an active token for the next one of its family; returns the new
+    token, or None when another request rotated it first (see successor()).
+    """
+    # Whole seconds: every backend stores it exactly, and the successor is derived from it
+    rotated_at = datetime.utcnow().replace(microsecond=0)
+    result = db.execute(
+        update(RefreshToken).where(RefreshToken.id == row.id, RefreshToken.rotated_at.is_(None))
+        .values(rotated_at=rotated_at)
+    )
+    if result.rowcount != 1:
+        return None
+    token, _ = issue(db, row, device=device or row.device, family_id=row.family_id,
+                     **_successor_claims(row, rotated_at))
+    return token
+
+
+def successor(db: Session, row):
+    """
+    For a token rotated less than REUSE_GRACE_SECONDS ago: the token it was
+    exchanged for, if that one is still valid. None means reuse.
+    """
+    if row.rotated_at is None or datetime.utcnow() - row.rotated_at > timedelta(seconds=REUSE_GRACE_SECONDS):
+        return None
+    token = create_refresh_token(_claims(row, row.family_id, **_successor_claims(row, row.rotated_at)))
+    next_row = lookup(db, token)
+    if next_row is None or next_row.revoked_at is not None:
+        return None
+    return token
+
+
+def revoke_family(db: Session, family_id: str, source: str = None, source_id: int = None) -> int:
+    """ Logs one device out (reuse detection, logout) """
+    conditions = [RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)]
+    if source is not None:
+        conditions += [RefreshToken.source == source, RefreshToken.source_id == source_id]
+    return db.execute(update(RefreshToken).where(*conditions).values(revoked_at=datetime.utcnow())).rowcount
+
+
+def revoke_all(db: Session, source: str, source_id: int) -> int:
+    """ Logs every device of an account out (password change) """
+    return db.execute(
+        update(RefreshToken).where(
+            RefreshToken.source == source, RefreshToken.source_id == source_id, RefreshToken.revoked_at.is_(None)
+        ).values(revoked_at=datetime.utcnow())
+    ).rowcount
+
+
+def purge_expired(db: Session, batch_size: int = PURGE_BATCH_SIZE, now: datetime = None) -> int:
+    """ Deletes expired rows batch_size at a time, committing after each batch; returns the count """
+    now = now or datetime.utcnow()
+    purged = 0
+    while True:
+        ids = [row_id for (row_id,) in db.execute(
+            select(RefreshToken.id).where(RefreshToken.expires_at < now).order_by(RefreshToken.id).limit(batch_size)
+        )]
+        if not ids:
+            return purged
+        db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        db.commit()
+        purged += len(ids)
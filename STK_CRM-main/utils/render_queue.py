@@ -0,0 +1,147 @@
+"""
+Database-backed queue of quotation documents to render.
+
+Request handlers only insert a render_jobs row (enqueue_render) and return
+its id; render_worker.py claims queued jobs, renders them in a process pool
+and writes the output to the content-addressed document store.
+
+A revision's line items never change, but the customer details printed
+with them come from the (editable) lead. A queued job is reused, since it
+reads the lead when it is claimed; a running or rendered one only when its
+context_key (a hash of those customer details) still matches.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, or_
+from sqlalchemy.orm import Session
+
+from models import Lead, Quotation, RenderJob
+from utils import document_store
+from utils.quote_document import document_context, render_quotation_html
+from utils.quotation_store import find_quotation, render_revision
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+MAX_ATTEMPTS = int(os.getenv("RENDER_MAX_ATTEMPTS", "3"))
+# A RUNNING job older than this belonged to a worker that died; it is queued again
+RENDER_STALE_SECONDS = int(os.getenv("RENDER_STALE_SECONDS", "300"))
+
+RENDERERS = {"html": render_quotation_html}
+
+# Lead fields of document_context() printed on the document
+CONTEXT_KEY_FIELDS = ("lead_code", "customer_name", "phone", "address", "area_sqft")
+
+
+def context_key(context: dict) -> str:
+    values = [context.get(field) for field in CONTEXT_KEY_FIELDS]
+    return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+
+
+def enqueue_render(db: Session, lead: Lead, fmt: str = "html", actor_id=None) -> RenderJob:
+    """ Queues the lead's approved (else latest) quotation revision. The caller commits. """
+    quotation = find_quotation(db, lead, lead.quotation_id)
+    revision = None
+    key = context_key(document_context(lead, None))
+    if quotation is not None:
+        revision = quotation.approved_revision or quotation.submitted_revision or quotation.current_revision
+        existing = db.query(RenderJob).filter(
+            RenderJob.quotation_id == quotation.id,
+            RenderJob.revision == revision,
+            RenderJob.format == fmt,
+            or_(
+                RenderJob.status == QUEUED,
+                RenderJob.status.in_([RUNNING, DONE]) & (RenderJob.context_key == key)
+            )
+        ).order_by(RenderJob.id.desc()).first()
+        if existing is not None:
+            return existing
+
+    job = RenderJob(
+        lead_id=lead.id,
+        quotation_id=quotation.id if quotation is not None else None,
+        revision=revision,
+        format=fmt,
+        status=QUEUED,
+        attempts=0,
+        context_key=key,
+        requested_by=str(actor_id) if actor_id is not None else None
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def requeue_stale(db: Session) -> int:
+    """
+    Queues stale RUNNING jobs again, except those that already used
+    MAX_ATTEMPTS: a document that crashes or hangs the renderer fails for good.
+    """
+    cutoff = datetime.now() - timedelta(seconds=RENDER_STALE_SECONDS)
+    stale = (RenderJob.status == RUNNING) & (RenderJob.started_at < cutoff)
+    db.execute(
+        update(RenderJob).where(stale, RenderJob.attempts >= MAX_ATTEMPTS)
+        .values(status=FAILED, error="Render did not finish (worker died or timed out)", finished_at=datetime.now())
+    )
+    requeued = db.execute(update(RenderJob).where(stale).values(status=QUEUED)).rowcount
+    db.commit()
+    return requeued
+
+
+def claim_jobs(db: Session, limit: int) -> list:
+    """ Marks up to `limit` queued jobs RUNNING for this worker and returns their ids """
+    ids = [
+        job_id for (job_id,) in db.query(RenderJob.id).filter(RenderJob.status == QUEUED).order_by(RenderJob.id)
+        .limit(limit).with_for_update(skip_locked=True)
+    ]
+    claimed = []
+    now = datetime.now()
+    for job_id in ids:
+        # Conditional update: another worker may have claimed it first where SKIP LOCKED is unavailable
+        won = db.execute(
+            update(RenderJob).where(RenderJob.id == job_id, RenderJob.status == QUEUED)
+            .values(status=RUNNING, started_at=now, attempts=RenderJob.attempts + 1)
+        ).rowcount
+        if won:
+            claimed.append(job_id)
+    db.commit()
+    return claimed
+
+
+def job_context(db: Session, job_id: int):
+    """ (format, renderer context) for a claimed job """
+    job = db.get(RenderJob, job_id)
+    lead = db.get(Lead, job.lead_id)
+    if job.quotation_id is not None:
+        quotation = db.get(Quotation, job.quotation_id)
+        document = render_revision(db, quotation, job.revision)
+        return job.format, document_context(lead, document, quotation.quotation_code, job.revision)
+    return job.format, document_context(lead, lead.quotation_snapshot)
+
+
+def render_to_store(fmt: str, context: dict) -> str:
+    """ Runs in a worker process: renders and stores the document, returns its hash """
+    return document_store.put(RENDERERS[fmt](context))
+
+
+def finish_job(db: Session, job_id: int, digest: str, key: str = None):
+    """ key: context_key() of what was actually rendered (the lead may have changed since enqueue) """
+    values = dict(status=DONE, content_hash=digest, error=None, finished_at=datetime.now())
+    if key is not None:
+        values["context_key"] = key
+    db.execute(update(RenderJob).where(RenderJob.id == job_id).values(**values))
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, error: str):
+    """ Queues the job again until it has used MAX_ATTEMPTS """
+    job = db.get(RenderJob, job_id)
+    job.status = QUEUED if (job.attempts or 0) < MAX_ATTEMPTS else FAILED
+    job.error = error[:500]
+    job.finished_at = datetime.now() if job.status == FAILED else None
+    db.commit()
@@ -0,0 +1,128 @@
+"""
+Daily performance rollup (daily_exec_rollup).
+
+Each lead transition adds to the counters of one (executive, store, day)
+row inside the caller's transaction, so the performance graphs read a few
+small rows instead of scanning leads. rebuild_daily_rollup.py recomputes the
+table from source rows for backfills or after a drift.
+"""
+from sqlalchemy import update, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import DailyExecRollup, LeadEvent
+from utils.lead_events import LEAD_CREATED, QUOTATION_GENERATED, lead_event_row, executive_store
+
+ROLLUP_COUNTERS = ("leads_created", "quotations", "approvals", "handovers", "deliveries", "revenue")
+
+
+def rollup_key(event_row: dict):
+    """ (sales_executive_id, store, day) for an event built by lead_event_row() """
+    return (
+        event_row["sales_executive_id"] or "",
+        event_row["store"] or "",
+        event_row["occurred_at"].date()
+    )
+
+
+def add_deltas(acc: dict, event_row: dict, **deltas) -> dict:
+    """ Accumulates counter deltas per rollup row; returns acc """
+    bucket = acc.setdefault(rollup_key(event_row), {})
+    for counter, value in deltas.items():
+        if value:
+            bucket[counter] = bucket.get(counter, 0) + int(value)
+    return acc
+
+
+def creation_deltas(acc: dict, lead, events: list) -> dict:
+    """ Deltas for the events returned by lead_events.creation_events() """
+    for event in events:
+        if event["event_type"] == LEAD_CREATED:
+            add_deltas(acc, event, leads_created=1, revenue=lead.total_estimated_cost or 0)
+        elif event["event_type"] == QUOTATION_GENERATED and lead.quotation_id:
+            add_deltas(acc, event, quotations=1)
+    return acc
+
+
+def apply_deltas(db: Session, acc: dict):
+    """ Adds accumulated deltas to daily_exec_rollup, creating rows as needed """
+    table = DailyExecRollup.__table__
+
+    for (se_id, store, day), deltas in acc.items():
+        if not deltas:
+            continue
+        match = (table.c.sales_executive_id == se_id) & (table.c.store == store) & (table.c.day == day)
+        increments = {counter: table.c[counter] + value for counter, value in deltas.items()}
+
+        if db.execute(update(table).where(match).values(**increments)).rowcount:
+            continue
+
+        values = {counter: deltas.get(counter, 0) for counter in ROLLUP_COUNTERS}
+        try:
+            # Savepoint so losing an insert race does not roll back the caller's work
+            with db.begin_nested():
+                db.execute(insert(table).values(sales_executive_id=se_id, store=store, day=day, **values))
+        except IntegrityError:
+            db.execute(update(table).where(match).values(**increments))
+
+
+def bump_rollup(db: Session, event_row: dict, **deltas):
+    """ Single-transition shortcut: bump_rollup(db, event, approvals=1) """
+    apply_deltas(db, add_deltas({}, event_row, **deltas))
+
+
+def count_first_quotation(db: Session, lead):
+    """ quotations=1 for a lead's first quotation, on the day it was generated (as the graphs always did) """
+    if lead.quotation_created_at:
+        store = executive_store(db, lead.sales_executive_id)
+        bump_rollup(db, lead_event_row(lead, QUOTATION_GENERATED, lead.quotation_created_at, store=store), quotations=1)
+
+
+def creation_owners(db: Session, leads, store_by_user: dict = None) -> dict:
+    """
+    lead id -> (sales_executive_id, store) its creation-day counters
+    (leads_created, revenue) are booked under: the owner on its LEAD_CREATED
+    event, which a later reassignment does not change. Leads without one
+    fall back to their current owner (store from store_by_user when given).
+    """
+    leads = list(leads)
+    owners = {}
+    rows = db.query(LeadEvent.lead_id, LeadEvent.sales_executive_id, LeadEvent.store).filter(
+        LeadEvent.lead_id.in_([lead.id for lead in leads]), LeadEvent.event_type == LEAD_CREATED
+    ).order_by(LeadEvent.id.desc())
+    for lead_id, se_id, store in rows:
+        owners[lead_id] = (se_id, store)  # Oldest event wins
+    for lead in leads:
+        if lead.id not in owners:
+            se_id = lead.sales_executive_id
+            store = store_by_user.get(se_id) if store_by_user is not None else executive_store(db, se_id)
+            owners[lead.id] = (se_id, store)
+    return owners
+
+
+def set_lead_total(db: Session, lead, total):
+    """
+    Sets lead.total_estimated_cost and moves the revenue counted on the
+    lead's creation day (see creation_deltas) by the difference, in the row
+    of whoever owned the lead when it was created.
+    """
+    delta = (total or 0) - (lead.total_estimated_cost or 0)
+    lead.total_estimated_cost = total
+    if delta and lead.lead_created_at:
+        se_id, store = creation_owners(db, [lead])[lead.id]
+        event = dict(lead_event_row(lead, LEAD_CREATED, lead.lead_created_at, store=store), sales_executive_id=se_id)
+        bump_rollup(db, event, revenue=delta)
+
+
+def daily_totals(db: Session, sales_executive_id: str, start, end) -> dict:
+    """ day -> {counter: value} for one executive over [start, end], summed across stores """
+    rows = db.query(
+        DailyExecRollup.day,
+        *[func.sum(getattr(DailyExecRollup, counter)).label(counter) for counter in ROLLUP_COUNTERS]
+    ).filter(
+        DailyExecRollup.sales_executive_id == str(sales_executive_id),
+        DailyExecRollup.day >= start,
+        DailyExecRollup.day <= end
+    ).group_by(DailyExecRollup.day).all()
+
+    return {row.day: {counter: int(getattr(row, counter) or 0) for counter in ROLLUP_COUNTERS} for row in rows}
@@ -1,9 +1,13 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
+import uuid
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 
+from utils.password_service import hash_password, verify_and_update
+from utils.auth_cache import claims_cache, revocations, token_digest
+
 from dotenv import load_dotenv
 import os
 load_dotenv()
@@ -14,72 +18,104 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
-
-
+# Hashing runs in a bounded process pool (see utils/password_service.py)
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 
 def verify_password(password, hashed):
-    return pwd_context.verify(password, hashed)
+    return verify_and_update(password, hashed)[0]
+
+
+def _token_ids(data: dict):
+    # jti identifies one token (logout), iat orders it against a password change
+    data.setdefault("iat", datetime.utcnow())
+    data.setdefault("jti", uuid.uuid4().hex)
 
 
 def create_access_token(data: dict):
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    _token_ids(data)
     data.update({"exp": expire})
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def create_refresh_token(data: dict):
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    data.update({"exp": expire, "type": "refresh"})
+    data.setdefault("exp", datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    _token_ids(data)
+    data.update({"type": "refresh"})
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def verify_refresh_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "refresh":
+        if payload.get("type") != "refresh" or revocations.is_revoked(payload):
             return None
         return payload
     except JWTError:
         return None
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def _unauthorized(detail: str):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_access_token(token: str):
     """
-    Verify JWT token and return current user information
+    Uncached check of an access token: returns (claims, user dict), raises 401.
+    get_current_user() caches the result per token (utils/auth_cache.py).
     """
     try:
         # Decode and verify the JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        
-        # Extract user information from token
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        role: str = payload.get("role")
-        
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Return user information from token
-        return {
-            "username": username,
-            "user_id": user_id,
-            "role": role,
-            "sales_executive_id": payload.get("sales_executive_id"),
-            "store_assigned": payload.get("store_assigned")
-        }
-
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _unauthorized("Could not validate credentials")
+
+    # Extract user information from token
+    if payload.get("sub") is None:
+        raise _unauthorized("Invalid authentication token")
+
+    return payload, {
+        "username": payload.get("sub"),
+        "user_id": payload.get("user_id"),
+        "role": payload.get("role"),
+        "sales_executive_id": payload.get("sales_executive_id"),
+        "store_assigned": payload.get("store_assigned")
+    }
 
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Verify JWT token and return current user information.
+    Verified tokens are cached until their exp; revocation (logout, password
+    change) is checked against the in-memory revocation set on every call.
+    """
+    key = token_digest(token)
+    cached = claims_cache.get(key)
+    if cached is None:
+        cached = verify_access_token(token)
+        if cached[0].get("exp"):
+            claims_cache.put(key, cached, cached[0]["exp"])
+
+    claims, user = cached
+    if revocations.is_revoked(claims):
+        raise _unauthorized("Token has been revoked")
+
+    # Callers may modify the dict they get
+    return dict(user)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)):
+    """
+    get_current_user() for async def routes: runs on the event loop (a cache
+    hit is a dict lookup) instead of taking a threadpool thread per request.
+    Only the periodic revocation reload, which reads the database, goes to the threadpool.
+    """
+    if revocations.is_stale():
+        await run_in_threadpool(revocations.refresh_if_stale)
+    return get_current_user(token)
@@ -0,0 +1,207 @@
+"""
+Dashboard stats served from status counters.
+
+status_counters holds the number of leads and store orders per (store,
+status), split over STATS_COUNTER_SHARDS rows per key. Every flush that
+creates, deletes or changes the status (or owner) of one of them applies
+the deltas in the same transaction to one randomly picked shard, so
+concurrent writers of the same (store, status) rarely wait on each other's
+row locks. The "stats" cache version is bumped after the commit in its own
+short transaction, so it is never locked for the length of a writer's
+transaction. Dashboards read an in-memory snapshot of the counters (summed
+over shards), reloaded only when that version moves, so they cost the same
+no matter how many leads exist. reconcile_stats.py recounts from the source
+tables to correct any drift (e.g. from raw SQL edits).
+
+Importing this module registers the flush listener.
+"""
+import os
+import random
+
+from sqlalchemy import event, select, update, insert, func, cast, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from models import Lead, StoreManagerDashboard, StatusCounter, User
+from utils.cache_versions import bump_version_now, invalidate_caches, VersionedCache
+
+STATS_CACHE = "stats"
+STATS_COUNTER_SHARDS = max(1, int(os.getenv("STATS_COUNTER_SHARDS", "8")))
+
+LEAD = "lead"
+STORE_ORDER = "store_order"
+
+
+def _lead_stores(conn, executive_ids):
+    """ sales_executive_id (str) -> store for the given executives """
+    ids = [int(i) for i in executive_ids if i and str(i).isdigit()]
+    if not ids:
+        return {}
+    rows = conn.execute(select(User.id, User.store_assigned).where(User.id.in_(ids)))
+    return {str(user_id): store for user_id, store in rows}
+
+
+def _old_value(obj, key):
+    history = attributes.get_history(obj, key)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, key)
+
+
+def apply_counter_deltas(conn, deltas: dict):
+    """
+    deltas: {(entity, store, status): n}; applied on a Connection in the
+    writer's transaction, to one random shard of each key. The caller sets
+    session.info["stats_changed"] when this returns True, which bumps the
+    cache version after commit.
+    """
+    table = StatusCounter.__table__
+    shard = random.randrange(STATS_COUNTER_SHARDS)
+    changed = False
+
+    # Fixed key order, so two writers touching the same rows can't deadlock
+    for (entity, store, status), n in sorted(deltas.items()):
+        if not n:
+            continue
+        changed = True
+        key = dict(entity=entity, store=store or "", status=status or "", shard=shard)
+        match = (table.c.entity == key["entity"]) & (table.c.store == key["store"]) & \
+            (table.c.status == key["status"]) & (table.c.shard == shard)
+        increment = update(table).where(match).values(count=table.c.count + n)
+
+        if conn.execute(increment).rowcount:
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(table).values(count=n, **key))
+        except IntegrityError:
+            conn.execute(increment)
+
+    return changed
+
+
+def _add(deltas, entity, store, status, n):
+    key = (entity, store or "", status or "")
+    deltas[key] = deltas.get(key, 0) + n
+
+
+@event.listens_for(Session, "after_flush")
+def _count_status_changes(session, flush_context):
+    leads = []       # (lead, old_owner or None, +1/-1/0)
+    deltas = {}
+
+    for obj in session.new:
+        if isinstance(obj, Lead):
+            leads.append((obj, None, 1))
+        elif isinstance(obj, StoreManagerDashboard):
+            _add(deltas, STORE_ORDER, obj.store_name, obj.status, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Lead):
+            leads.append((obj, None, -1))
+        elif isinstance(obj, StoreManagerDashboard):
+            _add(deltas, STORE_ORDER, obj.store_name, obj.status, -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Lead):
+            if attributes.get_history(obj, "status").has_changes() or \
+                    attributes.get_history(obj, "sales_executive_id").has_changes():
+                leads.append((obj, _old_value(obj, "sales_executive_id"), 0))
+        elif isinstance(obj, StoreManagerDashboard):
+            if attributes.get_history(obj, "status").has_changes() or \
+                    attributes.get_history(obj, "store_name").has_changes():
+                _add(deltas, STORE_ORDER, _old_value(obj, "store_name"), _old_value(obj, "status"), -1)
+                _add(deltas, STORE_ORDER, obj.store_name, obj.status, 1)
+
+    conn = session.connection()
+    if leads:
+        owners = {lead.sales_executive_id for lead, _, _ in leads} | {old for _, old, _ in leads if old}
+        stores = _lead_stores(conn, owners)
+        for lead, old_owner, sign in leads:
+            if sign:
+                _add(deltas, LEAD, stores.get(lead.sales_executive_id), lead.status, sign)
+            else:
+                _add(deltas, LEAD, stores.get(old_owner), _old_value(lead, "status"), -1)
+                _add(deltas, LEAD, stores.get(lead.sales_executive_id), lead.status, 1)
+
+    if apply_counter_deltas(conn, deltas):
+        session.info["stats_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_local_snapshot(session):
+    # Also fired when a savepoint is released; wait for the outer commit
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("stats_changed", False):
+        try:
+            bump_version_now(session.get_bind(), STATS_CACHE)
+        except Exception as e:
+            # The counters are committed; other workers pick them up at the next bump
+            print(f"Stats version bump failed: {e}")
+        invalidate_caches(STATS_CACHE)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stats_flag(session):
+    if not session.in_nested_transaction():
+        session.info.pop("stats_changed", None)
+
+
+def load_counters(db) -> dict:
+    """ {(entity, store, status): count}, summed over shards """
+    rows = db.query(
+        StatusCounter.entity, StatusCounter.store, StatusCounter.status, func.sum(StatusCounter.count)
+    ).group_by(StatusCounter.entity, StatusCounter.store, StatusCounter.status).all()
+    return {(entity, store, status): int(count or 0) for entity, store, status, count in rows}
+
+
+stats_snapshot = VersionedCache(STATS_CACHE, load_counters)
+
+
+class StatsView:
+    """ Sums over one snapshot of the counters """
+
+    def __init__(self, counters: dict, version: int):
+        self.counters = counters
+        self.version = version
+
+    def count(self, entity, statuses=None, exclude=None, store=None) -> int:
+        total = 0
+        for (e, s, status), n in self.counters.items():
+            if e != entity or (store is not None and s != store):
+                continue
+            if statuses is not None and status not in statuses:
+                continue
+            # Like status NOT IN (...): leads without a status (stored as "") don't match
+            if exclude is not None and (status in exclude or status == ""):
+                continue
+            total += n
+        return total
+
+
+def current_stats(db) -> StatsView:
+    counters, version = stats_snapshot.get(db)
+    return StatsView(counters, version)
+
+
+async def current_stats_async(db) -> StatsView:
+    counters, version = await stats_snapshot.get_async(db)
+    return StatsView(counters, version)
+
+
+def recount(db) -> dict:
+    """ Counters recomputed from leads and store orders """
+    counts = {}
+    lead_rows = db.query(User.store_assigned, Lead.status, func.count(Lead.id)).select_from(Lead).outerjoin(
+        User, cast(User.id, String) == Lead.sales_executive_id
+    ).group_by(User.store_assigned, Lead.status)
+    for store, status, n in lead_rows:
+        _add(counts, LEAD, store, status, n)
+
+    order_rows = db.query(
+        StoreManagerDashboard.store_name, StoreManagerDashboard.status, func.count(StoreManagerDashboard.id)
+    ).group_by(StoreManagerDashboard.store_name, StoreManagerDashboard.status)
+    for store, status, n in order_rows:
+        _add(counts, STORE_ORDER, store, status, n)
+    return counts
@@ -0,0 +1,85 @@
+"""
+Per-executive lead metrics for the team lead screens.
+
+One GROUP BY over leads (outer-joined to their store orders, pre-aggregated
+per lead) with conditional aggregates replaces the 3-5 COUNT/SUM queries per executive that
+/low-performers, /team-stats and /pending-leads-overview used to run.
+"""
+from datetime import datetime, date, time, timedelta
+
+from sqlalchemy import func, case, select
+from sqlalchemy.orm import Session
+
+from models import Lead, User, StoreManagerDashboard
+
+FOLLOWUP_STATUSES = ["Today", "Upcoming"]
+OVERVIEW_PENDING_STATUSES = ["Open", "FollowUp", "Today", "Upcoming"]
+CLOSED_STATUSES = ["Delivered", "Closed", "Rejected", "Converted"]
+
+EMPTY_METRICS = {
+    "total_leads": 0,
+    "pending_leads": 0,           # Today / Upcoming follow-ups
+    "overview_pending_leads": 0,  # Open / FollowUp / Today / Upcoming
+    "active_leads": 0,            # Not in a closed state
+    "delivered_leads": 0,
+    "handovers": 0,
+    "handovers_delivered": 0,
+    "daily_revenue": 0,
+}
+
+
+def store_sales_team(db: Session, store: str):
+    return db.query(User).filter(User.store_assigned == store, User.role == "sales_executive").all()
+
+
+def store_team_metrics(db: Session, store: str, day: date = None):
+    """ (sales team, executive_metrics for it); async routes run it through AsyncSession.run_sync """
+    sales_team = store_sales_team(db, store)
+    return sales_team, executive_metrics(db, [se.id for se in sales_team], day=day)
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def executive_metrics(db: Session, executive_ids, day: date = None) -> dict:
+    """ sales_executive_id (str) -> metrics dict (see EMPTY_METRICS) for every requested id """
+    ids = [str(i) for i in executive_ids]
+    metrics = {se_id: dict(EMPTY_METRICS) for se_id in ids}
+    if not ids:
+        return metrics
+
+    day = day or datetime.now().date()
+    day_start = datetime.combine(day, time.min)
+    day_end = day_start + timedelta(days=1)
+    created_on_day = (Lead.lead_created_at >= day_start) & (Lead.lead_created_at < day_end)
+
+    # Store orders per lead, so a lead with several orders is still counted once;
+    # only the requested executives' leads, not the whole orders table
+    orders = db.query(
+        StoreManagerDashboard.lead_code.label("lead_code"),
+        func.count(StoreManagerDashboard.id).label("handovers"),
+        _count_if(StoreManagerDashboard.status == "Delivered").label("handovers_delivered"),
+    ).filter(
+        StoreManagerDashboard.lead_code.in_(select(Lead.lead_code).where(Lead.sales_executive_id.in_(ids)))
+    ).group_by(StoreManagerDashboard.lead_code).subquery()
+
+    rows = db.query(
+        Lead.sales_executive_id,
+        func.count(Lead.id).label("total_leads"),
+        _count_if(Lead.status.in_(FOLLOWUP_STATUSES)).label("pending_leads"),
+        _count_if(Lead.status.in_(OVERVIEW_PENDING_STATUSES)).label("overview_pending_leads"),
+        _count_if(Lead.status.notin_(CLOSED_STATUSES)).label("active_leads"),
+        _count_if(Lead.status == "Delivered").label("delivered_leads"),
+        func.sum(orders.c.handovers).label("handovers"),
+        func.sum(orders.c.handovers_delivered).label("handovers_delivered"),
+        func.sum(case((created_on_day, Lead.total_estimated_cost), else_=0)).label("daily_revenue"),
+    ).outerjoin(
+        orders, orders.c.lead_code == Lead.lead_code
+    ).filter(
+        Lead.sales_executive_id.in_(ids)
+    ).group_by(Lead.sales_executive_id).all()
+
+    for row in rows:
+        metrics[row.sales_executive_id] = {key: int(getattr(row, key) or 0) for key in EMPTY_METRICS}
+    return metrics